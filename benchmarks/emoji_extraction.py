@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""emoji_extraction.py
+
+Benchmark comparing the original Q2 character-class regex (one codepoint per
+match) against `emojis.extract_emojis` (prefiltered, whole emoji sequences, one
+call per tweet) and `emojis.count_emojis` (batches of tweets joined into one
+text, as in `q2_time`) over the tweet contents of a file, or over a synthetic sample when no file is
+given. Decoding is done once up front, so only the extraction is timed.
+
+Usage:
+    python benchmarks/emoji_extraction.py --file /path/to/farmers-protest-tweets-2021-2-4.json
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str((Path(__file__).resolve().parent.parent / "src").resolve()))
+
+import argparse
+import random
+import re
+import time
+from collections import Counter
+from typing import Callable, List
+
+from emojis import count_emojis, extract_emojis
+from q2_time import CONTENT_BATCH_SIZE
+from utils import JSON_DECODE_ERRORS, iter_lines, make_json_decoder
+
+ORIGINAL_PATTERN = re.compile(
+    "["
+    "\U0001f600-\U0001f64f"
+    "\U0001f300-\U0001f5ff"
+    "\U0001f680-\U0001f6ff"
+    "\U0001f1e0-\U0001f1ff"
+    "\U00002700-\U000027bf"
+    "\U000024c2-\U0001f251"
+    "]",
+    flags=re.UNICODE,
+)
+
+SAMPLE_TEXTS = [
+    "Farmers are protesting peacefully at the border #FarmersProtest",
+    "किसान आंदोलन जारी है #FarmersProtest",
+    "ਕਿਸਾਨ ਮਜ਼ਦੂਰ ਏਕਤਾ ਜ਼ਿੰਦਾਬਾਦ 🙏🙏",
+    "Stand with farmers 🇮🇳❤️ 👨‍🌾👩🏽‍🌾 #IStandWithFarmers",
+    "RT @someone: This is huge 😂😂🔥",
+]
+
+
+def load_contents(file_path: str) -> List[str]:
+    """Decodes the non-empty tweet contents of a file."""
+    decode = make_json_decoder(("content",))
+    contents = []
+    for raw_line in iter_lines(file_path):
+        try:
+            content = decode(raw_line).get("content")
+        except JSON_DECODE_ERRORS:
+            continue
+        if content:
+            contents.append(content)
+    return contents
+
+
+def count_per_tweet(extract: Callable[[str], List[str]]) -> Callable:
+    """Builds a variant calling `extract` on each content."""
+
+    def run(contents: List[str]) -> Counter:
+        counter = Counter()
+        for content in contents:
+            counter.update(extract(content))
+        return counter
+
+    return run
+
+
+def count_batched(contents: List[str]) -> Counter:
+    """Counts the contents in q2_time batches."""
+    counter = Counter()
+    for start in range(0, len(contents), CONTENT_BATCH_SIZE):
+        count_emojis("\n".join(contents[start : start + CONTENT_BATCH_SIZE]), counter)
+    return counter
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--file", help="Tweets JSON lines file.")
+    parser.add_argument(
+        "--sample_size",
+        type=int,
+        default=200_000,
+        help="Number of synthetic texts when no --file is given.",
+    )
+    args = parser.parse_args()
+
+    if args.file:
+        contents = load_contents(args.file)
+    else:
+        rng = random.Random(0)
+        contents = [rng.choice(SAMPLE_TEXTS) for _ in range(args.sample_size)]
+
+    variants = {
+        "original_regex": count_per_tweet(ORIGINAL_PATTERN.findall),
+        "extract_emojis": count_per_tweet(extract_emojis),
+        "count_emojis": count_batched,
+    }
+    print(f"{len(contents)} texts")
+    print(f"{'variant':<16}{'seconds':>10}{'emojis':>10}{'distinct':>10}")
+    for name, count in variants.items():
+        start = time.perf_counter()
+        counter = count(contents)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:<16}{elapsed:>10.3f}{sum(counter.values()):>10}{len(counter):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
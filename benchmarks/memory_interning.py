@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""memory_interning.py
+
+Benchmark comparing the peak RSS of the Q1/Q3 aggregation structures: the
+original dict-of-dicts against the interned, sparse `DateUserCounter` for Q1,
+and the `Counter` against interned ids with an array of counts for Q3 (kept here
+as the measurement behind `q3_memory` staying on a Counter). Each variant runs
+in its own subprocess, so the peak RSS reported by the OS belongs to that
+variant only.
+
+Usage:
+    python benchmarks/memory_interning.py --file /path/to/farmers-protest-tweets-2021-2-4.json
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str((Path(__file__).resolve().parent.parent / "src").resolve()))
+
+import argparse
+import resource
+import subprocess  # nosec B404
+from array import array
+from collections import Counter
+from datetime import datetime
+
+from interning import StringInterner
+from q1_memory import DateUserCounter, count_tweet_date_user
+from utils import JSON_DECODE_ERRORS, iter_lines, make_json_decoder
+
+VARIANTS = ["baseline", "q1_dict", "q1_interned", "q3_counter", "q3_interned"]
+
+# Unsigned 32-bit counters: 4 bytes per slot, up to 4,294,967,295 per key.
+COUNT_TYPECODE = "I"
+
+
+def add_count(counts: array, value_id: int, amount: int = 1) -> None:
+    """Adds `amount` to the counter of an id, growing the array with zeros."""
+    missing = value_id + 1 - len(counts)
+    if missing > 0:
+        counts.frombytes(bytes(missing * counts.itemsize))
+    counts[value_id] += amount
+
+
+def run_variant(variant: str, file_path: str) -> None:
+    """Runs one aggregation variant over the whole file."""
+    decode = make_json_decoder(("date", "user", "mentionedUsers"))
+    q1_dict = {}
+    q1_interned = DateUserCounter()
+    q3_counter = Counter()
+    q3_ids = StringInterner()
+    q3_counts = array(COUNT_TYPECODE)
+
+    for raw_line in iter_lines(file_path):
+        try:
+            tweet_data = decode(raw_line)
+        except JSON_DECODE_ERRORS:
+            continue
+
+        if variant == "q1_dict":
+            user_data = tweet_data.get("user") or {}
+            username = user_data.get("username")
+            tweet_date_str = tweet_data.get("date")
+            if not tweet_date_str or not username:
+                continue
+            tweet_date = datetime.fromisoformat(tweet_date_str).date()
+            user_volume_map = q1_dict.setdefault(tweet_date, {})
+            user_volume_map[username] = user_volume_map.get(username, 0) + 1
+        elif variant == "q1_interned":
+            count_tweet_date_user(tweet_data, q1_interned)
+        elif variant in ("q3_counter", "q3_interned"):
+            mentioned = tweet_data.get("mentionedUsers")
+            if not isinstance(mentioned, list):
+                continue
+            for user in mentioned:
+                username = user.get("username")
+                if not username:
+                    continue
+                if variant == "q3_counter":
+                    q3_counter[username] += 1
+                else:
+                    add_count(q3_counts, q3_ids.intern(username))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--file", required=True, help="Tweets JSON lines file.")
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.file)
+        # ru_maxrss is reported in KiB on Linux.
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+        return
+
+    peaks = {}
+    for variant in VARIANTS:
+        output = subprocess.run(  # nosec B603
+            [sys.executable, __file__, "--file", args.file, "--variant", variant],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        peaks[variant] = int(output.split()[-1])
+
+    print(f"{'variant':<14}{'peak RSS (MiB)':>16}{'over baseline (MiB)':>22}")
+    for variant in VARIANTS:
+        peak = peaks[variant] / 1024
+        extra = (peaks[variant] - peaks["baseline"]) / 1024
+        print(f"{variant:<14}{peak:>16.1f}{extra:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
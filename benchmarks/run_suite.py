@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+"""run_suite.py
+
+Reproducible benchmark suite for the Q1/Q2/Q3 engines. Generates (or reuses) a
+synthetic tweets file, runs every engine in its own subprocess and records wall
+time, CPU time (including worker processes), peak RSS and throughput (lines/s,
+MB/s) in a JSON report. With --compare, the report is checked against a previous
+run and slowdowns or memory growth above --threshold are flagged.
+
+Usage:
+    python benchmarks/run_suite.py --size 100MB --output report.json
+    python benchmarks/run_suite.py --size 100MB --compare report.json --output new.json
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str((Path(__file__).resolve().parent.parent / "src").resolve()))
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess  # nosec B404
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from synthetic_tweets import generate_tweets, parse_size
+
+
+def engine_functions() -> Dict[str, Callable[[str, int], Any]]:
+    """Maps each engine name to a callable (file_path, top_n) -> result."""
+    from approx import q1_approx, q2_approx, q3_approx
+    from fused import fused_scan
+    from parallel import parallel_solve
+    from q1_memory import q1_memory
+    from q1_time import q1_time
+    from q2_memory import q2_memory
+    from q2_time import q2_time
+    from q3_memory import q3_memory
+    from q3_time import q3_time
+
+    return {
+        "baseline": lambda file_path, top_n: None,
+        "q1_time": q1_time,
+        "q1_memory": q1_memory,
+        "q1_parallel": lambda file_path, top_n: parallel_solve("q1", file_path, top_n),
+        "q1_approx": q1_approx,
+        "q2_time": q2_time,
+        "q2_memory": q2_memory,
+        "q2_parallel": lambda file_path, top_n: parallel_solve("q2", file_path, top_n),
+        "q2_approx": q2_approx,
+        "q3_time": q3_time,
+        "q3_memory": q3_memory,
+        "q3_parallel": lambda file_path, top_n: parallel_solve("q3", file_path, top_n),
+        "q3_approx": q3_approx,
+        "fused": fused_scan,
+    }
+
+
+ENGINES = list(engine_functions())
+
+
+def run_engine(engine: str, file_path: str, top_n: int) -> Dict[str, float]:
+    """Runs one engine in this process and measures it."""
+    function = engine_functions()[engine]
+    usage_before = [
+        resource.getrusage(who)
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    ]
+    start = time.perf_counter()
+    function(file_path, top_n)
+    wall_seconds = time.perf_counter() - start
+    usage_after = [
+        resource.getrusage(who)
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    ]
+
+    cpu_seconds = sum(
+        (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+        for before, after in zip(usage_before, usage_after)
+    )
+    # ru_maxrss is reported in KiB on Linux.
+    return {
+        "wall_seconds": wall_seconds,
+        "cpu_seconds": cpu_seconds,
+        "peak_rss_mib": usage_after[0].ru_maxrss / 1024,
+        "children_peak_rss_mib": usage_after[1].ru_maxrss / 1024,
+    }
+
+
+def measure(engine: str, file_path: str, top_n: int) -> Dict[str, float]:
+    """Runs one engine in a fresh subprocess, so its peak RSS is its own."""
+    output = subprocess.run(  # nosec B603
+        [
+            sys.executable,
+            __file__,
+            "--engine",
+            engine,
+            "--file",
+            file_path,
+            "--top_n",
+            str(top_n),
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def count_lines(file_path: str) -> int:
+    """Counts the lines of a local file."""
+    lines = 0
+    with open(file_path, "rb") as infile:
+        while chunk := infile.read(8 * 1024 * 1024):
+            lines += chunk.count(b"\n")
+    return lines
+
+
+def compare_reports(
+    previous: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> List[str]:
+    """
+    Compares the engines present in both reports.
+
+    Args:
+        previous: Report of a previous run.
+        current: Report of this run.
+        threshold: Relative increase (e.g. 0.1 for 10%) flagged as a regression.
+
+    Returns:
+        Descriptions of the regressions found.
+    """
+    regressions = []
+    print(f"\n{'engine':<14}{'wall':>12}{'peak RSS':>12}")
+    for engine, result in current["results"].items():
+        old = previous.get("results", {}).get(engine)
+        if not old or engine == "baseline":
+            continue
+        changes = {}
+        for metric in ("wall_seconds", "peak_rss_mib"):
+            changes[metric] = result[metric] / old[metric] - 1 if old[metric] else 0.0
+            if changes[metric] > threshold:
+                regressions.append(
+                    f"{engine}: {metric} {old[metric]:.2f} -> {result[metric]:.2f} "
+                    f"({changes[metric]:+.0%})"
+                )
+        print(
+            f"{engine:<14}{changes['wall_seconds']:>+12.1%}"
+            f"{changes['peak_rss_mib']:>+12.1%}"
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--file", help="Existing tweets file (skips generation).")
+    parser.add_argument("--size", default="10MB", help="Synthetic file size.")
+    parser.add_argument("--emoji_density", type=float, default=0.3)
+    parser.add_argument("--user_cardinality", type=int, default=50_000)
+    parser.add_argument("--mention_cardinality", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--data_dir",
+        default=str(Path(tempfile.gettempdir()) / "tweets_benchmarks"),
+        help="Directory where synthetic files are generated and reused.",
+    )
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=ENGINES,
+        default=[engine for engine in ENGINES if engine != "baseline"],
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per engine.")
+    parser.add_argument("--top_n", type=int, default=10)
+    parser.add_argument("--output", help="Path of the JSON report to write.")
+    parser.add_argument("--compare", help="Previous JSON report to compare with.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative increase flagged as a regression (default 0.1 = 10%%).",
+    )
+    parser.add_argument("--engine", choices=ENGINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.engine:
+        print(json.dumps(run_engine(args.engine, args.file, args.top_n)))
+        return
+
+    dataset: Dict[str, Any]
+    if args.file:
+        file_path = args.file
+        dataset = {"file": file_path}
+    else:
+        dataset = {
+            "size": parse_size(args.size),
+            "emoji_density": args.emoji_density,
+            "user_cardinality": args.user_cardinality,
+            "mention_cardinality": args.mention_cardinality,
+            "seed": args.seed,
+        }
+        name = "tweets-" + "-".join(str(value) for value in dataset.values()) + ".json"
+        file_path = str(Path(args.data_dir) / name)
+        if not Path(file_path).exists():
+            print(f"Generating {file_path}...")
+            tmp_path = f"{file_path}.part"
+            generate_tweets(tmp_path, **dataset)
+            os.replace(tmp_path, file_path)
+
+    dataset["bytes"] = Path(file_path).stat().st_size
+    dataset["lines"] = count_lines(file_path)
+    megabytes = dataset["bytes"] / 1024**2
+
+    results = {}
+    print(
+        f"{'engine':<14}{'wall (s)':>10}{'cpu (s)':>10}{'peak RSS (MiB)':>16}"
+        f"{'lines/s':>12}{'MB/s':>8}"
+    )
+    for engine in ["baseline"] + [e for e in args.engines if e != "baseline"]:
+        runs = [measure(engine, file_path, args.top_n) for _ in range(args.repeat)]
+        result = {
+            metric: statistics.median(run[metric] for run in runs) for metric in runs[0]
+        }
+        # The baseline only measures interpreter and import overhead.
+        wall_seconds = result["wall_seconds"] if engine != "baseline" else 0.0
+        result["lines_per_second"] = (
+            dataset["lines"] / wall_seconds if wall_seconds else 0.0
+        )
+        result["mb_per_second"] = megabytes / wall_seconds if wall_seconds else 0.0
+        results[engine] = result
+        print(
+            f"{engine:<14}{result['wall_seconds']:>10.2f}{result['cpu_seconds']:>10.2f}"
+            f"{result['peak_rss_mib']:>16.1f}{result['lines_per_second']:>12.0f}"
+            f"{result['mb_per_second']:>8.1f}"
+        )
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "dataset": dataset,
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare_reports(previous, report, args.threshold)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""startup_time.py
+
+Startup benchmark of the CLI: for each method, measures in a fresh interpreter
+the time to import `main.py` plus the solver modules the method needs, the wall
+time of the whole process (interpreter startup included) and which heavy
+dependencies (pandas, pyarrow, GCP clients) ended up loaded.
+
+Usage:
+    python benchmarks/startup_time.py --repeat 10
+    python benchmarks/startup_time.py --output startup.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess  # nosec B404
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+SRC_DIR = str((Path(__file__).resolve().parent.parent / "src").resolve())
+
+# Modules imported by each method once `main.get_result` selects it.
+SCENARIOS: Dict[str, List[str]] = {
+    "help": [],
+    "memory": ["q1_memory", "q2_memory", "q3_memory"],
+    "time": ["q1_time", "q2_time", "q3_time"],
+    "fused": ["fused"],
+    "parallel": ["parallel"],
+    "sharded": ["sharded"],
+    "approx": ["approx"],
+    "incremental": ["incremental"],
+    "indexed": ["time_index"],
+    "server": ["server"],
+}
+HEAVY_MODULES = (
+    "pandas",
+    "pyarrow",
+    "google.cloud.storage",
+    "google.cloud.bigquery",
+)
+
+PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {src_dir!r})
+import main
+for module in {modules!r}:
+    importlib.import_module(module)
+print(json.dumps({{
+    "import_seconds": time.perf_counter() - start,
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(modules: List[str]) -> Dict[str, object]:
+    """Imports main plus `modules` in a fresh interpreter and measures it."""
+    code = PROBE.format(src_dir=SRC_DIR, modules=modules, heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    output = subprocess.run(  # nosec B603
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    result = json.loads(output.splitlines()[-1])
+    result["process_seconds"] = time.perf_counter() - start
+    return result
+
+
+def measure_interpreter() -> float:
+    """Wall time of starting and stopping a bare interpreter."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)  # nosec B603
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario.")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--output", help="Path of the JSON report to write.")
+    args = parser.parse_args()
+
+    interpreter = [measure_interpreter() for _ in range(args.repeat)]
+    report = {"interpreter_seconds": statistics.median(interpreter), "scenarios": {}}
+    print(f"Bare interpreter: {report['interpreter_seconds'] * 1000:.0f} ms\n")
+    print(f"{'scenario':<13}{'imports (ms)':>14}{'process (ms)':>14}  heavy modules")
+
+    for scenario in args.scenarios:
+        runs = [measure(SCENARIOS[scenario]) for _ in range(args.repeat)]
+        result = {
+            "import_seconds": statistics.median(r["import_seconds"] for r in runs),
+            "process_seconds": statistics.median(r["process_seconds"] for r in runs),
+            "heavy_modules": runs[0]["heavy_modules"],
+        }
+        report["scenarios"][scenario] = result
+        print(
+            f"{scenario:<13}{result['import_seconds'] * 1000:>14.0f}"
+            f"{result['process_seconds'] * 1000:>14.0f}  "
+            f"{', '.join(result['heavy_modules']) or '-'}"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""synthetic_tweets.py
+
+Generator of synthetic tweet JSON lines files with the same shape as the
+challenge dataset (nested `user`, `content`, `mentionedUsers` and the usual
+extra fields), for benchmarking at sizes the real file does not reach.
+
+The size is a target in bytes (e.g. "10MB", "10GB"); emoji density (share of
+tweets containing emojis) and user/mention cardinality are configurable. Users
+and mentions follow a skewed distribution, so there are heavy hitters and a
+long tail as in the real data. Output is deterministic for a given seed.
+
+Usage:
+    python benchmarks/synthetic_tweets.py --size 100MB --output /tmp/tweets.json
+"""
+
+import argparse
+import json
+import random
+import re
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
+
+WORDS = (
+    "farmers protest india delhi border support justice kisan government laws "
+    "peaceful march today we stand with the people of punjab haryana voice "
+    "rights agriculture bill repeal solidarity world watching"
+).split()
+NON_ASCII_WORDS = ["किसान", "आंदोलन", "ਕਿਸਾਨ", "ਮਜ਼ਦੂਰ", "ਏਕਤਾ", "जय", "जवान"]
+EMOJIS = [
+    "🙏",
+    "🙏🏽",
+    "🇮🇳",
+    "❤️",
+    "😂",
+    "🔥",
+    "💪",
+    "🚜",
+    "👨‍🌾",
+    "👩🏽‍🌾",
+    "✊",
+    "😢",
+    "💚",
+    "👇",
+    "1️⃣",
+]
+
+START_DATE = datetime(2021, 2, 12, tzinfo=timezone.utc)
+DATE_SPAN_DAYS = 12
+
+
+def parse_size(size: str) -> int:
+    """
+    Parses a human readable size such as "10MB" or "1.5GB".
+
+    Args:
+        size: Size with an optional B/KB/MB/GB/TB suffix (binary multiples).
+
+    Returns:
+        Size in bytes.
+    """
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?B)?\s*", size.upper())
+    if not match:
+        raise ValueError(f"Invalid size: {size}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2) or "B"])
+
+
+def skewed_index(rng: random.Random, cardinality: int) -> int:
+    """Picks an index in [0, cardinality) with low indexes much more likely."""
+    return min(int(cardinality * rng.random() ** 4), cardinality - 1)
+
+
+def make_tweet(
+    rng: random.Random,
+    tweet_id: int,
+    emoji_density: float,
+    user_cardinality: int,
+    mention_cardinality: int,
+    date_span_days: int = DATE_SPAN_DAYS,
+) -> Dict[str, Any]:
+    """Builds one synthetic tweet record."""
+    username = f"user_{skewed_index(rng, user_cardinality)}"
+    date = START_DATE + timedelta(seconds=rng.randrange(date_span_days * 24 * 3600))
+
+    words: List[str] = rng.choices(WORDS, k=rng.randint(6, 30))
+    if rng.random() < 0.3:
+        words.insert(rng.randrange(len(words)), rng.choice(NON_ASCII_WORDS))
+    if rng.random() < emoji_density:
+        for _ in range(rng.randint(1, 4)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(EMOJIS))
+
+    mentioned_users = None
+    if rng.random() < 0.4:
+        mentioned_users = []
+        for _ in range(rng.randint(1, 3)):
+            mention = f"mention_{skewed_index(rng, mention_cardinality)}"
+            words.insert(0, f"@{mention}")
+            mentioned_users.append(
+                {
+                    "username": mention,
+                    "id": zlib.crc32(mention.encode()),
+                    "displayname": mention.title(),
+                    "url": f"https://twitter.com/{mention}",
+                }
+            )
+
+    content = " ".join(words) + " #FarmersProtest"
+    return {
+        "url": f"https://twitter.com/{username}/status/{tweet_id}",
+        "date": date.isoformat(),
+        "content": content,
+        "renderedContent": content,
+        "id": tweet_id,
+        "user": {
+            "username": username,
+            "displayname": username.title(),
+            "id": zlib.crc32(username.encode()),
+            "description": "Synthetic account used for benchmarks",
+            "verified": False,
+            "followersCount": rng.randrange(10_000),
+            "location": "India",
+        },
+        "replyCount": rng.randrange(10),
+        "retweetCount": rng.randrange(100),
+        "likeCount": rng.randrange(500),
+        "lang": "en",
+        "source": "Twitter for Android",
+        "mentionedUsers": mentioned_users,
+    }
+
+
+def generate_tweets(
+    output_path: str,
+    size: int,
+    emoji_density: float = 0.3,
+    user_cardinality: int = 50_000,
+    mention_cardinality: int = 20_000,
+    malformed_ratio: float = 0.0,
+    seed: int = 0,
+    date_span_days: int = DATE_SPAN_DAYS,
+) -> Dict[str, int]:
+    """
+    Writes synthetic tweets until the file reaches `size` bytes.
+
+    Args:
+        output_path: Destination JSON lines file.
+        size: Target size in bytes.
+        emoji_density: Share of tweets with emojis (0 to 1).
+        user_cardinality: Number of distinct authors.
+        mention_cardinality: Number of distinct mentioned users.
+        malformed_ratio: Share of lines that are not valid JSON.
+        seed: Random seed.
+        date_span_days: Number of days the tweet dates are spread over.
+
+    Returns:
+        Dictionary with the number of lines and bytes written.
+    """
+    rng = random.Random(seed)
+    written = 0
+    lines = 0
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output_path, "wb") as outfile:
+        while written < size:
+            if rng.random() < malformed_ratio:
+                line = b'{"content": "truncated record\n'
+            else:
+                tweet = make_tweet(
+                    rng,
+                    lines,
+                    emoji_density,
+                    user_cardinality,
+                    mention_cardinality,
+                    date_span_days,
+                )
+                line = (json.dumps(tweet, ensure_ascii=False) + "\n").encode("utf-8")
+            outfile.write(line)
+            written += len(line)
+            lines += 1
+
+    return {"lines": lines, "bytes": written}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--size", default="10MB", help="Target size, e.g. 10MB.")
+    parser.add_argument("--output", required=True, help="Output JSON lines file.")
+    parser.add_argument("--emoji_density", type=float, default=0.3)
+    parser.add_argument("--user_cardinality", type=int, default=50_000)
+    parser.add_argument("--mention_cardinality", type=int, default=20_000)
+    parser.add_argument("--malformed_ratio", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=DATE_SPAN_DAYS,
+        help="Number of days the tweet dates are spread over.",
+    )
+    args = parser.parse_args()
+
+    stats = generate_tweets(
+        args.output,
+        parse_size(args.size),
+        args.emoji_density,
+        args.user_cardinality,
+        args.mention_cardinality,
+        args.malformed_ratio,
+        args.seed,
+        args.days,
+    )
+    print(f"Wrote {stats['lines']} lines ({stats['bytes']} bytes) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
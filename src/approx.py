@@ -0,0 +1,273 @@
+"""approx.py
+
+Module for approximate top-N answers to Q1, Q2 and Q3 with bounded memory.
+Emoji and mention counts use a Space-Saving sketch of ceil(1 / epsilon) counters
+instead of an exact Counter; Q1 keeps exact tweet totals per day and one sketch
+of users per day. Reported counts overestimate the true ones by at most
+epsilon * N, where N is the number of counted items, and the actual bound is logged.
+
+The sketches plug into the exact aggregators of the record pipeline: they keep
+the fields and per-tweet update of each question and replace its state, merge,
+encoding and top-N selection. Partial sketches merge within the same bound.
+"""
+
+import logging
+from array import array
+from datetime import date
+from functools import partial
+from typing import Dict, List, Tuple
+
+from pipeline import Aggregator, get_aggregators, run_serial
+from ranking import top_items
+from sketches import SpaceSaving
+from state_codec import (
+    array_from_bytes,
+    array_to_bytes,
+    pack_sections,
+    unpack_sections,
+)
+
+DEFAULT_EPSILON = 0.001
+
+
+class DailyHeavyHitters:
+    """Exact tweet totals per day plus a Space-Saving sketch of users per day."""
+
+    def __init__(self, epsilon: float = DEFAULT_EPSILON) -> None:
+        # Validates epsilon (0 < epsilon < 1) before any per-day sketch exists.
+        self.capacity = SpaceSaving.from_error(epsilon).capacity
+        self.date_totals: Dict[date, int] = {}
+        self.user_sketches: Dict[date, SpaceSaving] = {}
+
+    def add(self, tweet_date: date, username: str, count: int = 1) -> None:
+        """
+        Adds tweets of a user on a date.
+
+        Args:
+            tweet_date: Date of the tweets.
+            username: Author of the tweets.
+            count: Number of tweets to add (default is 1).
+        """
+        sketch = self.user_sketches.get(tweet_date)
+        if sketch is None:
+            sketch = self.user_sketches[tweet_date] = SpaceSaving(self.capacity)
+            self.date_totals[tweet_date] = 0
+        sketch.add(username, count)
+        self.date_totals[tweet_date] += count
+
+    def merge(self, other: "DailyHeavyHitters") -> None:
+        """
+        Merges another partial state into this one: day totals are added and
+        the user sketches of each day are merged.
+
+        Args:
+            other: State built with the same epsilon.
+
+        Raises:
+            ValueError: If the states were built with different epsilons.
+        """
+        if other.capacity != self.capacity:
+            raise ValueError("Cannot merge sketches of different capacities")
+        for tweet_date, other_sketch in other.user_sketches.items():
+            sketch = self.user_sketches.get(tweet_date)
+            if sketch is None:
+                sketch = self.user_sketches[tweet_date] = SpaceSaving(self.capacity)
+                self.date_totals[tweet_date] = 0
+            sketch.merge(other_sketch)
+            self.date_totals[tweet_date] += other.date_totals[tweet_date]
+
+    def to_bytes(self) -> bytes:
+        """
+        Encodes the state in the compact binary format of `state_codec`: the
+        capacity, date ordinals, day totals and the sections of each day's sketch.
+        """
+        header = array("Q", [self.capacity])
+        ordinals = array("I", (d.toordinal() for d in self.user_sketches))
+        totals = array("Q", self.date_totals.values())
+        return pack_sections(
+            [
+                array_to_bytes(header),
+                array_to_bytes(ordinals),
+                array_to_bytes(totals),
+                *(
+                    section
+                    for sketch in self.user_sketches.values()
+                    for section in sketch.to_sections()
+                ),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DailyHeavyHitters":
+        """Rebuilds a state encoded with `to_bytes`."""
+        header, ordinals, totals, *sketch_sections = unpack_sections(data)
+        (capacity,) = array_from_bytes("Q", header)
+        state = cls()
+        state.capacity = capacity
+        for index, (ordinal, total) in enumerate(
+            zip(array_from_bytes("I", ordinals), array_from_bytes("Q", totals))
+        ):
+            tweet_date = date.fromordinal(ordinal)
+            sections = sketch_sections[4 * index : 4 * index + 4]
+            state.user_sketches[tweet_date] = SpaceSaving.from_sections(
+                capacity, total, sections
+            )
+            state.date_totals[tweet_date] = total
+        return state
+
+    def top_dates(self, top_n: int) -> List[Tuple[date, str]]:
+        """
+        Picks the top N dates by exact tweet volume and the user with the highest
+        estimated count on each of them.
+
+        Args:
+            top_n: Number of top dates to return.
+
+        Returns:
+            A list of tuples: (date, estimated_most_active_user).
+        """
+        result = []
+        for tweet_date, total in top_items(self.date_totals.items(), top_n):
+            sketch = self.user_sketches[tweet_date]
+            username, estimate, error = sketch.top(1)[0]
+            logging.info(
+                "q1 approx %s: %d tweets, top user %s with %d-%d tweets "
+                "(counts overestimate by at most %d)",
+                tweet_date,
+                total,
+                username,
+                estimate - error,
+                estimate,
+                sketch.max_error,
+            )
+            result.append((tweet_date, username))
+
+        return result
+
+
+def log_sketch_guarantee(question: str, sketch: SpaceSaving) -> None:
+    """
+    Logs the error guarantee of a Space-Saving sketch after the scan.
+
+    Args:
+        question: 'q2' or 'q3'
+        sketch: Sketch used to count the question's items.
+    """
+    logging.info(
+        "%s approx: %d counters for %d items; every count overestimates by at most "
+        "%d (bound epsilon * N = %.1f)",
+        question,
+        sketch.capacity,
+        sketch.total,
+        sketch.max_error,
+        sketch.total / sketch.capacity,
+    )
+
+
+def select_sketch_top(
+    sketch: SpaceSaving, top_n: int, question: str
+) -> List[Tuple[str, int]]:
+    """Logs the guarantee of a question's sketch and returns its top N items."""
+    log_sketch_guarantee(question, sketch)
+    return sketch.most_common(top_n)
+
+
+def get_approx_aggregator(question: str, epsilon: float) -> Aggregator:
+    """
+    Builds the sketch-based variant of a question's aggregator.
+
+    Args:
+        question: 'q1', 'q2', or 'q3'
+        epsilon: Relative error bound of the sketches.
+
+    Returns:
+        The exact aggregator with its state, merge, encoding and selection
+        replaced by sketches.
+    """
+    aggregator = get_aggregators([question])[question]
+    if question == "q1":
+        return aggregator._replace(
+            new_state=partial(DailyHeavyHitters, epsilon),
+            merge=DailyHeavyHitters.merge,
+            select=DailyHeavyHitters.top_dates,
+            serialize=DailyHeavyHitters.to_bytes,
+            deserialize=DailyHeavyHitters.from_bytes,
+        )
+    return aggregator._replace(
+        new_state=partial(SpaceSaving.from_error, epsilon),
+        merge=SpaceSaving.merge,
+        select=partial(select_sketch_top, question=question),
+        serialize=SpaceSaving.to_bytes,
+        deserialize=SpaceSaving.from_bytes,
+    )
+
+
+def approx_solve(
+    question: str, file_path: str, top_n: int = 10, epsilon: float = DEFAULT_EPSILON
+) -> List[Tuple]:
+    """
+    Answers a question approximately, in a single pass with bounded memory.
+
+    Args:
+        question: 'q1', 'q2', or 'q3'
+        file_path: Path to the tweets file (JSON lines format, local or cloud).
+        top_n: Number of top results to return (default is 10).
+        epsilon: Relative error bound of the sketches.
+
+    Returns:
+        The approximate result list of the question.
+    """
+    aggregators = {question: get_approx_aggregator(question, epsilon)}
+    return run_serial(aggregators, file_path, top_n)[question]
+
+
+def q1_approx(
+    file_path: str, top_n: int = 10, epsilon: float = DEFAULT_EPSILON
+) -> List[Tuple[date, str]]:
+    """
+    Approximates the top N dates with the most tweets and their most active user.
+    Day totals are exact; each day's top user comes from a bounded sketch.
+
+    Args:
+        file_path: Path to the tweets file (JSON lines format, local or cloud).
+        top_n: Number of top dates to return (default is 10).
+        epsilon: Relative error bound of the per-day user sketches.
+
+    Returns:
+        A list of tuples: (date, estimated_most_active_user).
+    """
+    return approx_solve("q1", file_path, top_n, epsilon)
+
+
+def q2_approx(
+    file_path: str, top_n: int = 10, epsilon: float = DEFAULT_EPSILON
+) -> List[Tuple[str, int]]:
+    """
+    Approximates the top N most used emojis with a bounded sketch.
+
+    Args:
+        file_path: Path to the tweets file (JSON lines format, local or cloud).
+        top_n: Number of top emojis to return (default is 10).
+        epsilon: Relative error bound of the sketch.
+
+    Returns:
+        List of tuples: (emoji, estimated_count).
+    """
+    return approx_solve("q2", file_path, top_n, epsilon)
+
+
+def q3_approx(
+    file_path: str, top_n: int = 10, epsilon: float = DEFAULT_EPSILON
+) -> List[Tuple[str, int]]:
+    """
+    Approximates the top N most mentioned usernames with a bounded sketch.
+
+    Args:
+        file_path: Path to the tweets file (JSON lines format, local or cloud).
+        top_n: Number of top usernames to return (default is 10).
+        epsilon: Relative error bound of the sketch.
+
+    Returns:
+        List of tuples: (username, estimated_mention_count).
+    """
+    return approx_solve("q3", file_path, top_n, epsilon)
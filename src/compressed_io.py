@@ -0,0 +1,387 @@
+"""compressed_io.py
+
+Module for reading gzip, bzip2 and zstd compressed tweet files as a stream.
+
+The compression is detected from the magic number at the start of the file, so
+the name of the file does not matter. Data is decompressed chunk by chunk while
+it is read, without a decompressed copy on disk or in memory. Concatenated
+gzip members, bzip2 streams and zstd frames are read one after another.
+
+zstd files made of several independent frames can also be split for parallel
+processing: the frame offsets come from the seek table of the zstd seekable
+format when the file has one, or from walking the frame headers otherwise.
+`write_zstd_frames` (also runnable as a script) writes such files, with frames
+of whole lines and a seek table. zstd support needs the `compression.zstd`
+module (Python 3.14+) or the optional `zstandard` package.
+
+Usage:
+    python src/compressed_io.py tweets.json tweets.json.zst --frame_size 4194304
+"""
+
+import argparse
+import bz2
+import struct
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from compression import zstd as zstd_stdlib
+except ImportError:  # pragma: no cover - before Python 3.14
+    zstd_stdlib = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+BZIP2_MAGIC = b"BZh"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+MAGIC_SIZE = 4
+
+# Skippable frames carry metadata; the seekable format stores its seek table in
+# one at the end of the file, followed by a footer ending in SEEKABLE_MAGIC.
+SKIPPABLE_MAGIC_MIN = 0x184D2A50
+SKIPPABLE_MAGIC_MAX = 0x184D2A5F
+SEEK_TABLE_MAGIC = 0x184D2A5E
+SEEKABLE_MAGIC = 0x8F92EAB1
+SEEK_TABLE_FOOTER_SIZE = 9
+
+# Uncompressed bytes per frame written by `write_zstd_frames`.
+ZSTD_FRAME_SIZE = 4 * 1024 * 1024
+ZSTD_LEVEL = 3
+
+
+def detect_compression(head: bytes) -> Optional[str]:
+    """
+    Identifies the compression of a file from its first bytes.
+
+    Args:
+        head: First bytes of the file (at least MAGIC_SIZE, when available).
+
+    Returns:
+        'gzip', 'bz2' or 'zstd', or None for uncompressed data.
+    """
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(BZIP2_MAGIC):
+        return "bz2"
+    if head.startswith(ZSTD_MAGIC):
+        return "zstd"
+    return None
+
+
+def new_zstd_decompressor() -> Any:
+    """Returns a zstd decompressor for a single frame."""
+    if zstd_stdlib is not None:
+        return zstd_stdlib.ZstdDecompressor()
+    if zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ImportError(
+        "Reading zstd files requires Python 3.14+ or the 'zstandard' package."
+    )
+
+
+def compress_zstd_frame(data: bytes, level: int = ZSTD_LEVEL) -> bytes:
+    """Compresses data into a single zstd frame."""
+    if zstd_stdlib is not None:
+        return zstd_stdlib.compress(data, level)
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ImportError(
+        "Writing zstd files requires Python 3.14+ or the 'zstandard' package."
+    )
+
+
+# Decompressor factories; each decompressor reads one gzip member, bzip2 stream
+# or zstd frame and then reports `eof`, leaving what follows in `unused_data`.
+DECOMPRESSORS: Dict[str, Callable[[], Any]] = {
+    "gzip": lambda: zlib.decompressobj(wbits=16 + zlib.MAX_WBITS),
+    "bz2": bz2.BZ2Decompressor,
+    "zstd": new_zstd_decompressor,
+}
+
+
+class StreamDecompressor:
+    """Decompresses a sequence of concatenated members/streams/frames."""
+
+    def __init__(self, compression: str) -> None:
+        if compression not in DECOMPRESSORS:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.new_decompressor = DECOMPRESSORS[compression]
+        self.decompressor = self.new_decompressor()
+        self.in_member = False
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decompresses the next bytes of the input."""
+        output = []
+        while data:
+            output.append(self.decompressor.decompress(data))
+            if self.decompressor.eof:
+                data = self.decompressor.unused_data
+                self.decompressor = self.new_decompressor()
+                self.in_member = False
+            else:
+                data = b""
+                self.in_member = True
+        return b"".join(output)
+
+    def finish(self) -> None:
+        """Checks that the input did not end in the middle of a member/frame."""
+        if self.in_member:
+            raise EOFError("Compressed input ended before the end of the stream")
+
+
+def iter_compressed_lines(
+    chunks: Iterator[bytes],
+    compression: str,
+    range_size: Optional[int] = None,
+    skip_first: bool = False,
+) -> Iterator[bytes]:
+    """
+    Decompresses a stream of chunks and splits it into lines.
+
+    A range of frames is read like a range of a plain file, with ownership
+    decided by where each line starts in the decompressed data: the range owns
+    the lines starting inside it, except the one at its very start when
+    `skip_first` is set, plus the line starting right at its end. Consecutive
+    ranges thus split a file without losing or repeating lines, even when lines
+    cross frame boundaries.
+
+    Args:
+        chunks: Compressed data, starting at a member/stream/frame boundary.
+        compression: 'gzip', 'bz2' or 'zstd'.
+        range_size: Compressed bytes of the range (a frame boundary), or None to
+            read the whole stream. Frames after the range are only decompressed
+            until the last owned line is complete.
+        skip_first: Whether the first line belongs to the previous range (True
+            for every range that does not start the file).
+
+    Yields:
+        Each line as bytes, including its trailing newline when present.
+    """
+    if range_size == 0:
+        return
+    stream = StreamDecompressor(compression)
+    consumed = 0
+    output_size = 0
+    # Decompressed size of the range, known once its last byte has been fed.
+    limit: Optional[int] = None
+    line_start = 0
+    pending = b""
+
+    for chunk in chunks:
+        if limit is None and range_size is not None:
+            if consumed + len(chunk) >= range_size:
+                split = range_size - consumed
+                data = stream.decompress(chunk[:split])
+                limit = output_size + len(data)
+                data += stream.decompress(chunk[split:])
+            else:
+                data = stream.decompress(chunk)
+        else:
+            data = stream.decompress(chunk)
+        consumed += len(chunk)
+        output_size += len(data)
+
+        lines = (pending + data).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if limit is not None and line_start > limit:
+                return
+            if line_start or not skip_first:
+                yield line + b"\n"
+            line_start += len(line) + 1
+        if limit is not None and line_start > limit:
+            return
+
+    stream.finish()
+    if pending and (line_start or not skip_first):
+        if limit is None or line_start <= limit:
+            yield pending
+
+
+def read_seek_table(data: Any) -> Optional[List[int]]:
+    """
+    Reads the frame offsets from the seek table of a seekable zstd file.
+
+    Args:
+        data: File content (bytes or a memory map).
+
+    Returns:
+        Start offsets of the data frames, or None if there is no seek table.
+    """
+    size = len(data)
+    if size < SEEK_TABLE_FOOTER_SIZE + 8:
+        return None
+    num_frames, descriptor, magic = struct.unpack_from(
+        "<IBI", data, size - SEEK_TABLE_FOOTER_SIZE
+    )
+    if magic != SEEKABLE_MAGIC:
+        return None
+    entry_size = 12 if descriptor & 0x80 else 8
+    table_size = 8 + num_frames * entry_size + SEEK_TABLE_FOOTER_SIZE
+    table_start = size - table_size
+    if table_start < 0:
+        return None
+    frame_magic, frame_size = struct.unpack_from("<II", data, table_start)
+    if frame_magic != SEEK_TABLE_MAGIC or frame_size != table_size - 8:
+        return None
+
+    offsets = []
+    position = 0
+    for i in range(num_frames):
+        offsets.append(position)
+        (compressed_size,) = struct.unpack_from(
+            "<I", data, table_start + 8 + i * entry_size
+        )
+        position += compressed_size
+    if position != table_start:
+        return None
+    return offsets
+
+
+def walk_zstd_frames(data: Any) -> List[int]:
+    """
+    Finds the frame offsets of a zstd file from its frame and block headers,
+    without decompressing anything.
+
+    Args:
+        data: File content (bytes or a memory map).
+
+    Returns:
+        Start offsets of the data frames (skippable frames are left out).
+    """
+    offsets = []
+    position = 0
+    size = len(data)
+    while position < size:
+        (magic,) = struct.unpack_from("<I", data, position)
+        if SKIPPABLE_MAGIC_MIN <= magic <= SKIPPABLE_MAGIC_MAX:
+            (frame_size,) = struct.unpack_from("<I", data, position + 4)
+            position += 8 + frame_size
+            continue
+        if magic != struct.unpack("<I", ZSTD_MAGIC)[0]:
+            raise ValueError(f"Invalid zstd frame at byte {position}")
+
+        offsets.append(position)
+        descriptor = data[position + 4]
+        single_segment = descriptor >> 5 & 1
+        content_size_bytes = (single_segment, 2, 4, 8)[descriptor >> 6]
+        dictionary_bytes = (0, 1, 2, 4)[descriptor & 3]
+        position += 5 + (not single_segment) + dictionary_bytes + content_size_bytes
+
+        last_block = False
+        while not last_block:
+            header = int.from_bytes(data[position : position + 3], "little")
+            last_block = bool(header & 1)
+            block_type = header >> 1 & 3
+            if block_type == 3:
+                raise ValueError(f"Invalid zstd block at byte {position}")
+            # RLE blocks store a single byte; raw and compressed ones their size.
+            position += 3 + (1 if block_type == 1 else header >> 3)
+        if descriptor >> 2 & 1:
+            position += 4  # content checksum
+    return offsets
+
+
+def get_zstd_frame_offsets(data: Any) -> List[int]:
+    """
+    Returns the start offsets of the data frames of a zstd file, from its seek
+    table when it has one.
+
+    Args:
+        data: File content (bytes or a memory map).
+
+    Returns:
+        Start offsets of the data frames, in order.
+    """
+    offsets = read_seek_table(data)
+    if offsets is None:
+        offsets = walk_zstd_frames(data)
+    return offsets
+
+
+def build_seek_table(frames: List[Tuple[int, int]]) -> bytes:
+    """
+    Builds the seek table of the zstd seekable format (without checksums).
+
+    Args:
+        frames: (compressed size, decompressed size) of each frame.
+
+    Returns:
+        The skippable frame holding the table, to append to the file.
+    """
+    entries = b"".join(struct.pack("<II", c, d) for c, d in frames)
+    footer = struct.pack("<IBI", len(frames), 0, SEEKABLE_MAGIC)
+    header = struct.pack("<II", SEEK_TABLE_MAGIC, len(entries) + SEEK_TABLE_FOOTER_SIZE)
+    return header + entries + footer
+
+
+def write_zstd_frames(
+    input_path: str,
+    output_path: str,
+    frame_size: int = ZSTD_FRAME_SIZE,
+    level: int = ZSTD_LEVEL,
+) -> int:
+    """
+    Compresses a JSON lines file into independent zstd frames of whole lines,
+    followed by a seek table, so the result can be split for parallel reading.
+
+    Args:
+        input_path: Uncompressed JSON lines file.
+        output_path: Path of the .zst file to write.
+        frame_size: Uncompressed bytes per frame (frames end at a line end, so
+            they can be slightly larger).
+        level: zstd compression level (default is 3).
+
+    Returns:
+        Number of data frames written.
+    """
+    frames: List[Tuple[int, int]] = []
+
+    with open(input_path, "rb") as infile, open(output_path, "wb") as outfile:
+
+        def write_frame(lines: List[bytes]) -> None:
+            data = b"".join(lines)
+            frame = compress_zstd_frame(data, level)
+            outfile.write(frame)
+            frames.append((len(frame), len(data)))
+
+        lines: List[bytes] = []
+        buffered = 0
+        for line in infile:
+            lines.append(line)
+            buffered += len(line)
+            if buffered >= frame_size:
+                write_frame(lines)
+                lines = []
+                buffered = 0
+        if lines or not frames:
+            write_frame(lines)
+        outfile.write(build_seek_table(frames))
+    return len(frames)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compresses a JSON lines file into seekable zstd frames."
+    )
+    parser.add_argument("input", help="Uncompressed JSON lines file.")
+    parser.add_argument("output", help="Path of the .zst file to write.")
+    parser.add_argument(
+        "--frame_size",
+        type=int,
+        default=ZSTD_FRAME_SIZE,
+        help="Uncompressed bytes per frame.",
+    )
+    parser.add_argument(
+        "--level", type=int, default=ZSTD_LEVEL, help="zstd compression level."
+    )
+    args = parser.parse_args()
+    frames = write_zstd_frames(args.input, args.output, args.frame_size, args.level)
+    print(f"Wrote {frames} frames to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
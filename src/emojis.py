@@ -0,0 +1,235 @@
+"""emojis.py
+
+Emoji extraction used by the Q2 solutions.
+
+Emojis are matched as whole sequences (what a user sees as one emoji): a base
+pictograph with its variation selector, skin-tone modifier or tag sequence, ZWJ
+sequences such as families or professions, regional-indicator pairs (flags) and
+keycaps. The base pictographs come from a precomputed table of codepoint ranges
+(Unicode `Extended_Pictographic`).
+
+A regex character class with that many ranges is slow to test on every
+character, so extraction works in stages:
+
+1. Pure ASCII texts (most tweets) are skipped without running any regex.
+2. A cheap pattern with a handful of wide ranges finds candidate runs.
+3. Single-codepoint candidates (the common case) are checked against a lookup
+   table; only multi-codepoint candidates go through the exact sequence
+   pattern, whose results are cached.
+"""
+
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List, Tuple
+
+# Unicode 15 `Extended_Pictographic` codepoint ranges (emoji-data.txt).
+EMOJI_RANGES: Tuple[Tuple[int, int], ...] = (
+    (0x00A9, 0x00A9),
+    (0x00AE, 0x00AE),
+    (0x203C, 0x203C),
+    (0x2049, 0x2049),
+    (0x2122, 0x2122),
+    (0x2139, 0x2139),
+    (0x2194, 0x2199),
+    (0x21A9, 0x21AA),
+    (0x231A, 0x231B),
+    (0x2328, 0x2328),
+    (0x2388, 0x2388),
+    (0x23CF, 0x23CF),
+    (0x23E9, 0x23F3),
+    (0x23F8, 0x23FA),
+    (0x24C2, 0x24C2),
+    (0x25AA, 0x25AB),
+    (0x25B6, 0x25B6),
+    (0x25C0, 0x25C0),
+    (0x25FB, 0x25FE),
+    (0x2600, 0x2605),
+    (0x2607, 0x2612),
+    (0x2614, 0x2685),
+    (0x2690, 0x2705),
+    (0x2708, 0x2712),
+    (0x2714, 0x2714),
+    (0x2716, 0x2716),
+    (0x271D, 0x271D),
+    (0x2721, 0x2721),
+    (0x2728, 0x2728),
+    (0x2733, 0x2734),
+    (0x2744, 0x2744),
+    (0x2747, 0x2747),
+    (0x274C, 0x274C),
+    (0x274E, 0x274E),
+    (0x2753, 0x2755),
+    (0x2757, 0x2757),
+    (0x2763, 0x2767),
+    (0x2795, 0x2797),
+    (0x27A1, 0x27A1),
+    (0x27B0, 0x27B0),
+    (0x27BF, 0x27BF),
+    (0x2934, 0x2935),
+    (0x2B05, 0x2B07),
+    (0x2B1B, 0x2B1C),
+    (0x2B50, 0x2B50),
+    (0x2B55, 0x2B55),
+    (0x3030, 0x3030),
+    (0x303D, 0x303D),
+    (0x3297, 0x3297),
+    (0x3299, 0x3299),
+    (0x1F000, 0x1F0FF),
+    (0x1F10D, 0x1F10F),
+    (0x1F12F, 0x1F12F),
+    (0x1F16C, 0x1F171),
+    (0x1F17E, 0x1F17F),
+    (0x1F18E, 0x1F18E),
+    (0x1F191, 0x1F19A),
+    (0x1F1AD, 0x1F1E5),
+    (0x1F201, 0x1F20F),
+    (0x1F21A, 0x1F21A),
+    (0x1F22F, 0x1F22F),
+    (0x1F232, 0x1F23A),
+    (0x1F23C, 0x1F23F),
+    (0x1F249, 0x1F3FA),
+    (0x1F400, 0x1F53D),
+    (0x1F546, 0x1F64F),
+    (0x1F680, 0x1F6FF),
+    (0x1F774, 0x1F77F),
+    (0x1F7D5, 0x1F7FF),
+    (0x1F80C, 0x1F80F),
+    (0x1F848, 0x1F84F),
+    (0x1F85A, 0x1F85F),
+    (0x1F888, 0x1F88F),
+    (0x1F8AE, 0x1F8FF),
+    (0x1F90C, 0x1F93A),
+    (0x1F93C, 0x1F945),
+    (0x1F947, 0x1FAFF),
+    (0x1FC00, 0x1FFFD),
+)
+
+
+def ranges_to_class(ranges: Tuple[Tuple[int, int], ...]) -> str:
+    """Builds the body of a regex character class from codepoint ranges."""
+    return "".join(
+        re.escape(chr(start))
+        if start == end
+        else f"{re.escape(chr(start))}-{re.escape(chr(end))}"
+        for start, end in ranges
+    )
+
+
+PICTOGRAPH_CLASS = ranges_to_class(EMOJI_RANGES)
+SKIN_TONE_CLASS = "\U0001f3fb-\U0001f3ff"
+REGIONAL_INDICATOR_CLASS = "\U0001f1e6-\U0001f1ff"
+
+PICTOGRAPH = f"[{PICTOGRAPH_CLASS}]"
+SKIN_TONE = f"[{SKIN_TONE_CLASS}]"
+REGIONAL_INDICATOR = f"[{REGIONAL_INDICATOR_CLASS}]"
+TAG_SEQUENCE = "[\U000e0020-\U000e007e]+\U000e007f"
+EMOJI_ELEMENT = (
+    f"(?:{PICTOGRAPH}(?:\ufe0f|{SKIN_TONE})?(?:{TAG_SEQUENCE})?|{SKIN_TONE})"
+)
+
+EMOJI_SEQUENCE_PATTERN = re.compile(
+    f"{EMOJI_ELEMENT}(?:\u200d{EMOJI_ELEMENT})*"
+    f"|{REGIONAL_INDICATOR}{{1,2}}"
+    "|[#*0-9]\ufe0f?\u20e3"
+)
+
+# Codepoints that are an emoji on their own (pictographs, skin tones, regional
+# indicators), as a lookup table.
+EMOJI_CODEPOINTS = frozenset(
+    chr(codepoint)
+    for start, end in EMOJI_RANGES + ((0x1F1E6, 0x1F1FF), (0x1F3FB, 0x1F3FF))
+    for codepoint in range(start, end + 1)
+)
+
+# Few wide ranges covering every emoji codepoint (and some non-emoji ones, which
+# the lookup table filters out), cheap to test for each character.
+CANDIDATE_CLASS = "\u00a9\u00ae\u203c-\u3299\U0001f000-\U0001fffd"
+EMOJI_CANDIDATE_PATTERN = re.compile(
+    f"[{CANDIDATE_CLASS}]"
+    f"(?:[\ufe0f{SKIN_TONE_CLASS}{REGIONAL_INDICATOR_CLASS}\U000e0020-\U000e007f]"
+    f"|\u200d[{CANDIDATE_CLASS}])*"
+)
+KEYCAP = "\u20e3"
+KEYCAP_PATTERN = re.compile("[#*0-9]\ufe0f?\u20e3")
+
+
+def may_contain_emojis(line: bytes) -> bool:
+    """
+    Cheap prefilter on a raw JSON line: False only when the line cannot contain
+    an emoji, so it can be skipped without decoding.
+
+    Emojis are never ASCII, so an ASCII-only line can only carry them as
+    `\\u` escapes (JSON written with `ensure_ascii`).
+
+    Args:
+        line: Raw JSON line.
+
+    Returns:
+        Whether the line may contain an emoji.
+    """
+    return not line.isascii() or b"\\u" in line
+
+
+@lru_cache(maxsize=4096)
+def split_emoji_candidate(candidate: str) -> Tuple[str, ...]:
+    """Splits a multi-codepoint candidate run into its exact emoji sequences."""
+    return tuple(EMOJI_SEQUENCE_PATTERN.findall(candidate))
+
+
+def extract_emojis(text: str) -> List[str]:
+    """
+    Extracts the emojis of a text, each full emoji sequence as one item.
+
+    Args:
+        text: Text to scan (e.g. a tweet's content).
+
+    Returns:
+        List of emoji sequences in order of appearance.
+    """
+    # Emojis (and keycaps, through U+20E3) are never ASCII.
+    if text.isascii():
+        return []
+
+    candidates = EMOJI_CANDIDATE_PATTERN.findall(text)
+    if EMOJI_CODEPOINTS.issuperset(candidates):
+        return candidates
+    # Keycaps start with an ASCII character, outside of the candidate runs.
+    if KEYCAP in text:
+        return EMOJI_SEQUENCE_PATTERN.findall(text)
+
+    emojis = []
+    for candidate in candidates:
+        if candidate in EMOJI_CODEPOINTS:
+            emojis.append(candidate)
+        elif len(candidate) > 1:
+            emojis.extend(split_emoji_candidate(candidate))
+    return emojis
+
+
+def count_emojis(text: str, emoji_counter: Counter) -> None:
+    """
+    Adds the emojis of a text to the counter, with the same sequences as
+    `extract_emojis`.
+
+    Meant for large texts (e.g. many tweets joined by newlines): candidate runs
+    are counted at C speed and each distinct candidate is resolved only once,
+    without building a list of emojis.
+
+    Args:
+        text: Text to scan.
+        emoji_counter: Counter of emoji occurrences to update.
+    """
+    if text.isascii():
+        return
+
+    candidate_counts = Counter(EMOJI_CANDIDATE_PATTERN.findall(text))
+    for candidate, count in candidate_counts.items():
+        if candidate in EMOJI_CODEPOINTS:
+            emoji_counter[candidate] += count
+        elif len(candidate) > 1:
+            for emoji in split_emoji_candidate(candidate):
+                emoji_counter[emoji] += count
+    # Keycaps start with an ASCII character, outside of the candidate runs.
+    if KEYCAP in text:
+        emoji_counter.update(KEYCAP_PATTERN.findall(text))
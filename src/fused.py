@@ -0,0 +1,26 @@
+"""fused.py
+
+Module for answering Q1, Q2 and Q3 in a single pass over the tweets file.
+Each line is decoded once and fed to the date/user, emoji and mention
+aggregators of the memory-optimized solutions (see `pipeline.py`).
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from pipeline import get_aggregators, run_serial
+
+
+def fused_scan(file_path: str, top_n: int = 10) -> Dict[str, List[Tuple[Any, ...]]]:
+    """
+    Computes the results of Q1, Q2 and Q3 reading and decoding the file only once.
+    GCS files are streamed instead of downloaded.
+
+    Args:
+        file_path: Path to the tweets file (JSON lines format, local or cloud).
+        top_n: Number of top results to return for each question (default is 10).
+
+    Returns:
+        Dictionary {"q1": [...], "q2": [...], "q3": [...]} with the same result
+        lists the individual memory-optimized functions return.
+    """
+    return run_serial(get_aggregators(["q1", "q2", "q3"]), file_path, top_n)
@@ -0,0 +1,341 @@
+"""incremental.py
+
+Module for incremental aggregation over JSON lines files that only grow, or
+new files that are added over time. The Q1, Q2 and Q3 aggregates are persisted
+together with a manifest holding, per source file, the byte offset already
+processed and a hash of its first bytes. Each run reads only the bytes appended
+since the previous one (and files it has not seen) and merges them into the
+saved state, so the results equal a full recompute. A file that was truncated or
+rewritten invalidates the state, which is then rebuilt from scratch.
+Offsets are positions in the file itself, so compressed files are rejected.
+
+A GCS state is only overwritten if it is still the generation that was loaded,
+so overlapping runs (e.g. two scheduled jobs) never drop each other's merge: the
+run that loses the race reloads the newer state and applies its update again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import Counter
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import METRICS
+from q1_memory import TWEET_FIELDS as Q1_FIELDS
+from q1_memory import DateUserCounter, count_tweet_date_user
+from q2_memory import TWEET_FIELDS as Q2_FIELDS
+from q2_memory import count_tweet_emojis
+from q3_memory import TWEET_FIELDS as Q3_FIELDS
+from q3_memory import count_tweet_mentions
+from ranking import top_counts
+from utils import (
+    JSON_DECODE_ERRORS,
+    get_compression,
+    get_file_size,
+    get_gcs_blob,
+    iter_lines,
+    make_json_decoder,
+    read_file_head,
+)
+
+STATE_VERSION = 1
+# Times a run reloads and reapplies its update when another run saved first.
+STATE_SAVE_ATTEMPTS = 3
+DEFAULT_STATE_PATH = os.environ.get(
+    "TWEETS_INCREMENTAL_STATE",
+    str(Path(tempfile.gettempdir()) / "tweets_incremental_state.json"),
+)
+# Number of leading bytes hashed to detect a file rewritten in place.
+HEAD_HASH_BYTES = 4096
+
+
+class StateConflictError(RuntimeError):
+    """The saved state changed since it was loaded: another run saved it."""
+
+
+class IncrementalState:
+    """Aggregates of Q1, Q2 and Q3 plus the manifest of processed bytes."""
+
+    def __init__(self) -> None:
+        self.tweet_volume_by_date_user = DateUserCounter()
+        self.emoji_counter = Counter()
+        self.mention_counter = Counter()
+        # Source path -> {"offset": processed bytes, "head_sha256": hash}
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        # GCS generation the state was loaded from (0: not saved yet), or None
+        # for local states.
+        self.generation: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converts the state to a JSON-serializable dictionary."""
+        volume = self.tweet_volume_by_date_user
+        return {
+            "version": STATE_VERSION,
+            "manifest": self.manifest,
+            "q1": {
+                "usernames": volume.usernames.values,
+                "dates": {
+                    tweet_date.isoformat(): [
+                        [user_id, count] for user_id, count in counts.items()
+                    ]
+                    for tweet_date, counts in volume.user_counts.items()
+                },
+            },
+            "q2": list(self.emoji_counter.items()),
+            "q3": list(self.mention_counter.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IncrementalState":
+        """Rebuilds a state saved with `to_dict`, keeping its key ordering."""
+        if data.get("version") != STATE_VERSION:
+            raise ValueError(f"Unsupported state version: {data.get('version')}")
+
+        state = cls()
+        state.manifest = data["manifest"]
+        usernames = data["q1"]["usernames"]
+        for username in usernames:
+            state.tweet_volume_by_date_user.usernames.intern(username)
+        for tweet_date, user_counts in data["q1"]["dates"].items():
+            for user_id, count in user_counts:
+                state.tweet_volume_by_date_user.add(
+                    date.fromisoformat(tweet_date), usernames[user_id], count
+                )
+        state.emoji_counter.update(dict(data["q2"]))
+        state.mention_counter.update(dict(data["q3"]))
+        return state
+
+    def results(self, top_n: int) -> Dict[str, List[Tuple[Any, ...]]]:
+        """
+        Computes the answers of every question from the aggregates.
+
+        Args:
+            top_n: Number of top results to return for each question.
+
+        Returns:
+            Dictionary {"q1": [...], "q2": [...], "q3": [...]}.
+        """
+        return {
+            "q1": self.tweet_volume_by_date_user.top_dates(top_n),
+            "q2": top_counts(self.emoji_counter, top_n),
+            "q3": top_counts(self.mention_counter, top_n),
+        }
+
+
+def load_state(state_path: str) -> IncrementalState:
+    """
+    Loads a saved state from a local path or GCS URI.
+
+    Args:
+        state_path: Location of the state JSON file.
+
+    Returns:
+        The saved state, or an empty one if nothing was saved yet.
+    """
+    generation = None
+    try:
+        if state_path.startswith("gs://"):
+            generation = 0
+            blob = get_gcs_blob(state_path)
+            raw_state = blob.download_as_bytes(if_generation_match=blob.generation)
+            generation = blob.generation
+        else:
+            raw_state = Path(state_path).read_bytes()
+    except FileNotFoundError:
+        logging.info("No incremental state at %s; starting from scratch.", state_path)
+        state = IncrementalState()
+    else:
+        state = IncrementalState.from_dict(json.loads(raw_state))
+    state.generation = generation
+    return state
+
+
+def save_state(state: IncrementalState, state_path: str) -> None:
+    """
+    Saves the state to a local path (atomically) or GCS URI. A GCS state is
+    only written if it is still at the generation the state was loaded from.
+
+    Args:
+        state: State to persist.
+        state_path: Location of the state JSON file.
+
+    Raises:
+        StateConflictError: If another run saved the GCS state in the meantime.
+    """
+    raw_state = json.dumps(state.to_dict(), ensure_ascii=False).encode("utf-8")
+    if state_path.startswith("gs://"):
+        from google.api_core.exceptions import PreconditionFailed
+        from google.cloud import storage
+
+        bucket_name, blob_path = state_path[5:].split("/", 1)
+        blob = storage.Client().bucket(bucket_name).blob(blob_path)
+        try:
+            blob.upload_from_string(
+                raw_state,
+                content_type="application/json",
+                if_generation_match=state.generation or 0,
+            )
+        except PreconditionFailed as e:
+            raise StateConflictError(
+                f"{state_path} was saved by another run since it was loaded"
+            ) from e
+    else:
+        path = Path(state_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(raw_state)
+        tmp_path.replace(path)
+    logging.info("Incremental state saved: %s", state_path)
+
+
+def head_hash(file_path: str, offset: int) -> str:
+    """Hashes the first bytes (up to `offset`) of a file."""
+    head = read_file_head(file_path, min(offset, HEAD_HASH_BYTES))
+    return hashlib.sha256(head).hexdigest()
+
+
+def process_new_bytes(state: IncrementalState, file_path: str, offset: int) -> int:
+    """
+    Aggregates the complete lines of a file starting at `offset`.
+
+    A trailing line without newline is only consumed if it decodes, so a line
+    still being written is read again on the next run.
+
+    Args:
+        state: State to update.
+        file_path: Path to the tweets file (GCS URI or local path).
+        offset: Byte offset where the unprocessed data starts.
+
+    Returns:
+        The new processed offset.
+
+    Raises:
+        ValueError: If the file is compressed.
+    """
+    if get_compression(file_path):
+        raise ValueError(
+            f"Incremental aggregation needs uncompressed input: {file_path}"
+        )
+    decode = make_json_decoder(Q1_FIELDS + Q2_FIELDS + Q3_FIELDS)
+    lines_read = 0
+    malformed_lines = 0
+    for raw_line in iter_lines(file_path, start=offset):
+        try:
+            tweet_data = decode(raw_line)
+        except JSON_DECODE_ERRORS:
+            if not raw_line.endswith(b"\n"):
+                break
+            offset += len(raw_line)
+            lines_read += 1
+            malformed_lines += 1
+            continue
+
+        offset += len(raw_line)
+        lines_read += 1
+        count_tweet_date_user(tweet_data, state.tweet_volume_by_date_user)
+        count_tweet_emojis(tweet_data, state.emoji_counter)
+        count_tweet_mentions(tweet_data, state.mention_counter)
+
+    METRICS.count_lines(lines_read, malformed_lines)
+    return offset
+
+
+def update_state(state: IncrementalState, file_paths: List[str]) -> IncrementalState:
+    """
+    Merges the bytes of the given files not yet in a loaded state.
+
+    Args:
+        state: State loaded with `load_state`.
+        file_paths: Tweet files (GCS URIs or absolute paths), in processing order.
+
+    Returns:
+        The updated state (a new one if the saved state had to be rebuilt).
+    """
+    for file_path, entry in state.manifest.items():
+        size = get_file_size(file_path) if file_path in file_paths else None
+        if (
+            file_path not in file_paths
+            or size < entry["offset"]
+            or head_hash(file_path, entry["offset"]) != entry["head_sha256"]
+        ):
+            logging.warning(
+                "%s was removed, truncated or rewritten; rebuilding the state.",
+                file_path,
+            )
+            rebuilt = IncrementalState()
+            rebuilt.generation = state.generation
+            state = rebuilt
+            break
+
+    for file_path in file_paths:
+        entry = state.manifest.get(file_path, {"offset": 0})
+        new_offset = process_new_bytes(state, file_path, entry["offset"])
+        logging.info(
+            "Incremental update of %s: processed bytes %d-%d",
+            file_path,
+            entry["offset"],
+            new_offset,
+        )
+        state.manifest[file_path] = {
+            "offset": new_offset,
+            "head_sha256": head_hash(file_path, new_offset),
+        }
+    return state
+
+
+def update_incremental(file_paths: List[str], state_path: str) -> IncrementalState:
+    """
+    Brings the saved state up to date with the given files and saves it. If
+    another run saves the state first, its state is reloaded and updated again.
+
+    Args:
+        file_paths: Tweet files (GCS URIs or local paths), in processing order.
+        state_path: Location of the state JSON file.
+
+    Returns:
+        The updated state.
+
+    Raises:
+        StateConflictError: If other runs kept saving first.
+    """
+    file_paths = [
+        path if path.startswith("gs://") else str(Path(path).resolve())
+        for path in file_paths
+    ]
+    for attempt in range(1, STATE_SAVE_ATTEMPTS + 1):
+        state = update_state(load_state(state_path), file_paths)
+        try:
+            save_state(state, state_path)
+        except StateConflictError:
+            if attempt == STATE_SAVE_ATTEMPTS:
+                raise
+            logging.warning(
+                "Another run saved %s first; reloading it (attempt %d of %d).",
+                state_path,
+                attempt + 1,
+                STATE_SAVE_ATTEMPTS,
+            )
+            continue
+        return state
+
+
+def incremental_scan(
+    file_paths: List[str], state_path: str, top_n: int = 10
+) -> Dict[str, List[Tuple[Any, ...]]]:
+    """
+    Updates the persisted aggregates with new data and answers Q1, Q2 and Q3.
+
+    Args:
+        file_paths: Tweet files (GCS URIs or local paths), in processing order.
+        state_path: Location of the state JSON file.
+        top_n: Number of top results to return for each question (default is 10).
+
+    Returns:
+        Dictionary {"q1": [...], "q2": [...], "q3": [...]} equal to a full
+        recompute over the same data.
+    """
+    return update_incremental(file_paths, state_path).results(top_n)
@@ -0,0 +1,41 @@
+"""interning.py
+
+Module provides string interning for the memory-optimized solutions. Each
+distinct string (e.g. a username) is stored once and mapped to a dense integer
+id, so structures that repeat a key across many buckets (Q1's per-date user
+counts, the hourly index) keep sparse {id: count} maps instead of one copy of
+the string per bucket.
+"""
+
+from typing import Dict, List
+
+
+class StringInterner:
+    """Assigns consecutive integer ids to strings, in first-seen order."""
+
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, value_id: int) -> str:
+        return self.values[value_id]
+
+    def intern(self, value: str) -> int:
+        """
+        Returns the id of a string, assigning the next free id on first sight.
+
+        Args:
+            value: String to intern.
+
+        Returns:
+            The integer id of the string.
+        """
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.ids[value] = value_id
+            self.values.append(value)
+        return value_id
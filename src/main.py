@@ -2,58 +2,173 @@
 
 Entrypoint script to run data challenge Q solutions from the command line.
 Uses argparse for parameters and logging for output.
+
+Solver modules are imported only once a question and method are selected, so a
+run only pays for the dependencies it uses (pandas for the 'time' methods,
+pyarrow for the tweet cache, the GCP clients for GCS paths and BigQuery).
 """
 
 import argparse
+import importlib
 import logging
-from typing import Any, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from q1_memory import q1_memory
-from q1_time import q1_time
-from q2_memory import q2_memory
-from q2_time import q2_time
-from q3_memory import q3_memory
-from q3_time import q3_time
-from utils import get_config_value, save_results_to_bq
+from approx import DEFAULT_EPSILON
+from incremental import DEFAULT_STATE_PATH
+from metrics import METRICS
+from result_sink import BigQueryResultSink, ResultSink, SQLiteResultSink
+from time_index import GRANULARITIES
+from utils import expand_file_paths, get_config_value
 
 logging.basicConfig(level=logging.INFO)
 
 
+QUESTIONS = ("q1", "q2", "q3")
+
+# A solver answers one question with a method: (question, file_path, top_n,
+# options) -> result, where options holds the method-specific CLI settings.
+Solver = Callable[[str, str, int, Dict[str, Any]], List[Tuple[Any, ...]]]
+
+
+def check_question(question: str) -> None:
+    """Raises ValueError for an unknown question."""
+    if question not in QUESTIONS:
+        raise ValueError(f"Unknown question: {question}")
+
+
+def solve_time(
+    question: str, file_path: str, top_n: int, options: Dict[str, Any]
+) -> List[Tuple[Any, ...]]:
+    """Runs the pandas solution of a question ('time')."""
+    check_question(question)
+    module = importlib.import_module(f"{question}_time")
+    return getattr(module, f"{question}_time")(file_path, top_n)
+
+
+def solve_memory(
+    question: str, file_path: str, top_n: int, options: Dict[str, Any]
+) -> List[Tuple[Any, ...]]:
+    """Streams the file through the question's aggregator ('memory')."""
+    from pipeline import get_aggregators, run_serial
+
+    aggregators = get_aggregators([question])
+    return run_serial(aggregators, file_path, top_n, line_filters=True)[question]
+
+
+def solve_fused(
+    question: str, file_path: str, top_n: int, options: Dict[str, Any]
+) -> List[Tuple[Any, ...]]:
+    """Answers every question in one pass and keeps one result ('fused')."""
+    check_question(question)
+    from fused import fused_scan
+
+    return fused_scan(file_path, top_n)[question]
+
+
+def solve_parallel(
+    question: str, file_path: str, top_n: int, options: Dict[str, Any]
+) -> List[Tuple[Any, ...]]:
+    """Aggregates byte ranges of the file in a process pool ('parallel')."""
+    from parallel import parallel_solve
+
+    return parallel_solve(question, file_path, top_n, options["workers"])
+
+
+def solve_approx(
+    question: str, file_path: str, top_n: int, options: Dict[str, Any]
+) -> List[Tuple[Any, ...]]:
+    """Streams the file through sketch-based aggregators ('approx')."""
+    from approx import approx_solve
+
+    return approx_solve(question, file_path, top_n, options["epsilon"])
+
+
+def solve_incremental(
+    question: str, file_path: str, top_n: int, options: Dict[str, Any]
+) -> List[Tuple[Any, ...]]:
+    """Merges the data appended since the last run into the saved state."""
+    check_question(question)
+    from incremental import incremental_scan
+
+    return incremental_scan([file_path], options["state_path"], top_n)[question]
+
+
+def solve_indexed(
+    question: str, file_path: str, top_n: int, options: Dict[str, Any]
+) -> List[Tuple[Any, ...]]:
+    """Answers q1 from the hourly index of the file ('indexed')."""
+    if question != "q1":
+        raise ValueError(f"Method 'indexed' only answers q1, not {question}")
+    from time_index import parse_time_bound, q1_indexed
+
+    time_zone = options["time_zone"]
+    return q1_indexed(
+        file_path,
+        top_n,
+        time_zone,
+        options["granularity"],
+        parse_time_bound(options["since"], time_zone),
+        parse_time_bound(options["until"], time_zone),
+    )
+
+
+# Solver of each --method. Solver modules are imported when a solver runs.
+METHODS: Dict[str, Solver] = {
+    "time": solve_time,
+    "memory": solve_memory,
+    "fused": solve_fused,
+    "parallel": solve_parallel,
+    "approx": solve_approx,
+    "incremental": solve_incremental,
+    "indexed": solve_indexed,
+}
+
+
 def get_result(
-    question: str, method: str, file_path: str, top_n: int
+    question: str,
+    method: str,
+    file_path: str,
+    top_n: int,
+    workers: Optional[int] = None,
+    epsilon: float = DEFAULT_EPSILON,
+    state_path: str = DEFAULT_STATE_PATH,
+    time_zone: str = "UTC",
+    granularity: str = "day",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
 ) -> List[Tuple[Any, ...]]:
     """
     Execute the corresponding function and return the result list.
 
     Args:
         question: 'q1', 'q2', or 'q3'
-        method: 'time' or 'memory'
+        method: 'time', 'memory', 'fused', 'parallel', 'approx', 'incremental'
+            or 'indexed' (q1 only)
         file_path: Path to the input file (GCS or local)
         top_n: Number of top results
+        workers: Number of processes for the 'parallel' method (default: CPU count)
+        epsilon: Relative error bound of the sketches used by the 'approx' method
+        state_path: Persisted state of the 'incremental' method (local or GCS)
+        time_zone: Timezone of the Q1 buckets of the 'indexed' method
+        granularity: Q1 bucket size of the 'indexed' method ('hour', 'day', 'week')
+        since: Start (ISO date or datetime) of the 'indexed' Q1 time window
+        until: End (exclusive) of the 'indexed' Q1 time window
 
     Returns:
         List of tuples with the result.
     """
-    if question == "q1":
-        return (
-            q1_time(file_path, top_n)
-            if method == "time"
-            else q1_memory(file_path, top_n)
-        )
-    elif question == "q2":
-        return (
-            q2_time(file_path, top_n)
-            if method == "time"
-            else q2_memory(file_path, top_n)
-        )
-    elif question == "q3":
-        return (
-            q3_time(file_path, top_n)
-            if method == "time"
-            else q3_memory(file_path, top_n)
-        )
-    else:
-        raise ValueError(f"Unknown question: {question}")
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method}")
+    options = {
+        "workers": workers,
+        "epsilon": epsilon,
+        "state_path": state_path,
+        "time_zone": time_zone,
+        "granularity": granularity,
+        "since": since,
+        "until": until,
+    }
+    return METHODS[method](question, file_path, top_n, options)
 
 
 def main() -> None:
@@ -61,20 +176,110 @@ def main() -> None:
     Runs the selected Q solution with the given parameters.
 
     Parses arguments, loads config, selects method/question, logs the results,
-    and optionally saves results to BigQuery.
+    optionally saves results to BigQuery and emits the run metrics.
     """
     parser = argparse.ArgumentParser(description="Run data challenge Q solutions.")
     parser.add_argument(
         "--question",
-        choices=["q1", "q2", "q3", "all"],
+        choices=[*QUESTIONS, "all"],
         default="q1",
         help="Which question to solve: 'q1', 'q2', 'q3', or 'all'.",
     )
     parser.add_argument(
         "--method",
-        choices=["time", "memory"],
+        choices=list(METHODS),
         default="time",
-        help="Method: 'time' (fast, pandas) or 'memory' (low RAM).",
+        help=(
+            "Method: 'time' (fast, pandas), 'memory' (low RAM), 'fused' "
+            "(single pass answering every question), 'parallel' (multi-core), "
+            "'approx' (bounded-memory heavy-hitters sketch), 'incremental' "
+            "(only reads data appended since the previous run) or 'indexed' "
+            "(q1 from an hourly index, any timezone/granularity/time window)."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help=(
+            "Number of worker processes for --method parallel and for inputs of "
+            "several files (default: CPU count)."
+        ),
+    )
+    parser.add_argument(
+        "--epsilon",
+        type=float,
+        default=DEFAULT_EPSILON,
+        help=(
+            "Error bound for --method approx: counts overestimate by at most "
+            "epsilon * N using ceil(1 / epsilon) counters."
+        ),
+    )
+    parser.add_argument(
+        "--state_path",
+        default=DEFAULT_STATE_PATH,
+        help="State file (local path or GCS URI) for --method incremental.",
+    )
+    parser.add_argument(
+        "--timezone",
+        default="UTC",
+        help="Timezone of the q1 buckets for --method indexed (e.g. America/Santiago).",
+    )
+    parser.add_argument(
+        "--granularity",
+        choices=list(GRANULARITIES),
+        default="day",
+        help="Size of the q1 buckets for --method indexed.",
+    )
+    parser.add_argument(
+        "--since",
+        default=None,
+        help="Only tweets at or after this ISO date/datetime (--method indexed).",
+    )
+    parser.add_argument(
+        "--until",
+        default=None,
+        help="Only tweets before this ISO date/datetime (--method indexed).",
+    )
+    parser.add_argument(
+        "--files",
+        nargs="+",
+        default=None,
+        help=(
+            "Input files, directories or globs (local or gs://, e.g. "
+            "'gs://bucket/tweets/*.json'); several shards are processed "
+            "concurrently with the memory aggregators, so 'time' results are "
+            "saved as 'memory'. Default: gs://BUCKET/FILENAME from config.json."
+        ),
+    )
+    parser.add_argument(
+        "--map_to",
+        default=None,
+        help=(
+            "Map step of a distributed run: aggregate this task's share of the "
+            "inputs and write its partial states under this directory or GCS "
+            "prefix, without computing results."
+        ),
+    )
+    parser.add_argument(
+        "--reduce_from",
+        default=None,
+        help=(
+            "Reduce step of a distributed run: merge the partial states of every "
+            "map task under this directory or GCS prefix into the results."
+        ),
+    )
+    parser.add_argument(
+        "--task_index",
+        type=int,
+        default=None,
+        help="Index of this map task (default: CLOUD_RUN_TASK_INDEX or 0).",
+    )
+    parser.add_argument(
+        "--task_count",
+        type=int,
+        default=None,
+        help="Number of map tasks (default: CLOUD_RUN_TASK_COUNT or 1).",
     )
     parser.add_argument(
         "--top_n", type=int, default=10, help="Number of top results to return."
@@ -82,56 +287,292 @@ def main() -> None:
     parser.add_argument(
         "--save_bq", action="store_true", help="Save result to BigQuery table."
     )
+    parser.add_argument(
+        "--save_sqlite",
+        default=None,
+        help=(
+            "Save results to the result tables of this SQLite database instead "
+            "of BigQuery (local runs and tests)."
+        ),
+    )
+    parser.add_argument(
+        "--build_cache",
+        action="store_true",
+        help="Extract the tweet fields to the columnar cache used by 'time' methods.",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help=(
+            "Log per-stage timings, line counters and peak memory as a structured "
+            "log line at the end of the run."
+        ),
+    )
+    parser.add_argument(
+        "--metrics_file",
+        default=None,
+        help="Also write the run metrics to this JSON file (implies --metrics).",
+    )
     args = parser.parse_args()
 
+    METRICS.enabled = args.metrics or bool(args.metrics_file)
+    try:
+        run(args)
+    finally:
+        if METRICS.enabled:
+            context = {
+                "question": args.question,
+                "method": args.method,
+                "top_n": args.top_n,
+            }
+            METRICS.log(**context)
+            if args.metrics_file:
+                METRICS.write(args.metrics_file, **context)
+
+
+def create_result_sink(
+    args: argparse.Namespace, project_id: Optional[str], dataset_id: Optional[str]
+) -> Optional[ResultSink]:
+    """
+    Creates the sink where the results of the run are saved, if any.
+
+    Args:
+        args: Arguments parsed by `main`.
+        project_id: GCP project ID from the config.
+        dataset_id: BigQuery dataset ID from the config.
+
+    Returns:
+        A SQLite sink with --save_sqlite, a BigQuery sink with --save_bq, or None.
+    """
+    if args.save_sqlite:
+        return SQLiteResultSink(args.save_sqlite)
+    if args.save_bq:
+        if not project_id or not dataset_id:
+            logging.error("PROJECT_ID or DATASET_ID missing in config.json.")
+            return None
+        return BigQueryResultSink(project_id, dataset_id)
+    return None
+
+
+def check_args(args: argparse.Namespace) -> None:
+    """
+    Rejects combinations of arguments that no engine runs.
+
+    The parallel, sharded and map-reduce engines look their aggregators up by
+    question name, so they run the exact ones; 'approx' only runs serially.
+
+    Args:
+        args: Arguments parsed by `main`.
+
+    Raises:
+        ValueError: If 'approx' is combined with --workers, --map_to or
+            --reduce_from.
+    """
+    if args.method != "approx":
+        return
+    for option in ("workers", "map_to", "reduce_from"):
+        if getattr(args, option) is not None:
+            raise ValueError(f"Method 'approx' runs serially; drop --{option}")
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    Runs the questions selected by the parsed command line arguments.
+
+    Args:
+        args: Arguments parsed by `main`.
+    """
+    check_args(args)
     bucket = get_config_value("BUCKET")
     filename = get_config_value("FILENAME")
     project_id = get_config_value("PROJECT_ID")
     dataset_id = get_config_value("DATASET_ID")
-    file_path = f"gs://{bucket}/{filename}"
-
-    logging.info("Using file: %s", file_path)
+    if args.reduce_from:
+        # The reduce step reads partial states, not the input files.
+        file_paths = []
+        logging.info("Using partial states under: %s", args.reduce_from)
+    else:
+        file_paths = expand_file_paths(args.files or [f"gs://{bucket}/{filename}"])
+        logging.info("Using %d file(s): %s", len(file_paths), ", ".join(file_paths))
     logging.info(
         "Question: %s | Method: %s | Top N: %d", args.question, args.method, args.top_n
     )
 
-    if args.question == "all":
-        for q in ["q1", "q2", "q3"]:
-            for method in ["time", "memory"]:
-                logging.info("Processing %s with method %s...", q, method)
-                result = get_result(q, method, file_path, args.top_n)
-                logging.info("Result: %s", result)
-
-                if args.save_bq:
-                    if not project_id or not dataset_id:
-                        logging.error(
-                            "PROJECT_ID or DATASET_ID missing in config.json."
-                        )
-                    else:
-                        save_results_to_bq(
-                            result=result,
-                            question=q,
-                            method=method,
-                            project_id=project_id,
-                            dataset_id=dataset_id,
-                        )
+    if args.build_cache:
+        from tweet_cache import build_tweet_cache
+
+        with METRICS.stage("build_cache"):
+            for file_path in file_paths:
+                build_tweet_cache(file_path)
+
+    questions = list(QUESTIONS) if args.question == "all" else [args.question]
+    if args.map_to:
+        from mapreduce import run_map_task
+
+        with METRICS.stage("map"):
+            run_map_task(
+                questions, file_paths, args.map_to, args.task_index, args.task_count
+            )
         return
 
-    # Execute and get the result for a single question
-    result = get_result(args.question, args.method, file_path, args.top_n)
-    logging.info("Result: %s", result)
+    sink = create_result_sink(args, project_id, dataset_id)
+    try:
+        if args.reduce_from:
+            solve_reduce(args, questions, sink)
+        elif len(file_paths) > 1:
+            solve_shards(args, file_paths, sink)
+        else:
+            solve(args, file_paths[0], sink)
+    finally:
+        # Waits for the writes still running in the background.
+        if sink is not None:
+            sink.close()
 
-    if args.save_bq:
-        if not project_id or not dataset_id:
-            logging.error("PROJECT_ID or DATASET_ID missing in config.json.")
+
+def solve_reduce(
+    args: argparse.Namespace, questions: List[str], sink: Optional[ResultSink]
+) -> None:
+    """
+    Merges the partial states of a distributed run into the results, saved
+    with method 'mapreduce'.
+
+    Args:
+        args: Arguments parsed by `main`.
+        questions: Questions to answer (they must have been mapped).
+        sink: Where results are saved, or None to only log them.
+    """
+    from mapreduce import run_reduce
+
+    with METRICS.stage("reduce"):
+        results = run_reduce(args.reduce_from, args.top_n, questions)
+    for q in questions:
+        logging.info("Result %s: %s", q, results[q])
+        if sink is not None:
+            sink.add(q, "mapreduce", results[q])
+    if sink is not None:
+        sink.flush()
+
+
+def solve_shards(
+    args: argparse.Namespace, file_paths: List[str], sink: Optional[ResultSink]
+) -> None:
+    """
+    Solves the selected questions over several input files at once.
+
+    'incremental' tracks every file in its state; 'time', 'memory', 'fused' and
+    'parallel' aggregate the shards concurrently in one pass (see `sharded.py`).
+    That pass runs the memory-optimized aggregators, so the results of 'time'
+    and 'memory' are saved once, as 'memory' (there is no pandas path over
+    several files).
+
+    Args:
+        args: Arguments parsed by `main`.
+        file_paths: Input files, in dataset order.
+        sink: Where results are saved, or None to only log them.
+    """
+    if args.method in ("approx", "indexed"):
+        raise ValueError(f"Method '{args.method}' reads a single input file")
+    questions = list(QUESTIONS) if args.question == "all" else [args.question]
+    saved_method = "memory" if args.method == "time" else args.method
+    if saved_method != args.method:
+        logging.warning(
+            "Several files are solved with the memory aggregators; "
+            "results are saved with method 'memory'."
+        )
+
+    logging.info(
+        "Processing %s over %d files with method %s...",
+        ", ".join(questions),
+        len(file_paths),
+        args.method,
+    )
+    with METRICS.stage(f"solve_sharded_{args.method}"):
+        if args.method == "incremental":
+            from incremental import incremental_scan
+
+            results = incremental_scan(file_paths, args.state_path, args.top_n)
         else:
-            save_results_to_bq(
-                result=result,
-                question=args.question,
-                method=args.method,
-                project_id=project_id,
-                dataset_id=dataset_id,
-            )
+            from sharded import sharded_solve
+
+            results = sharded_solve(questions, file_paths, args.top_n, args.workers)
+    for q in questions:
+        logging.info("Result %s: %s", q, results[q])
+        if sink is not None:
+            sink.add(q, saved_method, results[q])
+    if sink is not None:
+        sink.flush()
+
+
+def solve(args: argparse.Namespace, file_path: str, sink: Optional[ResultSink]) -> None:
+    """
+    Solves the selected questions, handing each result to the sink.
+
+    The results of a question are written as soon as all its methods finish, in
+    the background, while the next question is computed.
+
+    Args:
+        args: Arguments parsed by `main`.
+        file_path: Path to the input file (GCS or local).
+        sink: Where results are saved, or None to only log them.
+    """
+    if args.question == "all" and args.method in ("fused", "incremental"):
+        # One read of the file (or of its new bytes) answers every question.
+        logging.info("Processing q1, q2 and q3 with method %s...", args.method)
+        with METRICS.stage(f"solve_all_{args.method}"):
+            if args.method == "fused":
+                from fused import fused_scan
+
+                results = fused_scan(file_path, args.top_n)
+            else:
+                from incremental import incremental_scan
+
+                results = incremental_scan([file_path], args.state_path, args.top_n)
+        for q, result in results.items():
+            logging.info("Result %s: %s", q, result)
+            if sink is not None:
+                sink.add(q, args.method, result)
+        if sink is not None:
+            sink.flush()
+        return
+
+    if args.question == "all" and args.method == "indexed":
+        questions = ["q1"]
+        methods = [args.method]
+    elif args.question == "all":
+        questions = list(QUESTIONS)
+        methods = (
+            ["time", "memory"] if args.method in ("time", "memory") else [args.method]
+        )
+    else:
+        questions = [args.question]
+        methods = [args.method]
+
+    for q in questions:
+        for method in methods:
+            logging.info("Processing %s with method %s...", q, method)
+            with METRICS.stage(f"solve_{q}_{method}"):
+                result = get_result(
+                    q,
+                    method,
+                    file_path,
+                    args.top_n,
+                    args.workers,
+                    args.epsilon,
+                    args.state_path,
+                    args.timezone,
+                    args.granularity,
+                    args.since,
+                    args.until,
+                )
+            logging.info("Result: %s", result)
+            if sink is None:
+                continue
+            if method == "indexed" and args.granularity == "hour":
+                logging.warning("Hourly q1 buckets do not fit q1_results; not saved.")
+                continue
+            sink.add(q, method, result)
+        if sink is not None:
+            sink.flush(q)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,302 @@
+"""mapreduce.py
+
+Module for distributed runs of Q1, Q2 and Q3 as map and reduce steps, e.g. as
+the tasks of a Cloud Run job.
+
+Map: the input files are planned as contiguous, line-aligned byte ranges of
+about the same size, one per task. Each task (CLOUD_RUN_TASK_INDEX of
+CLOUD_RUN_TASK_COUNT) aggregates its ranges in one pass and writes its partial
+states, encoded by the aggregators (see `state_codec.py`), next to the other
+tasks' partials. Compressed files cannot be split, so each of them goes to a
+single task.
+
+Reduce: once every task has finished, the partials are merged in task order,
+which is the dataset order, so the results equal a serial run over the
+concatenated files. The reduce step is cheap: it reads states, not tweets.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from metrics import METRICS
+from pipeline import get_aggregators, merge_states, scan_lines, select_results
+from state_codec import pack_sections, unpack_sections
+from utils import (
+    expand_file_paths,
+    get_compression,
+    get_file_size,
+    iter_lines,
+    read_file_bytes,
+    read_file_range,
+    write_file_bytes,
+)
+
+PARTIAL_NAME = "part-{index:05d}-of-{count:05d}.state"
+PARTIAL_PATTERN = "part-*-of-*.state"
+
+# Bytes read at a time while looking for the next line start.
+LINE_SEARCH_WINDOW = 64 * 1024
+
+
+class WorkUnit(NamedTuple):
+    """Byte range of an input file (`end` None: up to the end of the file)."""
+
+    file_path: str
+    start: int
+    end: Optional[int]
+
+
+def get_task_position(
+    task_index: Optional[int] = None, task_count: Optional[int] = None
+) -> Tuple[int, int]:
+    """
+    Returns the index and count of the tasks of the run, from the arguments or
+    the Cloud Run job environment (CLOUD_RUN_TASK_INDEX, CLOUD_RUN_TASK_COUNT).
+
+    Args:
+        task_index: Index of this task, or None to read it from the environment.
+        task_count: Number of tasks, or None to read it from the environment.
+
+    Returns:
+        (task_index, task_count), defaulting to a single task.
+    """
+    if task_index is None:
+        task_index = int(os.environ.get("CLOUD_RUN_TASK_INDEX", 0))
+    if task_count is None:
+        task_count = int(os.environ.get("CLOUD_RUN_TASK_COUNT", 1))
+    if not 0 <= task_index < task_count:
+        raise ValueError(f"Invalid task {task_index} of {task_count}")
+    return task_index, task_count
+
+
+def find_line_start(file_path: str, offset: int, file_size: int) -> int:
+    """
+    Finds the first line start at or after an offset.
+
+    Args:
+        file_path: Path to an uncompressed file (GCS URI or local path).
+        offset: Byte offset to search from.
+        file_size: Size of the file.
+
+    Returns:
+        Offset of the line start, or `file_size` if no line starts there.
+    """
+    if offset <= 0:
+        return 0
+    position = offset - 1
+    while position < file_size:
+        window = read_file_range(file_path, position, LINE_SEARCH_WINDOW)
+        newline = window.find(b"\n")
+        if newline >= 0:
+            return position + newline + 1
+        position += len(window)
+    return file_size
+
+
+def get_run_id(file_paths: Sequence[str], sizes: Sequence[int]) -> str:
+    """
+    Identifies the run a partial belongs to: the Cloud Run execution
+    (CLOUD_RUN_EXECUTION) if any, plus a digest of the input files and sizes.
+    Partials left under the same prefix by another execution, or planned over
+    other inputs, get a different id.
+
+    Args:
+        file_paths: Input files, in dataset order.
+        sizes: Size of each input file.
+
+    Returns:
+        The run id.
+    """
+    inputs = json.dumps([list(file_paths), list(sizes)]).encode("utf-8")
+    digest = hashlib.sha256(inputs).hexdigest()[:16]
+    execution = os.environ.get("CLOUD_RUN_EXECUTION", "local")
+    return f"{execution}/{digest}"
+
+
+def plan_tasks(
+    file_paths: Sequence[str],
+    task_count: int,
+    sizes: Optional[Sequence[int]] = None,
+) -> List[List[WorkUnit]]:
+    """
+    Splits the input files into one list of work units per task. The dataset
+    (the files concatenated in order) is cut into `task_count` ranges of about
+    the same size, moved to line starts, or to the end of compressed files.
+
+    Args:
+        file_paths: Input files (GCS URIs or local paths), in dataset order.
+        task_count: Number of tasks.
+        sizes: Size of each file, if already known.
+
+    Returns:
+        The work units of each task; consecutive tasks get consecutive ranges.
+    """
+    if sizes is None:
+        sizes = [get_file_size(file_path) for file_path in file_paths]
+    splittable = [get_compression(file_path) is None for file_path in file_paths]
+    file_starts = list(itertools.accumulate(sizes, initial=0))
+    total = file_starts[-1]
+
+    # Cuts are (file index, offset) positions, in dataset order.
+    cuts = [(0, 0)]
+    for task in range(1, task_count):
+        target = total * task // task_count
+        index = max(i for i, start in enumerate(file_starts[:-1]) if start <= target)
+        offset = target - file_starts[index]
+        if offset and splittable[index]:
+            offset = find_line_start(file_paths[index], offset, sizes[index])
+        if offset and (not splittable[index] or offset >= sizes[index]):
+            index, offset = index + 1, 0
+        cuts.append(max((index, offset), cuts[-1]))
+    cuts.append((len(file_paths), 0))
+
+    tasks = []
+    for (first, start), (last, end) in zip(cuts, cuts[1:]):
+        units = []
+        for index in range(first, min(last, len(file_paths) - 1) + 1):
+            unit_start = start if index == first else 0
+            unit_end = end if index == last else None
+            if unit_end == 0 or unit_start >= sizes[index]:
+                continue
+            units.append(WorkUnit(file_paths[index], unit_start, unit_end))
+        tasks.append(units)
+    return tasks
+
+
+def get_partial_path(output_prefix: str, task_index: int, task_count: int) -> str:
+    """Returns where a task writes its partial states."""
+    name = PARTIAL_NAME.format(index=task_index, count=task_count)
+    return f"{output_prefix.rstrip('/')}/{name}"
+
+
+def decode_partial(data: bytes) -> Tuple[Dict[str, Any], List[bytes]]:
+    """
+    Decodes a partial state file: its metadata and the encoded state of each
+    mapped question.
+    """
+    metadata, *states = unpack_sections(data)
+    return json.loads(metadata), states
+
+
+def run_map_task(
+    questions: Sequence[str],
+    file_paths: Sequence[str],
+    output_prefix: str,
+    task_index: Optional[int] = None,
+    task_count: Optional[int] = None,
+) -> str:
+    """
+    Aggregates this task's share of the input files and writes its partial
+    states.
+
+    Args:
+        questions: Questions to aggregate ('q1', 'q2', 'q3').
+        file_paths: Input files (GCS URIs or local paths), in dataset order;
+            every task must get the same list.
+        output_prefix: Directory or GCS prefix shared by the tasks' partials.
+        task_index: Index of this task (default: CLOUD_RUN_TASK_INDEX or 0).
+        task_count: Number of tasks (default: CLOUD_RUN_TASK_COUNT or 1).
+
+    Returns:
+        Path of the partial state file written.
+    """
+    task_index, task_count = get_task_position(task_index, task_count)
+    aggregators = get_aggregators(questions)
+    for q, aggregator in aggregators.items():
+        if aggregator.serialize is None:
+            raise ValueError(f"The {q} aggregator cannot encode its state")
+    sizes = [get_file_size(file_path) for file_path in file_paths]
+    units = plan_tasks(file_paths, task_count, sizes)[task_index]
+    logging.info(
+        "Map task %d of %d: %s",
+        task_index,
+        task_count,
+        ", ".join(f"{u.file_path}[{u.start}:{u.end or ''}]" for u in units) or "-",
+    )
+
+    lines = itertools.chain.from_iterable(
+        iter_lines(unit.file_path, unit.start, unit.end) for unit in units
+    )
+    states, counts = scan_lines(aggregators, lines)
+    METRICS.count_lines(*counts)
+
+    metadata = {
+        "run_id": get_run_id(file_paths, sizes),
+        "task_index": task_index,
+        "task_count": task_count,
+        "questions": list(aggregators),
+        "line_counts": list(counts),
+    }
+    partial_path = get_partial_path(output_prefix, task_index, task_count)
+    with METRICS.stage("partials_write"):
+        encoded_states = [agg.serialize(states[q]) for q, agg in aggregators.items()]
+        write_file_bytes(
+            partial_path,
+            pack_sections([json.dumps(metadata).encode("utf-8"), *encoded_states]),
+        )
+    logging.info("Partial states written: %s", partial_path)
+    return partial_path
+
+
+def run_reduce(
+    output_prefix: str, top_n: int = 10, questions: Optional[Sequence[str]] = None
+) -> Dict[str, List[Tuple[Any, ...]]]:
+    """
+    Merges the partial states of every map task and selects the results.
+
+    Args:
+        output_prefix: Directory or GCS prefix holding the tasks' partials.
+        top_n: Number of top results of each question (default is 10).
+        questions: Questions to answer (default: every question mapped).
+
+    Returns:
+        Dictionary {question: result}.
+
+    Raises:
+        ValueError: If partials are missing or come from different runs (see
+            `get_run_id`).
+    """
+    pattern = f"{output_prefix.rstrip('/')}/{PARTIAL_PATTERN}"
+    partials = [
+        decode_partial(read_file_bytes(path)) for path in expand_file_paths([pattern])
+    ]
+    partials.sort(key=lambda partial: partial[0]["task_index"])
+
+    run_ids = sorted({metadata["run_id"] for metadata, _ in partials})
+    if len(run_ids) > 1:
+        raise ValueError(
+            f"Partials of several runs in {output_prefix}: {', '.join(run_ids)}"
+        )
+    task_count = partials[0][0]["task_count"]
+    mapped = partials[0][0]["questions"]
+    task_indexes = [metadata["task_index"] for metadata, _ in partials]
+    if task_indexes != list(range(task_count)) or any(
+        metadata["task_count"] != task_count or metadata["questions"] != mapped
+        for metadata, _ in partials
+    ):
+        raise ValueError(
+            f"Expected partials of tasks 0-{task_count - 1} of one run in "
+            f"{output_prefix}, found tasks {task_indexes}"
+        )
+
+    questions = list(questions or mapped)
+    missing = [q for q in questions if q not in mapped]
+    if missing:
+        raise ValueError(f"Questions not mapped: {', '.join(missing)}")
+
+    aggregators = get_aggregators(questions)
+    merged = {}
+    with METRICS.stage("partials_merge"):
+        for q, aggregator in aggregators.items():
+            position = mapped.index(q)
+            merged[q] = merge_states(
+                aggregator,
+                (aggregator.deserialize(states[position]) for _, states in partials),
+            )
+    for metadata, _ in partials:
+        METRICS.count_lines(*metadata["line_counts"])
+    return select_results(aggregators, merged, top_n)
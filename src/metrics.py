@@ -0,0 +1,134 @@
+"""metrics.py
+
+Instrumentation of solver runs: time spent per stage (GCS download, JSON
+decoding, emoji matching, BigQuery write...), line counters (lines read,
+malformed lines skipped, records kept) and peak memory.
+
+Stage timers and counters are cheap and always collected in the process-wide
+`METRICS` object. Per-record timings (e.g. JSON decoding, which happens once per
+line) are only measured when the instrumentation is enabled, so they add no
+overhead otherwise. `main.py` enables it and emits the metrics as a structured
+log line and, optionally, a JSON file.
+"""
+
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+def get_peak_rss_mib() -> Optional[float]:
+    """Returns the peak resident set size of this process in MiB, if known."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KiB on Linux.
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+class RunMetrics:
+    """Accumulates stage timings and counters of a run."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    def reset(self) -> None:
+        """Clears every timing and counter."""
+        self.stages.clear()
+        self.counters.clear()
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        """Adds elapsed seconds to a stage."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add(self, **counts: int) -> None:
+        """Adds amounts to the named counters."""
+        for name, amount in counts.items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def count_lines(
+        self, lines_read: int, malformed_lines: int, skipped_lines: int = 0
+    ) -> None:
+        """
+        Records the outcome of scanning JSON lines.
+
+        Args:
+            lines_read: Lines read from the file.
+            malformed_lines: Lines that could not be decoded.
+            skipped_lines: Lines discarded by a prefilter without decoding.
+        """
+        self.add(
+            lines_read=lines_read,
+            malformed_lines=malformed_lines,
+            records_kept=lines_read - malformed_lines - skipped_lines,
+        )
+        if skipped_lines:
+            self.add(skipped_lines=skipped_lines)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Times the enclosed block as (part of) a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed(self, stage: str, function: Callable) -> Callable:
+        """
+        Wraps a function called once per record so its time is added to a stage.
+
+        Args:
+            stage: Stage the calls are accounted to.
+            function: Function to time.
+
+        Returns:
+            The wrapped function when the instrumentation is enabled, otherwise
+            `function` itself.
+        """
+        if not self.enabled:
+            return function
+
+        perf_counter = time.perf_counter
+
+        def timed_function(*args: Any, **kwargs: Any) -> Any:
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add_time(stage, perf_counter() - start)
+
+        return timed_function
+
+    def snapshot(self, **context: Any) -> Dict[str, Any]:
+        """Returns the current metrics (plus context fields) as a dictionary."""
+        return {
+            **context,
+            "stages_seconds": {name: round(s, 6) for name, s in self.stages.items()},
+            "counters": dict(self.counters),
+            "peak_rss_mib": get_peak_rss_mib(),
+        }
+
+    def log(self, **context: Any) -> None:
+        """Emits the metrics as a single structured (JSON) log line."""
+        logging.info("Run metrics: %s", json.dumps(self.snapshot(**context)))
+
+    def write(self, path: str, **context: Any) -> None:
+        """Writes the metrics to a JSON file."""
+        Path(path).write_text(
+            json.dumps(self.snapshot(**context), indent=2), encoding="utf-8"
+        )
+        logging.info("Run metrics written to %s", path)
+
+
+METRICS = RunMetrics()
@@ -0,0 +1,150 @@
+"""parallel.py
+
+Module for solving Q1, Q2 and Q3 on several CPU cores. The tweets file is split
+into newline-aligned byte ranges, each range is aggregated in a separate process
+with the question's aggregator (see `pipeline.py`), and the partial results are
+merged in file order so the output matches the serial versions.
+
+Compressed files are split too when they are zstd files with several frames:
+ranges are then groups of whole frames. gzip and bzip2 files, and single-frame
+zstd files, cannot be decompressed from the middle and are read as one range.
+"""
+
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional, Tuple
+
+from compressed_io import get_zstd_frame_offsets
+from metrics import METRICS
+from pipeline import ScanCounts, get_aggregators, merge_states, scan_file
+from utils import get_compression, get_local_file_path
+
+
+def split_frame_ranges(file_path: str, num_chunks: int) -> List[Tuple[int, int]]:
+    """
+    Splits a local zstd file into byte ranges whose boundaries are frame starts.
+
+    Args:
+        file_path: Path to a local zstd compressed JSON lines file.
+        num_chunks: Desired number of ranges (fewer are returned for files with
+            fewer frames).
+
+    Returns:
+        List of (start, end) byte offsets covering the whole file, in order.
+    """
+    file_size = os.path.getsize(file_path)
+    with open(file_path, "rb") as infile:
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            frame_offsets = get_zstd_frame_offsets(mapped)
+
+    num_chunks = max(1, num_chunks)
+    boundaries = [0]
+    for offset in frame_offsets[1:]:
+        # A new range starts at the first frame past the next even split point.
+        if offset >= file_size * len(boundaries) // num_chunks:
+            boundaries.append(offset)
+            if len(boundaries) == num_chunks:
+                break
+    boundaries.append(file_size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def split_file_ranges(file_path: str, num_chunks: int) -> List[Tuple[int, int]]:
+    """
+    Splits a local file into byte ranges whose boundaries fall right after a
+    newline, or at frame starts for zstd files.
+
+    Args:
+        file_path: Path to a local JSON lines file (possibly compressed).
+        num_chunks: Desired number of ranges (fewer are returned for small files).
+
+    Returns:
+        List of (start, end) byte offsets covering the whole file, in order.
+    """
+    file_size = os.path.getsize(file_path)
+    if file_size == 0:
+        return []
+
+    compression = get_compression(file_path)
+    if compression == "zstd":
+        return split_frame_ranges(file_path, num_chunks)
+    if compression:
+        return [(0, file_size)]
+
+    num_chunks = max(1, num_chunks)
+    boundaries = [0]
+    with open(file_path, "rb") as infile:
+        for i in range(1, num_chunks):
+            offset = file_size * i // num_chunks
+            if offset <= boundaries[-1]:
+                continue
+            infile.seek(offset - 1)
+            infile.readline()
+            position = infile.tell()
+            if position >= file_size:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    boundaries.append(file_size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def aggregate_range(
+    question: str, file_path: str, start: int, end: int
+) -> Tuple[Any, ScanCounts]:
+    """
+    Aggregates the tweets whose lines start inside [start, end) of a local file.
+
+    Args:
+        question: 'q1', 'q2', or 'q3'
+        file_path: Path to a local JSON lines file.
+        start: First byte of the range (must be the start of a line, or of a
+            frame for zstd files).
+        end: Byte offset where the range ends (exclusive).
+
+    Returns:
+        The partial aggregation state for the question and the line counters
+        of the range (worker processes cannot update the parent's metrics).
+    """
+    states, counts = scan_file([question], file_path, start, end)
+    return states[question], counts
+
+
+def parallel_solve(
+    question: str, file_path: str, top_n: int = 10, workers: Optional[int] = None
+) -> List[Tuple[Any, ...]]:
+    """
+    Solves a question processing byte ranges of the file in a process pool.
+
+    Args:
+        question: 'q1', 'q2', or 'q3'
+        file_path: Path to the tweets file (JSON lines format, local or cloud).
+        top_n: Number of top results (default is 10).
+        workers: Number of worker processes (default is the CPU count).
+
+    Returns:
+        The same list of tuples the serial memory-optimized solution returns.
+    """
+    aggregator = get_aggregators([question])[question]
+    file_path = get_local_file_path(file_path)
+    workers = workers or os.cpu_count() or 1
+    ranges = split_file_ranges(file_path, workers)
+
+    if len(ranges) <= 1:
+        results = [aggregate_range(question, file_path, s, e) for s, e in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+            futures = [
+                executor.submit(aggregate_range, question, file_path, s, e)
+                for s, e in ranges
+            ]
+            results = [future.result() for future in futures]
+
+    for _, counts in results:
+        METRICS.count_lines(*counts)
+
+    merged = merge_states(aggregator, (state for state, _ in results))
+    return aggregator.select(merged, top_n)
@@ -0,0 +1,255 @@
+"""pipeline.py
+
+Module for the streaming record pipeline shared by the solvers:
+
+    source (raw lines) -> prefilter -> decode (projected fields) -> aggregators
+    -> top-N selection
+
+Each question is an `Aggregator` plugin registered by name. An aggregator says
+which top-level fields it reads, how to add a tweet to its state, how to merge
+two partial states, how to encode a state to bytes (for partial states shipped
+between processes or tasks, see `mapreduce.py`) and how to select the top N
+from a state. Engines only deal
+with aggregators: the serial engine here (memory-optimized and fused runs),
+the byte-range engine in `parallel.py`, the per-file engine in `sharded.py` and
+the sketch-based variants in `approx.py`. Decoding is done once per line for
+all the aggregators of a run, with the union of their fields.
+
+The built-in questions are registered by `q1_memory`, `q2_memory` and
+`q3_memory`, which are imported the first time their name is looked up.
+"""
+
+import importlib
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from metrics import METRICS
+from utils import JSON_DECODE_ERRORS, iter_lines, make_json_decoder
+
+
+class Aggregator(NamedTuple):
+    """Functions that build, update, merge and read a question's state."""
+
+    new_state: Callable[[], Any]
+    update: Callable[[Dict[str, Any], Any], None]
+    merge: Callable[[Any, Any], None]
+    select: Callable[[Any, int], List[Tuple[Any, ...]]]
+    fields: Tuple[str, ...]
+    # Compact binary encoding of a state, to store or ship partial states.
+    serialize: Optional[Callable[[Any], bytes]] = None
+    deserialize: Optional[Callable[[bytes], Any]] = None
+    # Cheap check on the raw line; False only if the line cannot contribute.
+    line_filter: Optional[Callable[[bytes], bool]] = None
+    # Stage the update time is accounted to when metrics are enabled.
+    stage: Optional[str] = None
+
+
+class ScanCounts(NamedTuple):
+    """Line counters of a scan (workers return them to the parent's metrics)."""
+
+    lines_read: int
+    malformed_lines: int
+    skipped_lines: int
+
+
+AGGREGATORS: Dict[str, Aggregator] = {}
+
+# Modules registering the built-in aggregators when imported.
+BUILTIN_AGGREGATOR_MODULES = {"q1": "q1_memory", "q2": "q2_memory", "q3": "q3_memory"}
+
+
+def register_aggregator(name: str, aggregator: Aggregator) -> Aggregator:
+    """
+    Registers the aggregator answering a question.
+
+    Args:
+        name: Question name (e.g. 'q1').
+        aggregator: The question's aggregator.
+
+    Returns:
+        The registered aggregator.
+    """
+    AGGREGATORS[name] = aggregator
+    return aggregator
+
+
+def get_aggregators(questions: Sequence[str]) -> Dict[str, Aggregator]:
+    """
+    Looks up the aggregators of several questions.
+
+    Args:
+        questions: Question names (e.g. ['q1', 'q3']).
+
+    Returns:
+        Dictionary {question: aggregator}, in the given order.
+
+    Raises:
+        ValueError: If a question has no registered aggregator.
+    """
+    aggregators = {}
+    for question in questions:
+        if question not in AGGREGATORS and question in BUILTIN_AGGREGATOR_MODULES:
+            importlib.import_module(BUILTIN_AGGREGATOR_MODULES[question])
+        if question not in AGGREGATORS:
+            raise ValueError(f"Unknown question: {question}")
+        aggregators[question] = AGGREGATORS[question]
+    return aggregators
+
+
+def combine_line_filters(
+    aggregators: Dict[str, Aggregator],
+) -> Optional[Callable[[bytes], bool]]:
+    """
+    Builds the prefilter of a scan: a line is kept if any aggregator may use it,
+    so there is none as soon as one aggregator has no prefilter.
+
+    Args:
+        aggregators: Aggregators of the scan.
+
+    Returns:
+        The combined prefilter, or None to keep every line.
+    """
+    line_filters = [aggregator.line_filter for aggregator in aggregators.values()]
+    if not line_filters or None in line_filters:
+        return None
+    if len(line_filters) == 1:
+        return line_filters[0]
+    return lambda line: any(line_filter(line) for line_filter in line_filters)
+
+
+def scan_lines(
+    aggregators: Dict[str, Aggregator],
+    lines: Iterable[bytes],
+    line_filters: bool = False,
+) -> Tuple[Dict[str, Any], ScanCounts]:
+    """
+    Runs raw JSON lines through the pipeline into new aggregation states.
+
+    Args:
+        aggregators: Aggregators to feed, by question.
+        lines: Raw JSON lines.
+        line_filters: Whether to skip lines rejected by the aggregators'
+            prefilters without decoding them (default is False).
+
+    Returns:
+        The state of each aggregator and the line counters of the scan.
+    """
+    fields = tuple(
+        dict.fromkeys(field for agg in aggregators.values() for field in agg.fields)
+    )
+    decode = METRICS.timed("json_decode", make_json_decoder(fields))
+    line_filter = combine_line_filters(aggregators) if line_filters else None
+    states = {q: aggregator.new_state() for q, aggregator in aggregators.items()}
+    updates = [
+        (
+            METRICS.timed(aggregator.stage, aggregator.update)
+            if aggregator.stage
+            else aggregator.update,
+            states[q],
+        )
+        for q, aggregator in aggregators.items()
+    ]
+    lines_read = 0
+    malformed_lines = 0
+    skipped_lines = 0
+
+    for raw_line in lines:
+        lines_read += 1
+        if line_filter is not None and not line_filter(raw_line):
+            skipped_lines += 1
+            continue
+        try:
+            tweet_data = decode(raw_line)
+        except JSON_DECODE_ERRORS:
+            malformed_lines += 1
+            continue
+        for update, state in updates:
+            update(tweet_data, state)
+
+    return states, ScanCounts(lines_read, malformed_lines, skipped_lines)
+
+
+def scan_file(
+    questions: Sequence[str],
+    file_path: str,
+    start: int = 0,
+    end: Optional[int] = None,
+    line_filters: bool = False,
+) -> Tuple[Dict[str, Any], ScanCounts]:
+    """
+    Runs (a byte range of) a tweets file through the registered aggregators of
+    some questions. Takes question names, so it can run in worker processes.
+
+    Args:
+        questions: Questions to aggregate.
+        file_path: Path to the tweets file (GCS URI or local path).
+        start: Byte offset of the first line to read (default is 0).
+        end: Byte offset where reading stops (default is the end of the file).
+        line_filters: Whether to apply the aggregators' prefilters.
+
+    Returns:
+        The state of each question and the line counters of the scan.
+    """
+    return scan_lines(
+        get_aggregators(questions), iter_lines(file_path, start, end), line_filters
+    )
+
+
+def merge_states(aggregator: Aggregator, states: Iterable[Any]) -> Any:
+    """
+    Merges partial states of an aggregator in the given order (ties are broken
+    by key at selection, so the order does not change the results).
+
+    Args:
+        aggregator: Aggregator the states belong to.
+        states: Partial states, in file order.
+
+    Returns:
+        A single merged state.
+    """
+    merged = aggregator.new_state()
+    for state in states:
+        aggregator.merge(merged, state)
+    return merged
+
+
+def select_results(
+    aggregators: Dict[str, Aggregator], states: Dict[str, Any], top_n: int
+) -> Dict[str, List[Tuple[Any, ...]]]:
+    """Selects the top N of each question from its final state."""
+    return {
+        q: aggregator.select(states[q], top_n) for q, aggregator in aggregators.items()
+    }
+
+
+def run_serial(
+    aggregators: Dict[str, Aggregator],
+    file_path: str,
+    top_n: int = 10,
+    line_filters: bool = False,
+) -> Dict[str, List[Tuple[Any, ...]]]:
+    """
+    Answers several questions with a single pass over a tweets file in this
+    process. GCS files are streamed instead of downloaded.
+
+    Args:
+        aggregators: Aggregators of the questions (see `get_aggregators`).
+        file_path: Path to the tweets file (JSON lines format, local or cloud).
+        top_n: Number of top results of each question (default is 10).
+        line_filters: Whether to apply the aggregators' prefilters.
+
+    Returns:
+        Dictionary {question: result}.
+    """
+    states, counts = scan_lines(aggregators, iter_lines(file_path), line_filters)
+    METRICS.count_lines(*counts)
+    return select_results(aggregators, states, top_n)
@@ -4,17 +4,198 @@ Module for finding the top N dates with the most tweets and the most active user
 for each of those dates. Optimized for low memory usage by processing the file line by line.
 """
 
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple
+from array import array
 from datetime import date, datetime
-import json
 
-from utils import get_local_file_path
+from interning import StringInterner
+from pipeline import Aggregator, get_aggregators, register_aggregator, run_serial
+from ranking import top_items, top_key
+from state_codec import (
+    array_from_bytes,
+    array_to_bytes,
+    decode_strings,
+    encode_strings,
+    pack_sections,
+    unpack_sections,
+)
+
+# Top-level tweet fields read by this question.
+TWEET_FIELDS = ("date", "user")
+
+
+class DateUserCounter:
+    """
+    Tweet counts per date and user. Usernames are interned once for all dates and
+    each date keeps a sparse {username id: count} map of its active users, so a
+    user active on many dates costs one string plus one small entry per date it
+    tweeted on, and memory grows with (date, user) pairs rather than dates × users.
+    """
+
+    def __init__(self) -> None:
+        self.usernames = StringInterner()
+        self.user_counts: Dict[date, Dict[int, int]] = {}
+        self.date_totals: Dict[date, int] = {}
+
+    def add(self, tweet_date: date, username: str, count: int = 1) -> None:
+        """
+        Adds tweets of a user on a date.
+
+        Args:
+            tweet_date: Date of the tweets.
+            username: Author of the tweets.
+            count: Number of tweets to add (default is 1).
+        """
+        counts = self.user_counts.get(tweet_date)
+        if counts is None:
+            counts = self.user_counts[tweet_date] = {}
+            self.date_totals[tweet_date] = 0
+        user_id = self.usernames.intern(username)
+        counts[user_id] = counts.get(user_id, 0) + count
+        self.date_totals[tweet_date] += count
+
+    def merge(self, other: "DateUserCounter") -> None:
+        """
+        Adds the counts of another counter. Dates and usernames first seen in
+        `other` are appended, so merging partials in file order gives the same
+        state a single pass would produce.
+
+        Args:
+            other: Partial counter to merge into this one.
+        """
+        id_map = [
+            self.usernames.intern(username) for username in other.usernames.values
+        ]
+        for tweet_date, other_counts in other.user_counts.items():
+            counts = self.user_counts.get(tweet_date)
+            if counts is None:
+                counts = self.user_counts[tweet_date] = {}
+                self.date_totals[tweet_date] = 0
+            for other_id, count in other_counts.items():
+                user_id = id_map[other_id]
+                counts[user_id] = counts.get(user_id, 0) + count
+            self.date_totals[tweet_date] += other.date_totals[tweet_date]
+
+    def to_bytes(self) -> bytes:
+        """
+        Encodes the counter in the compact binary format of `state_codec`:
+        usernames, date ordinals, date totals, the number of users of each date
+        and the (username id, count) pairs of every date.
+        """
+        lengths = array("I", (len(counts) for counts in self.user_counts.values()))
+        user_ids = array("I")
+        all_counts = array("Q")
+        for counts in self.user_counts.values():
+            user_ids.extend(counts.keys())
+            all_counts.extend(counts.values())
+        return pack_sections(
+            [
+                *encode_strings(self.usernames.values),
+                array_to_bytes(array("I", (d.toordinal() for d in self.user_counts))),
+                array_to_bytes(array("Q", self.date_totals.values())),
+                array_to_bytes(lengths),
+                array_to_bytes(user_ids),
+                array_to_bytes(all_counts),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DateUserCounter":
+        """Rebuilds a counter encoded with `to_bytes`, keeping its orderings."""
+        sections = unpack_sections(data)
+        names, joined, ordinals, totals, lengths, user_ids, all_counts = sections
+        counter = cls()
+        for username in decode_strings(names, joined):
+            counter.usernames.intern(username)
+        user_ids = array_from_bytes("I", user_ids)
+        all_counts = array_from_bytes("Q", all_counts)
+        position = 0
+        for ordinal, total, length in zip(
+            array_from_bytes("I", ordinals),
+            array_from_bytes("Q", totals),
+            array_from_bytes("I", lengths),
+        ):
+            tweet_date = date.fromordinal(ordinal)
+            end = position + length
+            counter.user_counts[tweet_date] = dict(
+                zip(user_ids[position:end], all_counts[position:end])
+            )
+            counter.date_totals[tweet_date] = total
+            position = end
+        return counter
+
+    def top_dates(self, top_n: int) -> List[Tuple[date, str]]:
+        """
+        Picks the top N dates by tweet volume and the most active user of each date.
+        Ties go to the earliest date and the alphabetically first username.
+
+        Args:
+            top_n: Number of top dates to return.
+
+        Returns:
+            A list of tuples: (date, username_with_most_tweets_on_that_date).
+        """
+        return [
+            (
+                tweet_date,
+                top_key(
+                    (self.usernames[user_id], count)
+                    for user_id, count in self.user_counts[tweet_date].items()
+                ),
+            )
+            for tweet_date, _ in top_items(self.date_totals.items(), top_n)
+        ]
+
+
+def count_tweet_date_user(
+    tweet_data: Dict[str, Any], tweet_volume_by_date_user: DateUserCounter
+) -> None:
+    """
+    Adds one tweet to the per-date, per-user volume counter. Tweets without a valid
+    date or username are ignored.
+
+    Args:
+        tweet_data: Decoded tweet record.
+        tweet_volume_by_date_user: Per-date, per-user counter to update.
+    """
+    tweet_date_str = tweet_data.get("date")
+    user_data = tweet_data.get("user")
+    if not tweet_date_str or not user_data:
+        return
+
+    username = user_data.get("username")
+    if not username:
+        return
+
+    try:
+        tweet_date = datetime.fromisoformat(
+            tweet_date_str.replace("Z", "+00:00")
+        ).date()
+    except (ValueError, TypeError):
+        return
+
+    tweet_volume_by_date_user.add(tweet_date, username)
+
+
+register_aggregator(
+    "q1",
+    Aggregator(
+        DateUserCounter,
+        count_tweet_date_user,
+        DateUserCounter.merge,
+        DateUserCounter.top_dates,
+        TWEET_FIELDS,
+        serialize=DateUserCounter.to_bytes,
+        deserialize=DateUserCounter.from_bytes,
+    ),
+)
 
 
 def q1_memory(file_path: str, top_n: int = 10) -> List[Tuple[date, str]]:
     """
     Finds the top N dates with the most tweets and, for each date, the user
-    with the highest tweet count. Processes file line by line for minimal memory usage.
+    with the highest tweet count. Processes file line by line for minimal memory usage;
+    GCS files are streamed instead of downloaded.
 
     Args:
         file_path: Path to the tweets file (JSON lines format, local or cloud).
@@ -23,46 +204,4 @@ def q1_memory(file_path: str, top_n: int = 10) -> List[Tuple[date, str]]:
     Returns:
         A list of tuples: (date, username_with_most_tweets_on_that_date).
     """
-    file_path = get_local_file_path(file_path)
-    tweet_volume_by_date_user = {}
-
-    with open(file_path, encoding="utf-8") as infile:
-        for raw_line in infile:
-            try:
-                tweet_data = json.loads(raw_line)
-            except json.JSONDecodeError:
-                continue
-
-            tweet_date_str = tweet_data.get("date")
-            user_data = tweet_data.get("user")
-            if not tweet_date_str or not user_data:
-                continue
-
-            username = user_data.get("username")
-            if not username:
-                continue
-
-            try:
-                tweet_date = datetime.fromisoformat(
-                    tweet_date_str.replace("Z", "+00:00")
-                ).date()
-            except (ValueError, TypeError):
-                continue
-
-            if tweet_date not in tweet_volume_by_date_user:
-                tweet_volume_by_date_user[tweet_date] = {}
-            user_volume_map = tweet_volume_by_date_user[tweet_date]
-            user_volume_map[username] = user_volume_map.get(username, 0) + 1
-
-    top_dates = sorted(
-        tweet_volume_by_date_user.items(),
-        key=lambda x: sum(x[1].values()),
-        reverse=True,
-    )[:top_n]
-
-    result = []
-    for tweet_date, user_counts in top_dates:
-        top_user = max(user_counts.items(), key=lambda x: x[1])[0]
-        result.append((tweet_date, top_user))
-
-    return result
+    return run_serial(get_aggregators(["q1"]), file_path, top_n)["q1"]
@@ -6,17 +6,23 @@ for each of those dates. Optimized for execution speed using pandas.
 
 from typing import List, Tuple
 from datetime import date
-import json
 import pandas as pd
 
-from utils import get_local_file_path
+from ranking import top_items
+from tweet_cache import read_tweet_cache
+from utils import get_local_file_path, iter_tweets
 
 
 def q1_time(file_path: str, top_n: int = 10) -> List[Tuple[date, str]]:
     """
     Computes the top N days with the highest tweet volume and, for each day, the user
     with the most tweets. Uses pandas for efficient in-memory aggregation.
-    Handles malformed or incomplete records gracefully.
+    Handles malformed or incomplete records gracefully. Reads the columnar tweet
+    cache instead of the JSON file when one exists for the current file version.
+
+    The aggregation is fully vectorized: the day is the fixed-format 'YYYY-MM-DD'
+    prefix of the timestamp, and a single groupby/idxmax picks the top user of
+    every selected day.
 
     Args:
         file_path: Path to the tweets file (JSON lines format).
@@ -25,47 +31,54 @@ def q1_time(file_path: str, top_n: int = 10) -> List[Tuple[date, str]]:
     Returns:
         List of tuples: (date, username_with_highest_activity_that_day).
     """
-    file_path = get_local_file_path(file_path)
-    tweet_records = []
-
-    with open(file_path, encoding="utf-8") as infile:
-        for raw_line in infile:
-            try:
-                tweet_data = json.loads(raw_line)
-                tweet_date_str = tweet_data.get("date")
-                user_data = tweet_data.get("user", {})
-                username = user_data.get("username")
-                if tweet_date_str and username:
-                    tweet_records.append({"date": tweet_date_str, "username": username})
-            except json.JSONDecodeError:
-                continue
-
-    if not tweet_records:
+    cached = read_tweet_cache(file_path, ["date", "username"])
+    if cached is not None:
+        df_tweets = cached
+    else:
+        file_path = get_local_file_path(file_path)
+        tweet_dates = []
+        usernames = []
+
+        for tweet_data in iter_tweets(file_path, ("date", "user")):
+            tweet_date_str = tweet_data.get("date")
+            user_data = tweet_data.get("user") or {}
+            username = user_data.get("username")
+            if tweet_date_str and username:
+                tweet_dates.append(tweet_date_str)
+                usernames.append(username)
+
+        df_tweets = pd.DataFrame({"date": tweet_dates, "username": usernames})
+
+    if df_tweets.empty:
         return []
 
-    df_tweets = pd.DataFrame(tweet_records)
-    df_tweets["date"] = pd.to_datetime(df_tweets["date"], errors="coerce").dt.date
-    df_tweets = df_tweets.dropna(subset=["date", "username"])
+    day = pd.to_datetime(
+        df_tweets["date"].str.slice(0, 10), format="%Y-%m-%d", errors="coerce"
+    )
+    valid = day.notna() & df_tweets["username"].fillna("").astype(bool)
+    if not valid.any():
+        return []
 
     user_activity = (
-        df_tweets.groupby(["date", "username"]).size().reset_index(name="tweet_count")
+        pd.DataFrame({"date": day[valid], "username": df_tweets["username"][valid]})
+        .groupby(["date", "username"])
+        .size()
     )
 
-    daily_totals = (
-        user_activity.groupby("date")["tweet_count"]
-        .sum()
-        .reset_index()
-        .sort_values("tweet_count", ascending=False)
-        .head(top_n)
-    )
+    daily_totals = user_activity.groupby(level="date").sum()
+    top_days = [
+        current_date
+        for current_date, _ in top_items(
+            daily_totals.nlargest(top_n, keep="all").items(), top_n
+        )
+    ]
 
-    result = []
-    for _, top_day in daily_totals.iterrows():
-        current_date = top_day["date"]
-        users_on_day = user_activity[user_activity["date"] == current_date]
-        most_active_user = users_on_day.sort_values(
-            "tweet_count", ascending=False
-        ).iloc[0]
-        result.append((current_date, most_active_user["username"]))
+    top_day_activity = user_activity[
+        user_activity.index.get_level_values("date").isin(top_days)
+    ]
+    # The groupby index is sorted, so idxmax breaks ties by username.
+    top_users = top_day_activity.groupby(level="date").idxmax()
 
-    return result
+    return [
+        (current_date.date(), top_users[current_date][1]) for current_date in top_days
+    ]
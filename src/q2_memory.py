@@ -3,17 +3,55 @@ Module for finding the top N most used emojis in tweets.
 Optimized for low memory usage by processing the file line by line.
 """
 
-from typing import List, Tuple
-import json
-import re
+from typing import Any, Dict, List, Tuple
 from collections import Counter
 
-from utils import get_local_file_path
+from emojis import extract_emojis, may_contain_emojis
+from pipeline import Aggregator, get_aggregators, register_aggregator, run_serial
+from ranking import top_counts
+from state_codec import decode_counter, encode_counter
+
+# Top-level tweet fields read by this question.
+TWEET_FIELDS = ("content",)
+
+
+def count_tweet_emojis(tweet_data: Dict[str, Any], emoji_counter: Counter) -> None:
+    """
+    Adds the emojis found in a tweet's content to the counter. Each full emoji
+    sequence (skin tone, ZWJ sequence, flag, keycap) counts as one emoji.
+
+    Args:
+        tweet_data: Decoded tweet record.
+        emoji_counter: Counter (or any counter with `update`) of emoji
+            occurrences to update.
+    """
+    content = tweet_data.get("content")
+    if not content:
+        return
+    emoji_counter.update(extract_emojis(content))
+
+
+register_aggregator(
+    "q2",
+    Aggregator(
+        Counter,
+        count_tweet_emojis,
+        Counter.update,
+        top_counts,
+        TWEET_FIELDS,
+        serialize=encode_counter,
+        deserialize=decode_counter,
+        line_filter=may_contain_emojis,
+        stage="emoji_matching",
+    ),
+)
 
 
 def q2_memory(file_path: str, top_n: int = 10) -> List[Tuple[str, int]]:
     """
-    Finds the top N most used emojis in all tweets (memory-efficient).
+    Finds the top N most used emojis in all tweets (memory-efficient, GCS files
+    are streamed instead of downloaded). Lines without any non-ASCII byte are
+    skipped without being decoded.
 
     Args:
         file_path: Path to the tweets file (JSON lines format).
@@ -22,32 +60,5 @@ def q2_memory(file_path: str, top_n: int = 10) -> List[Tuple[str, int]]:
     Returns:
         List of tuples: (emoji, count).
     """
-    file_path = get_local_file_path(file_path)
-    emoji_counter = Counter()
-
-    # Changed: removed "+" so each emoji is matched individually.
-    emoji_pattern = re.compile(
-        "["
-        "\U0001f600-\U0001f64f"
-        "\U0001f300-\U0001f5ff"
-        "\U0001f680-\U0001f6ff"
-        "\U0001f1e0-\U0001f1ff"
-        "\U00002700-\U000027bf"
-        "\U000024c2-\U0001f251"
-        "]",
-        flags=re.UNICODE,
-    )
-
-    with open(file_path, encoding="utf-8") as infile:
-        for raw_line in infile:
-            try:
-                tweet_data = json.loads(raw_line)
-                content = tweet_data.get("content")
-                if not content:
-                    continue
-                emojis_found = emoji_pattern.findall(content)
-                emoji_counter.update(emojis_found)
-            except json.JSONDecodeError:
-                continue
-
-    return emoji_counter.most_common(top_n)
+    aggregators = get_aggregators(["q2"])
+    return run_serial(aggregators, file_path, top_n, line_filters=True)["q2"]
@@ -1,20 +1,28 @@
 """
 Module for finding the top N most used emojis in tweets.
-Optimized for execution speed using pandas.
+Optimized for execution speed by scanning tweet contents in large batches.
 """
 
-import json
-import re
+from collections import Counter
 from typing import List, Tuple
 
-import pandas as pd
+from emojis import count_emojis, may_contain_emojis
+from metrics import METRICS
+from ranking import top_counts
+from tweet_cache import read_tweet_cache
+from utils import get_local_file_path, iter_tweets
 
-from utils import get_local_file_path
+# Number of tweet contents scanned together as one text.
+CONTENT_BATCH_SIZE = 50_000
 
 
 def q2_time(file_path: str, top_n: int = 10) -> List[Tuple[str, int]]:
     """
-    Finds the top N most used emojis in all tweets (fast, loads all into memory).
+    Finds the top N most used emojis in all tweets (fast). Contents are joined in
+    batches of `CONTENT_BATCH_SIZE` tweets and each batch is scanned as a single
+    text, so no per-tweet lists of emojis are built and only one batch of
+    contents is held in memory when reading the JSON file. Reads the columnar
+    tweet cache instead of the JSON file when one exists.
 
     Args:
         file_path: Path to the tweets file (JSON lines format).
@@ -23,36 +31,31 @@ def q2_time(file_path: str, top_n: int = 10) -> List[Tuple[str, int]]:
     Returns:
         List of tuples: (emoji, count).
     """
+    emoji_counter = Counter()
+
+    cached = read_tweet_cache(file_path, ["content"])
+    if cached is not None:
+        contents = cached["content"].dropna()
+        for start in range(0, len(contents), CONTENT_BATCH_SIZE):
+            batch = contents.iloc[start : start + CONTENT_BATCH_SIZE]
+            with METRICS.stage("emoji_matching"):
+                count_emojis("\n".join(batch), emoji_counter)
+        return top_counts(emoji_counter, top_n)
+
     file_path = get_local_file_path(file_path)
-    tweet_contents = []
-
-    with open(file_path, encoding="utf-8") as infile:
-        for raw_line in infile:
-            try:
-                tweet_data = json.loads(raw_line)
-                content = tweet_data.get("content")
-                if content:
-                    tweet_contents.append(content)
-            except json.JSONDecodeError:
-                continue
-
-    if not tweet_contents:
-        return []
-
-    # Changed: removed "+" so each emoji is matched individually.
-    emoji_pattern = re.compile(
-        "["
-        "\U0001f600-\U0001f64f"
-        "\U0001f300-\U0001f5ff"
-        "\U0001f680-\U0001f6ff"
-        "\U0001f1e0-\U0001f1ff"
-        "\U00002700-\U000027bf"
-        "\U000024c2-\U0001f251"
-        "]",
-        flags=re.UNICODE,
-    )
-
-    content_series = pd.Series(tweet_contents)
-    all_emojis = content_series.str.findall(emoji_pattern).explode()
-    emoji_counts = all_emojis.value_counts().head(top_n)
-    return list(emoji_counts.items())
+    batch = []
+
+    for tweet_data in iter_tweets(
+        file_path, ("content",), line_filter=may_contain_emojis
+    ):
+        content = tweet_data.get("content")
+        if content:
+            batch.append(content)
+        if len(batch) == CONTENT_BATCH_SIZE:
+            with METRICS.stage("emoji_matching"):
+                count_emojis("\n".join(batch), emoji_counter)
+            batch.clear()
+
+    with METRICS.stage("emoji_matching"):
+        count_emojis("\n".join(batch), emoji_counter)
+    return top_counts(emoji_counter, top_n)
@@ -4,16 +4,73 @@ Module for finding the top N most mentioned usernames in all tweets.
 Optimized for low memory usage by processing the file line by line.
 """
 
-from typing import List, Tuple
-import json
+import re
+from typing import Any, Dict, List, Tuple
 from collections import Counter
 
-from utils import get_local_file_path
+from pipeline import Aggregator, get_aggregators, register_aggregator, run_serial
+from ranking import top_counts
+from state_codec import decode_counter, encode_counter
+
+# Top-level tweet fields read by this question.
+TWEET_FIELDS = ("mentionedUsers",)
+
+# A non-empty mention list starts like this in the raw JSON line.
+MENTIONS_PATTERN = re.compile(rb'"mentionedUsers"\s*:\s*\[')
+
+
+def may_have_mentions(line: bytes) -> bool:
+    """
+    Cheap prefilter on a raw JSON line: False only when the tweet cannot have
+    mentions (no `mentionedUsers` list, e.g. null or missing), so the line can
+    be skipped without decoding. Matches of nested objects are fine: decoded
+    records are still checked.
+
+    Args:
+        line: Raw JSON line.
+
+    Returns:
+        Whether the line may have mentions.
+    """
+    return MENTIONS_PATTERN.search(line) is not None
+
+
+def count_tweet_mentions(tweet_data: Dict[str, Any], mention_counter: Counter) -> None:
+    """
+    Adds the usernames mentioned in a tweet to the counter.
+
+    Args:
+        tweet_data: Decoded tweet record.
+        mention_counter: Counter (or any counter with `update`) of mentioned
+            usernames to update.
+    """
+    mentioned = tweet_data.get("mentionedUsers")
+    if isinstance(mentioned, list):
+        mention_counter.update(
+            username for user in mentioned if (username := user.get("username"))
+        )
+
+
+register_aggregator(
+    "q3",
+    Aggregator(
+        Counter,
+        count_tweet_mentions,
+        Counter.update,
+        top_counts,
+        TWEET_FIELDS,
+        serialize=encode_counter,
+        deserialize=decode_counter,
+        line_filter=may_have_mentions,
+    ),
+)
 
 
 def q3_memory(file_path: str, top_n: int = 10) -> List[Tuple[str, int]]:
     """
-    Finds the top N usernames most frequently mentioned in all tweets.
+    Finds the top N usernames most frequently mentioned in all tweets. GCS files
+    are streamed instead of downloaded, and lines without a mention list are
+    skipped without being decoded.
 
     Args:
         file_path: Path to the tweets file (JSON lines format).
@@ -22,20 +79,5 @@ def q3_memory(file_path: str, top_n: int = 10) -> List[Tuple[str, int]]:
     Returns:
         List of tuples: (username, mention_count).
     """
-    file_path = get_local_file_path(file_path)
-    mention_counter = Counter()
-
-    with open(file_path, encoding="utf-8") as infile:
-        for raw_line in infile:
-            try:
-                tweet_data = json.loads(raw_line)
-                mentioned = tweet_data.get("mentionedUsers")
-                if isinstance(mentioned, list):
-                    for user in mentioned:
-                        username = user.get("username")
-                        if username:
-                            mention_counter[username] += 1
-            except json.JSONDecodeError:
-                continue  # Skip malformed JSON lines
-
-    return mention_counter.most_common(top_n)
+    aggregators = get_aggregators(["q3"])
+    return run_serial(aggregators, file_path, top_n, line_filters=True)["q3"]
@@ -5,15 +5,18 @@ Optimized for execution speed using pandas.
 """
 
 from typing import List, Tuple
-import json
 import pandas as pd
 
-from utils import get_local_file_path
+from q3_memory import may_have_mentions
+from ranking import top_items
+from tweet_cache import read_tweet_cache
+from utils import get_local_file_path, iter_tweets
 
 
 def q3_time(file_path: str, top_n: int = 10) -> List[Tuple[str, int]]:
     """
     Finds the top N usernames most frequently mentioned in all tweets.
+    Reads the columnar tweet cache instead of the JSON file when one exists.
 
     Args:
         file_path: Path to the tweets file (JSON lines format).
@@ -22,27 +25,28 @@ def q3_time(file_path: str, top_n: int = 10) -> List[Tuple[str, int]]:
     Returns:
         List of tuples: (username, mention_count).
     """
-    file_path = get_local_file_path(file_path)
-    mention_lists = []
-
-    with open(file_path, encoding="utf-8") as infile:
-        for raw_line in infile:
-            try:
-                tweet_data = json.loads(raw_line)
-                mentioned = tweet_data.get("mentionedUsers")
-                if isinstance(mentioned, list):
-                    usernames = [
-                        user.get("username")
-                        for user in mentioned
-                        if user.get("username")
-                    ]
-                    mention_lists.extend(usernames)
-            except json.JSONDecodeError:
-                continue
+    cached = read_tweet_cache(file_path, ["mentions"])
+    if cached is not None:
+        mentions = cached["mentions"].explode().dropna()
+        mention_lists = mentions[mentions.astype(bool)].tolist()
+    else:
+        file_path = get_local_file_path(file_path)
+        mention_lists = []
+
+        for tweet_data in iter_tweets(
+            file_path, ("mentionedUsers",), line_filter=may_have_mentions
+        ):
+            mentioned = tweet_data.get("mentionedUsers")
+            if isinstance(mentioned, list):
+                usernames = [
+                    user.get("username") for user in mentioned if user.get("username")
+                ]
+                mention_lists.extend(usernames)
 
     if not mention_lists:
         return []
 
     mention_series = pd.Series(mention_lists)
-    mention_counts = mention_series.value_counts().head(top_n)
-    return list(mention_counts.items())
+    # Unsorted counts: only the keys tied with the N-th count are ranked in Python.
+    mention_counts = mention_series.value_counts(sort=False)
+    return top_items(mention_counts.nlargest(top_n, keep="all").items(), top_n)
@@ -0,0 +1,63 @@
+"""ranking.py
+
+Module for the top-N selection shared by every solver. Items are ranked by
+count, highest first, and ties by key, ascending (earliest date, then
+alphabetical username or emoji), so the time, memory, parallel, sharded and
+distributed runs return the same list whatever the order the data was read or
+merged in.
+
+Selection keeps a heap of the best N items while walking the counts once:
+O(n log N) for n distinct keys, instead of sorting all of them, which matters
+for the long tail of mentioned users and emojis.
+"""
+
+import heapq
+from typing import Any, Hashable, Iterable, List, Mapping, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+def rank_key(item: Tuple[Any, int]) -> Tuple[int, Any]:
+    """Sort key of a (key, count) item: highest count first, then lowest key."""
+    return -item[1], item[0]
+
+
+def top_items(items: Iterable[Tuple[K, int]], top_n: int) -> List[Tuple[K, int]]:
+    """
+    Selects the top N (key, count) items.
+
+    Args:
+        items: (key, count) pairs with unique keys.
+        top_n: Number of items to return.
+
+    Returns:
+        Up to `top_n` items, highest count first and ties by ascending key.
+    """
+    if top_n <= 0:
+        return []
+    return heapq.nsmallest(top_n, items, key=rank_key)
+
+
+def top_counts(counts: Mapping[K, int], top_n: int) -> List[Tuple[K, int]]:
+    """
+    Selects the top N keys of a counter, like `Counter.most_common` but with
+    ties broken by key rather than by insertion order.
+
+    Args:
+        counts: Counts by key (e.g. a Counter).
+        top_n: Number of items to return.
+
+    Returns:
+        List of tuples (key, count), highest first.
+    """
+    return top_items(counts.items(), top_n)
+
+
+def top_key(items: Iterable[Tuple[K, int]]) -> K:
+    """
+    Returns the key with the highest count, the lowest key on ties.
+
+    Raises:
+        ValueError: If there are no items.
+    """
+    return min(items, key=rank_key)[0]
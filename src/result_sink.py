@@ -0,0 +1,322 @@
+"""result_sink.py
+
+Module for writing the results of Q1, Q2 and Q3 to their tables.
+
+A run replaces today's rows of each method it computed. Sinks receive the
+results as they are computed, group them per table, and write each table with a
+single job covering every method (delete of today's rows plus insert, in one
+transaction). Writes run in a background thread, so they overlap with the
+computation of the next question.
+
+`BigQueryResultSink` reuses one client for all writes; google-cloud-bigquery is
+only imported when it writes. `SQLiteResultSink` is a
+local stand-in with the same tables and semantics, for tests and offline runs.
+"""
+
+import logging
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from metrics import METRICS
+
+TABLES = {"q1": "q1_results", "q2": "q2_results", "q3": "q3_results"}
+
+# Result columns of each question's table, with their BigQuery types.
+RESULT_COLUMNS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "q1": (("tweet_date", "DATE"), ("top_user", "STRING")),
+    "q2": (("emoji", "STRING"), ("count", "INT64")),
+    "q3": (("username", "STRING"), ("mention_count", "INT64")),
+}
+
+# Ingestion timestamps use the America/Santiago timezone, and "today's rows"
+# are those ingested on the current date there, in every sink.
+INGESTION_TIMEZONE_NAME = "America/Santiago"
+INGESTION_TIMEZONE = ZoneInfo(INGESTION_TIMEZONE_NAME)
+
+
+def build_result_rows(
+    result: List[Tuple[Any, ...]], question: str, method: str, ingested_at: str
+) -> List[Dict[str, Any]]:
+    """
+    Converts a result list into table rows, adding 'method' and 'ingested_at'.
+
+    Args:
+        result: List of tuples (output from Q functions)
+        question: "q1", "q2", or "q3"
+        method: Method that produced the result
+        ingested_at: ISO timestamp of the ingestion
+
+    Returns:
+        One row dictionary per result tuple.
+    """
+    columns = [name for name, _ in RESULT_COLUMNS[question]]
+    return [
+        {
+            columns[0]: str(row[0]) if question == "q1" else row[0],
+            columns[1]: row[1],
+            "method": method,
+            "ingested_at": ingested_at,
+        }
+        for row in result
+    ]
+
+
+class ResultSink:
+    """
+    Base class buffering results per table and writing them in the background.
+
+    Subclasses implement `write_rows`, which must replace today's rows of the
+    given methods with the new rows in a single job/transaction, and log (not
+    raise) the errors of the database.
+    """
+
+    def __init__(self) -> None:
+        self.pending: Dict[str, Dict[str, List[Tuple[Any, ...]]]] = {}
+        self.executor = ThreadPoolExecutor(
+            max_workers=len(TABLES), thread_name_prefix="result-sink"
+        )
+        self.futures: List[Future] = []
+
+    def add(self, question: str, method: str, result: List[Tuple[Any, ...]]) -> None:
+        """Buffers the result of a question computed with a method."""
+        if question not in TABLES:
+            raise ValueError(f"Unknown question: {question}")
+        self.pending.setdefault(question, {})[method] = result
+
+    def flush(self, question: Optional[str] = None) -> None:
+        """
+        Starts writing the buffered results of a question (or of every question)
+        in the background; each table gets a single write.
+
+        Args:
+            question: Question whose results are complete, or None for all.
+        """
+        questions = [question] if question else list(self.pending)
+        now = datetime.now(INGESTION_TIMEZONE)
+        ingested_at = now.isoformat()
+        for q in questions:
+            results = self.pending.pop(q, None)
+            if not results:
+                continue
+            rows = [
+                row
+                for method, result in results.items()
+                for row in build_result_rows(result, q, method, ingested_at)
+            ]
+            self.futures.append(
+                self.executor.submit(
+                    self.write_table, q, list(results), rows, now.date()
+                )
+            )
+
+    def write_table(
+        self,
+        question: str,
+        methods: List[str],
+        rows: List[Dict[str, Any]],
+        partition_date: date,
+    ) -> None:
+        """Writes one table, logging the outcome like the CLI expects."""
+        with METRICS.stage("results_write"):
+            saved = self.write_rows(question, methods, rows, partition_date)
+        if saved:
+            logging.info(
+                "Saved %d %s rows for methods %s",
+                len(rows),
+                question,
+                ", ".join(methods),
+            )
+
+    def write_rows(
+        self,
+        question: str,
+        methods: List[str],
+        rows: List[Dict[str, Any]],
+        partition_date: date,
+    ) -> bool:
+        """
+        Replaces today's rows of `methods` in the question's table.
+
+        Returns:
+            Whether the rows were saved; failures are logged.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Writes anything still buffered and waits for every pending write."""
+        self.flush()
+        for future in self.futures:
+            future.result()
+        self.futures.clear()
+        self.executor.shutdown()
+
+    def __enter__(self) -> "ResultSink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class BigQueryResultSink(ResultSink):
+    """Writes results to BigQuery with one client and one query job per table."""
+
+    def __init__(self, project_id: str, dataset_id: str) -> None:
+        super().__init__()
+        self.project_id = project_id
+        self.dataset_id = dataset_id
+        self._client: Any = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        """
+        BigQuery client, created on first use and reused afterwards. The lock
+        keeps concurrent table writes from building a client each.
+        """
+        with self._client_lock:
+            if self._client is None:
+                from google.cloud import bigquery
+
+                self._client = bigquery.Client(project=self.project_id)
+            return self._client
+
+    def write_rows(
+        self,
+        question: str,
+        methods: List[str],
+        rows: List[Dict[str, Any]],
+        partition_date: date,
+    ) -> bool:
+        from google.api_core.exceptions import (
+            BadRequest,
+            Forbidden,
+            GoogleAPIError,
+            NotFound,
+        )
+        from google.cloud import bigquery
+
+        table_id = f"{self.project_id}.{self.dataset_id}.{TABLES[question]}"
+        columns = RESULT_COLUMNS[question]
+        column_names = ", ".join(name for name, _ in columns)
+
+        # Rows are passed as an ARRAY<STRUCT> parameter, so the delete and the
+        # insert run as a single multi-statement transaction (one job).
+        insert = (
+            f"INSERT INTO `{table_id}` ({column_names}, method, ingested_at) "
+            f"SELECT {column_names}, method, TIMESTAMP(ingested_at) "
+            "FROM UNNEST(@rows);"
+            if rows
+            else ""
+        )  # nosec B608
+        # Today's rows as an explicit ingested_at range, so BigQuery prunes the
+        # partitions (the tables require a partition filter).
+        script = f"""
+        BEGIN TRANSACTION;
+        DELETE FROM `{table_id}`
+        WHERE ingested_at >= TIMESTAMP(@partition_date, "{INGESTION_TIMEZONE_NAME}")
+            AND ingested_at < TIMESTAMP(
+                DATE_ADD(@partition_date, INTERVAL 1 DAY), "{INGESTION_TIMEZONE_NAME}"
+            )
+            AND method IN UNNEST(@methods);
+        {insert}
+        COMMIT TRANSACTION;
+        """  # nosec B608
+        row_parameters = [
+            bigquery.StructQueryParameter(
+                None,
+                *(
+                    bigquery.ScalarQueryParameter(name, field_type, row[name])
+                    for name, field_type in columns
+                ),
+                bigquery.ScalarQueryParameter("method", "STRING", row["method"]),
+                bigquery.ScalarQueryParameter(
+                    "ingested_at", "STRING", row["ingested_at"]
+                ),
+            )
+            for row in rows
+        ]
+        query_parameters = [
+            bigquery.ScalarQueryParameter("partition_date", "DATE", partition_date),
+            bigquery.ArrayQueryParameter("methods", "STRING", methods),
+        ]
+        if row_parameters:
+            query_parameters.append(
+                bigquery.ArrayQueryParameter("rows", "STRUCT", row_parameters)
+            )
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+        # A failed script rolls back as a whole, so nothing was written. The
+        # tables are managed by Terraform: a missing one is not created here.
+        try:
+            self.client.query(script, job_config=job_config).result()
+        except NotFound:
+            logging.error("Table not found: %s. Results not saved.", table_id)
+            return False
+        except Forbidden:
+            logging.error("Permission denied when trying to write to %s", table_id)
+            return False
+        except BadRequest as e:
+            logging.error("BadRequest writing to table: %s | %s", table_id, e)
+            return False
+        except GoogleAPIError as e:
+            logging.error("GoogleAPIError writing to %s: %s", table_id, e)
+            return False
+        return True
+
+
+class SQLiteResultSink(ResultSink):
+    """Local stand-in writing the result tables to a SQLite database."""
+
+    SQLITE_TYPES = {"DATE": "TEXT", "STRING": "TEXT", "INT64": "INTEGER"}
+
+    def __init__(self, database_path: str) -> None:
+        super().__init__()
+        self.database_path = database_path
+
+    def write_rows(
+        self,
+        question: str,
+        methods: List[str],
+        rows: List[Dict[str, Any]],
+        partition_date: date,
+    ) -> bool:
+        table = TABLES[question]
+        columns = [name for name, _ in RESULT_COLUMNS[question]]
+        column_types = ", ".join(
+            f"{name} {self.SQLITE_TYPES[field_type]}"
+            for name, field_type in RESULT_COLUMNS[question]
+        )
+        method_placeholders = ", ".join("?" for _ in methods)
+        row_placeholders = ", ".join("?" for _ in range(len(columns) + 2))
+
+        # One connection per write: connections cannot be shared across threads.
+        try:
+            with closing(sqlite3.connect(self.database_path, timeout=30)) as connection:
+                with connection:
+                    connection.execute(
+                        f"CREATE TABLE IF NOT EXISTS {table} "
+                        f"({column_types}, method TEXT, ingested_at TEXT)"
+                    )
+                    connection.execute(
+                        f"DELETE FROM {table} WHERE substr(ingested_at, 1, 10) = ? "
+                        f"AND method IN ({method_placeholders})",  # nosec B608
+                        [partition_date.isoformat(), *methods],
+                    )
+                    connection.executemany(
+                        f"INSERT INTO {table} VALUES ({row_placeholders})",  # nosec B608
+                        [
+                            [row[name] for name in columns]
+                            + [row["method"], row["ingested_at"]]
+                            for row in rows
+                        ],
+                    )
+        except sqlite3.Error as e:
+            logging.error(
+                "Failed to save %s results to %s: %s", table, self.database_path, e
+            )
+            return False
+        return True
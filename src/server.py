@@ -0,0 +1,396 @@
+"""server.py
+
+Query server that keeps the Q1, Q2 and Q3 aggregates hot in memory.
+
+The tweets file is scanned once at startup into an hourly per-user index (Q1)
+and per-day emoji and mention counters (Q2, Q3). Queries with any `top_n`,
+timezone, granularity or date window are then answered from memory over a
+local HTTP API (TCP or Unix socket) in milliseconds. The source fingerprint is
+polled and the aggregates are rebuilt in the background when the file changes;
+queries keep being answered from the previous version meanwhile.
+
+Endpoints (all GET, JSON responses):
+    /q1?top_n=10&timezone=UTC&granularity=day&since=...&until=...
+    /q2?top_n=10&since=2021-02-12&until=2021-02-20
+    /q3?top_n=10&since=...&until=...
+    /health
+
+`since` is inclusive and `until` exclusive. Q2 and Q3 windows are whole UTC
+days; Q1 windows are ISO dates/datetimes in the requested timezone.
+
+Usage:
+    python src/server.py --port 8080
+    python src/server.py --socket /tmp/tweets.sock --file tweets.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from emojis import extract_emojis
+from ranking import rank_key
+from time_index import HourlyUserIndex, parse_time_bound
+from timestamps import parse_tweet_timestamp
+from utils import get_config_value, get_source_fingerprint, iter_tweets
+
+ENDPOINTS = ("q1", "q2", "q3", "health")
+EPOCH = date(1970, 1, 1)
+HOURS_PER_DAY = 24
+# Filtered Q2/Q3 results kept per aggregates version.
+QUERY_CACHE_SIZE = 256
+
+
+class TweetAggregates:
+    """
+    In-memory aggregates answering Q1, Q2 and Q3 for any top N and time window.
+
+    Emoji and mention counts are kept per UTC day (tweets without a valid date
+    under None) and as totals, so unfiltered queries need no merging and keep
+    the ordering of a single pass.
+    """
+
+    def __init__(self) -> None:
+        self.time_index = HourlyUserIndex()
+        self.emoji_counter = Counter()
+        self.mention_counter = Counter()
+        self.daily_emojis: Dict[Optional[date], Counter] = {}
+        self.daily_mentions: Dict[Optional[date], Counter] = {}
+        self.query_cache: Dict[Tuple[Any, ...], List[Tuple[str, int]]] = {}
+        self.cache_lock = threading.Lock()
+
+    def add_tweet(self, tweet_data: Dict[str, Any]) -> None:
+        """
+        Adds one decoded tweet to every aggregate.
+
+        Args:
+            tweet_data: Decoded tweet record.
+        """
+        day = None
+        tweet_date_str = tweet_data.get("date")
+        if tweet_date_str:
+            try:
+                _, hour = parse_tweet_timestamp(tweet_date_str)
+            except (ValueError, TypeError):
+                pass
+            else:
+                day = EPOCH + timedelta(days=hour // HOURS_PER_DAY)
+                user_data = tweet_data.get("user")
+                username = user_data.get("username") if user_data else None
+                if username:
+                    self.time_index.add(hour, username)
+
+        content = tweet_data.get("content")
+        if content:
+            emojis = extract_emojis(content)
+            if emojis:
+                self.emoji_counter.update(emojis)
+                self.daily_emojis.setdefault(day, Counter()).update(emojis)
+
+        mentioned = tweet_data.get("mentionedUsers")
+        if isinstance(mentioned, list):
+            usernames = [
+                username for user in mentioned if (username := user.get("username"))
+            ]
+            if usernames:
+                self.mention_counter.update(usernames)
+                self.daily_mentions.setdefault(day, Counter()).update(usernames)
+
+    @classmethod
+    def build(cls, file_path: str) -> "TweetAggregates":
+        """
+        Scans a tweets file into aggregates. GCS files are streamed.
+
+        Args:
+            file_path: Path to the tweets file (JSON lines format, local or cloud).
+
+        Returns:
+            The aggregates of the file.
+        """
+        aggregates = cls()
+        fields = ("date", "user", "content", "mentionedUsers")
+        for tweet_data in iter_tweets(file_path, fields):
+            aggregates.add_tweet(tweet_data)
+        return aggregates
+
+    def q1(
+        self,
+        top_n: int = 10,
+        time_zone: str = "UTC",
+        granularity: str = "day",
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[Tuple[Any, str]]:
+        """Top N time buckets and the most active user of each (see `time_index`)."""
+        return self.time_index.top_buckets(
+            top_n,
+            time_zone,
+            granularity,
+            parse_time_bound(since, time_zone),
+            parse_time_bound(until, time_zone),
+        )
+
+    def q2(
+        self, top_n: int = 10, since: Optional[str] = None, until: Optional[str] = None
+    ) -> List[Tuple[str, int]]:
+        """Top N emojis, optionally of the UTC days in [since, until)."""
+        return self.top_counts(
+            "q2", self.emoji_counter, self.daily_emojis, top_n, since, until
+        )
+
+    def q3(
+        self, top_n: int = 10, since: Optional[str] = None, until: Optional[str] = None
+    ) -> List[Tuple[str, int]]:
+        """Top N mentioned usernames, optionally of the UTC days in [since, until)."""
+        return self.top_counts(
+            "q3", self.mention_counter, self.daily_mentions, top_n, since, until
+        )
+
+    def top_counts(
+        self,
+        question: str,
+        total: Counter,
+        daily: Dict[Optional[date], Counter],
+        top_n: int,
+        since: Optional[str],
+        until: Optional[str],
+    ) -> List[Tuple[str, int]]:
+        """
+        Picks the top N keys of the totals, or of the days in a window. The full
+        ranking of each window is computed once and cached, so later queries
+        with any `top_n` only slice it.
+
+        Args:
+            question: Question name, part of the cache key.
+            total: Counts over every tweet.
+            daily: Counts per UTC day.
+            top_n: Number of top keys to return.
+            since: First day of the window (ISO date), or None.
+            until: Day after the window (ISO date), or None.
+
+        Returns:
+            List of tuples: (key, count).
+        """
+        first_day = date.fromisoformat(since) if since else None
+        end_day = date.fromisoformat(until) if until else None
+        cache_key = (question, first_day, end_day)
+        with self.cache_lock:
+            ranking = self.query_cache.get(cache_key)
+        if ranking is None:
+            if first_day is None and end_day is None:
+                window = total
+            else:
+                window = Counter()
+                for day, counts in daily.items():
+                    if day is None:
+                        continue
+                    if (first_day and day < first_day) or (end_day and day >= end_day):
+                        continue
+                    window.update(counts)
+            ranking = sorted(window.items(), key=rank_key)
+            with self.cache_lock:
+                if len(self.query_cache) >= QUERY_CACHE_SIZE:
+                    self.query_cache.clear()
+                self.query_cache[cache_key] = ranking
+        return ranking[:top_n]
+
+
+class QueryService:
+    """Holds the current aggregates of a file and rebuilds them when it changes."""
+
+    def __init__(self, file_path: str, reload_interval: float = 60.0) -> None:
+        self.file_path = file_path
+        self.reload_interval = reload_interval
+        self.fingerprint = get_source_fingerprint(file_path)
+        started = time.perf_counter()
+        self.aggregates = TweetAggregates.build(file_path)
+        self.build_seconds = time.perf_counter() - started
+        self.loaded_at = datetime.now().astimezone()
+        self.reload_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        logging.info("Aggregates built in %.2fs: %s", self.build_seconds, file_path)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Rebuilds the aggregates if the source file changed since they were built.
+        The previous aggregates keep answering queries until the new ones are
+        swapped in.
+
+        Returns:
+            True if the aggregates were rebuilt.
+        """
+        with self.reload_lock:
+            fingerprint = get_source_fingerprint(self.file_path)
+            if fingerprint == self.fingerprint:
+                return False
+            logging.info("Source file changed; rebuilding aggregates...")
+            started = time.perf_counter()
+            aggregates = TweetAggregates.build(self.file_path)
+            self.aggregates = aggregates
+            self.fingerprint = fingerprint
+            self.build_seconds = time.perf_counter() - started
+            self.loaded_at = datetime.now().astimezone()
+            logging.info("Aggregates rebuilt in %.2fs", self.build_seconds)
+            return True
+
+    def watch(self) -> None:
+        """Polls the source file every `reload_interval` seconds until stopped."""
+        while not self.stop_event.wait(self.reload_interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:  # keep serving the current aggregates
+                logging.error("Failed to reload aggregates: %s", e)
+
+    def query(self, question: str, params: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Answers a query from the current aggregates.
+
+        Args:
+            question: One of `ENDPOINTS`.
+            params: Query string parameters.
+
+        Returns:
+            JSON-serializable response body.
+        """
+        if question == "health":
+            return {
+                "status": "ok",
+                "file": self.file_path,
+                "fingerprint": self.fingerprint,
+                "loaded_at": self.loaded_at.isoformat(),
+                "build_seconds": round(self.build_seconds, 3),
+            }
+
+        aggregates = self.aggregates
+        top_n = int(params.get("top_n", 10))
+        if top_n < 0:
+            raise ValueError(f"top_n must be non-negative, got {top_n}")
+        since = params.get("since")
+        until = params.get("until")
+        if question == "q1":
+            result = aggregates.q1(
+                top_n,
+                params.get("timezone", "UTC"),
+                params.get("granularity", "day"),
+                since,
+                until,
+            )
+        elif question == "q2":
+            result = aggregates.q2(top_n, since, until)
+        else:
+            result = aggregates.q3(top_n, since, until)
+        return {"question": question, "result": result}
+
+
+def make_handler(service: QueryService) -> type:
+    """Creates the request handler class bound to a query service."""
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            endpoint = url.path.strip("/")
+            if endpoint not in ENDPOINTS:
+                body, status = {"error": f"Unknown endpoint: {url.path}"}, 404
+            else:
+                try:
+                    body, status = service.query(endpoint, params), 200
+                # Invalid numbers, dates, timezones or granularities.
+                except (ValueError, TypeError, LookupError) as e:
+                    body, status = {"error": str(e)}, 400
+            payload = json.dumps(body, ensure_ascii=False, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def address_string(self) -> str:
+            # Unix socket clients have no (host, port) address.
+            return self.client_address[0] if self.client_address else "unix"
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logging.debug("%s - %s", self.address_string(), format % args)
+
+    return QueryHandler
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded HTTP server listening on a Unix domain socket."""
+
+    daemon_threads = True
+
+
+def create_server(
+    service: QueryService,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    socket_path: Optional[str] = None,
+) -> socketserver.BaseServer:
+    """
+    Creates the HTTP server answering queries of a service.
+
+    Args:
+        service: Service holding the aggregates.
+        host: Interface to listen on (TCP).
+        port: Port to listen on (TCP; 0 picks a free one).
+        socket_path: Unix socket path; when given, TCP is not used.
+
+    Returns:
+        The server, ready for `serve_forever`.
+    """
+    handler = make_handler(service)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        return UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Serve Q1-Q3 queries from memory.")
+    parser.add_argument(
+        "--file",
+        default=None,
+        help="Tweets file (local path or GCS URI; default: BUCKET/FILENAME config).",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on.")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on.")
+    parser.add_argument(
+        "--socket", default=None, help="Listen on this Unix socket instead of TCP."
+    )
+    parser.add_argument(
+        "--reload_interval",
+        type=float,
+        default=60.0,
+        help="Seconds between checks of the source file for changes.",
+    )
+    args = parser.parse_args()
+
+    file_path = (
+        args.file or f"gs://{get_config_value('BUCKET')}/{get_config_value('FILENAME')}"
+    )
+    service = QueryService(file_path, args.reload_interval)
+    server = create_server(service, args.host, args.port, args.socket)
+    threading.Thread(target=service.watch, daemon=True).start()
+    logging.info("Serving queries on %s", args.socket or f"{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop_event.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
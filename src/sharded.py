@@ -0,0 +1,82 @@
+"""sharded.py
+
+Module for solving Q1, Q2 and Q3 over a dataset split into several files
+(e.g. daily shards under a GCS prefix). Each shard is aggregated in a separate
+process, decoding every line once for all the requested questions, and the
+partial states are merged in shard order, so the results equal those of the
+memory-optimized solutions over the concatenated files.
+
+GCS shards are streamed with ranged reads (see `utils.iter_lines`), so their
+download overlaps with the parsing in the same worker and with the other
+shards; nothing is concatenated or written to disk.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from metrics import METRICS
+from pipeline import ScanCounts, get_aggregators, scan_file, select_results
+
+
+def aggregate_shard(
+    questions: Sequence[str], file_path: str
+) -> Tuple[Dict[str, Any], ScanCounts]:
+    """
+    Aggregates the tweets of one shard for several questions in a single pass.
+
+    Args:
+        questions: Questions to aggregate ('q1', 'q2', 'q3').
+        file_path: Path to the shard (GCS URI or local path, possibly compressed).
+
+    Returns:
+        The partial state of each question and the line counters of the shard
+        (worker processes cannot update the parent's metrics).
+    """
+    return scan_file(questions, file_path)
+
+
+def sharded_solve(
+    questions: Sequence[str],
+    file_paths: Sequence[str],
+    top_n: int = 10,
+    workers: Optional[int] = None,
+) -> Dict[str, List[Tuple[Any, ...]]]:
+    """
+    Solves questions over several shard files processed concurrently.
+
+    Args:
+        questions: Questions to solve ('q1', 'q2', 'q3').
+        file_paths: Shard files (GCS URIs or local paths), in dataset order.
+        top_n: Number of top results (default is 10).
+        workers: Number of worker processes (default is the CPU count, and
+            never more than the number of shards).
+
+    Returns:
+        Dictionary {question: result} with the same lists of tuples the serial
+        memory-optimized solutions return for the concatenated shards.
+    """
+    aggregators = get_aggregators(questions)
+    merged = {q: aggregator.new_state() for q, aggregator in aggregators.items()}
+
+    def merge(result: Tuple[Dict[str, Any], ScanCounts]) -> None:
+        states, counts = result
+        for q, state in states.items():
+            aggregators[q].merge(merged[q], state)
+        METRICS.count_lines(*counts)
+
+    workers = min(workers or os.cpu_count() or 1, len(file_paths))
+    if workers <= 1:
+        for file_path in file_paths:
+            merge(aggregate_shard(questions, file_path))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(aggregate_shard, questions, file_path)
+                for file_path in file_paths
+            ]
+            # Merged in shard order, so states match a single pass.
+            for future in futures:
+                merge(future.result())
+
+    return select_results(aggregators, merged, top_n)
@@ -0,0 +1,244 @@
+"""sketches.py
+
+Module provides bounded-memory heavy-hitter sketches for approximate top-K
+queries over streams too large to count exactly. Sketches of separate parts of
+a stream can be merged and encoded, like the exact aggregation states.
+"""
+
+import math
+from array import array
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+from ranking import top_counts
+from state_codec import (
+    array_from_bytes,
+    array_to_bytes,
+    decode_strings,
+    encode_strings,
+    pack_sections,
+    unpack_sections,
+)
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch (Metwally et al., 2005) with a fixed number
+    of counters. Counters are grouped in buckets by count, so every update is O(1).
+
+    Guarantees, for a stream of N items and k counters:
+    - estimated counts never underestimate: true <= estimate <= true + error;
+    - each error is at most the minimum counter, which is at most N / k;
+    - every item whose true count exceeds N / k is tracked.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        self.buckets: Dict[int, Dict[Hashable, None]] = {}
+        self.min_count = 0
+
+    @classmethod
+    def from_error(cls, epsilon: float) -> "SpaceSaving":
+        """
+        Creates a sketch whose overestimation is at most epsilon * N.
+
+        Args:
+            epsilon: Relative error bound, between 0 and 1.
+
+        Returns:
+            A sketch with ceil(1 / epsilon) counters.
+        """
+        if not 0 < epsilon < 1:
+            raise ValueError("epsilon must be between 0 and 1")
+        return cls(math.ceil(1 / epsilon))
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    @property
+    def max_error(self) -> int:
+        """Largest possible overestimation of any reported count."""
+        return self.min_count if len(self.counts) >= self.capacity else 0
+
+    def _move(self, key: Hashable, old_count: int, new_count: int) -> None:
+        if old_count:
+            bucket = self.buckets[old_count]
+            del bucket[key]
+            if not bucket:
+                del self.buckets[old_count]
+        self.buckets.setdefault(new_count, {})[key] = None
+        self.counts[key] = new_count
+        if not old_count:
+            self.min_count = (
+                min(self.min_count, new_count) if self.min_count else new_count
+            )
+        elif old_count == self.min_count and old_count not in self.buckets:
+            self._next_min(old_count)
+
+    def _next_min(self, emptied_count: int) -> None:
+        # With unit increments the next bucket up is never empty, so the common
+        # case avoids scanning the buckets.
+        next_count = emptied_count + 1
+        self.min_count = next_count if next_count in self.buckets else min(self.buckets)
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        """
+        Adds `count` occurrences of a key.
+
+        Args:
+            key: Item to count.
+            count: Number of occurrences (default is 1).
+        """
+        self.total += count
+        current = self.counts.get(key)
+        if current is not None:
+            self._move(key, current, current + count)
+            return
+
+        if len(self.counts) < self.capacity:
+            self.errors[key] = 0
+            self._move(key, 0, count)
+            return
+
+        # Replace the oldest item with the minimum count; the new key inherits it
+        # as its maximum overestimation.
+        min_count = self.min_count
+        min_bucket = self.buckets[min_count]
+        evicted = next(iter(min_bucket))
+        del min_bucket[evicted]
+        if not min_bucket:
+            del self.buckets[min_count]
+        del self.counts[evicted]
+        del self.errors[evicted]
+        self.errors[key] = min_count
+        self.buckets.setdefault(min_count + count, {})[key] = None
+        self.counts[key] = min_count + count
+        if min_count not in self.buckets:
+            self._next_min(min_count)
+
+    def update(self, keys: Iterable[Hashable]) -> None:
+        """
+        Adds one occurrence of every key in an iterable.
+
+        Args:
+            keys: Items to count.
+        """
+        for key in keys:
+            self.add(key)
+
+    def merge(self, other: "SpaceSaving") -> None:
+        """
+        Merges a sketch of another part of the stream into this one (Agarwal et
+        al., 2012): counts of the same key are added, a key missing from one
+        sketch takes that sketch's largest possible overestimation as its count
+        there, and the `capacity` highest counters are kept. The merged sketch
+        keeps the guarantees above for the combined stream.
+
+        Args:
+            other: Sketch with the same capacity.
+
+        Raises:
+            ValueError: If the capacities differ.
+        """
+        if other.capacity != self.capacity:
+            raise ValueError("Cannot merge sketches of different capacities")
+        own_error, other_error = self.max_error, other.max_error
+        counts = {}
+        errors = {}
+        for key in dict.fromkeys([*self.counts, *other.counts]):
+            counts[key] = self.counts.get(key, own_error) + other.counts.get(
+                key, other_error
+            )
+            errors[key] = self.errors.get(key, own_error) + other.errors.get(
+                key, other_error
+            )
+        kept = top_counts(counts, self.capacity)
+        self._load(
+            [key for key, _ in kept],
+            [count for _, count in kept],
+            [errors[key] for key, _ in kept],
+        )
+        self.total += other.total
+
+    def _load(
+        self, keys: Sequence[Hashable], counts: Sequence[int], errors: Sequence[int]
+    ) -> None:
+        # Replaces the counters; keys of equal count keep their given order.
+        self.counts = {}
+        self.errors = {}
+        self.buckets = {}
+        for key, count, error in zip(keys, counts, errors):
+            self.counts[key] = count
+            self.errors[key] = error
+            self.buckets.setdefault(count, {})[key] = None
+        self.min_count = min(self.buckets, default=0)
+
+    def to_sections(self) -> List[bytes]:
+        """
+        Encodes the counters as `state_codec` sections: keys (which must be
+        strings), counts and errors, from the lowest count up so the eviction
+        order survives decoding.
+        """
+        keys = [key for count in sorted(self.buckets) for key in self.buckets[count]]
+        return [
+            *encode_strings(keys),
+            array_to_bytes(array("Q", (self.counts[key] for key in keys))),
+            array_to_bytes(array("Q", (self.errors[key] for key in keys))),
+        ]
+
+    @classmethod
+    def from_sections(
+        cls, capacity: int, total: int, sections: Sequence[bytes]
+    ) -> "SpaceSaving":
+        """Rebuilds a sketch from the sections written by `to_sections`."""
+        lengths, joined, counts, errors = sections
+        sketch = cls(capacity)
+        sketch._load(
+            decode_strings(lengths, joined),
+            array_from_bytes("Q", counts),
+            array_from_bytes("Q", errors),
+        )
+        sketch.total = total
+        return sketch
+
+    def to_bytes(self) -> bytes:
+        """Encodes the sketch in the compact binary format of `state_codec`."""
+        header = array_to_bytes(array("Q", (self.capacity, self.total)))
+        return pack_sections([header, *self.to_sections()])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SpaceSaving":
+        """Rebuilds a sketch encoded with `to_bytes`."""
+        header, *sections = unpack_sections(data)
+        capacity, total = array_from_bytes("Q", header)
+        return cls.from_sections(capacity, total, sections)
+
+    def top(self, n: int) -> List[Tuple[Hashable, int, int]]:
+        """
+        Returns the n items with the highest estimated counts.
+
+        Args:
+            n: Number of items to return.
+
+        Returns:
+            List of tuples (item, estimated_count, max_overestimation), highest
+            first and ties by item.
+        """
+        ranked = top_counts(self.counts, n)
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+    def most_common(self, n: int) -> List[Tuple[Hashable, int]]:
+        """
+        Returns the n items with the highest estimated counts, like Counter.most_common.
+
+        Args:
+            n: Number of items to return.
+
+        Returns:
+            List of tuples (item, estimated_count), highest first.
+        """
+        return [(key, count) for key, count, _ in self.top(n)]
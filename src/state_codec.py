@@ -0,0 +1,131 @@
+"""state_codec.py
+
+Module for the compact binary encoding of aggregation states, so partial states
+computed by separate processes or Cloud Run tasks can be stored and merged later.
+
+An encoded state is a list of byte sections (typed arrays and UTF-8 strings),
+each prefixed by its length, compressed with zlib. Strings are stored as one
+array of lengths plus their concatenation, and counts as little-endian typed
+arrays, so decoding costs a few array copies rather than a parse per key.
+Key order is preserved, so decoded partials equal the states that were encoded.
+"""
+
+import struct
+import sys
+import zlib
+from array import array
+from collections import Counter
+from typing import List, Sequence, Tuple
+
+STATE_MAGIC = b"TWST"
+STATE_VERSION = 1
+COMPRESSION_LEVEL = 1
+
+
+def array_to_bytes(values: array) -> bytes:
+    """Returns the little-endian bytes of a typed array."""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def array_from_bytes(typecode: str, data: bytes) -> array:
+    """Rebuilds a typed array from its little-endian bytes."""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def encode_strings(values: Sequence[str]) -> Tuple[bytes, bytes]:
+    """
+    Encodes strings as (array of UTF-8 lengths, concatenated UTF-8 bytes).
+
+    Args:
+        values: Strings to encode.
+
+    Returns:
+        The two sections holding the strings.
+    """
+    encoded = [value.encode("utf-8") for value in values]
+    lengths = array("I", (len(value) for value in encoded))
+    return array_to_bytes(lengths), b"".join(encoded)
+
+
+def decode_strings(lengths_data: bytes, joined: bytes) -> List[str]:
+    """Decodes strings encoded with `encode_strings`."""
+    values = []
+    position = 0
+    for length in array_from_bytes("I", lengths_data):
+        values.append(joined[position : position + length].decode("utf-8"))
+        position += length
+    return values
+
+
+def pack_sections(sections: Sequence[bytes]) -> bytes:
+    """
+    Packs byte sections into one compressed, versioned blob.
+
+    Args:
+        sections: Sections of the encoded state.
+
+    Returns:
+        The encoded state.
+    """
+    header = STATE_MAGIC + struct.pack("<BI", STATE_VERSION, len(sections))
+    body = b"".join(struct.pack("<Q", len(section)) + section for section in sections)
+    return header + zlib.compress(body, COMPRESSION_LEVEL)
+
+
+def unpack_sections(data: bytes) -> List[bytes]:
+    """
+    Unpacks the sections of a blob written by `pack_sections`.
+
+    Args:
+        data: Encoded state.
+
+    Returns:
+        The byte sections, in order.
+
+    Raises:
+        ValueError: If the data is not an encoded state of this version.
+    """
+    if not data.startswith(STATE_MAGIC):
+        raise ValueError("Not an encoded aggregation state")
+    version, num_sections = struct.unpack_from("<BI", data, len(STATE_MAGIC))
+    if version != STATE_VERSION:
+        raise ValueError(f"Unsupported state version: {version}")
+
+    body = zlib.decompress(data[len(STATE_MAGIC) + 5 :])
+    sections = []
+    position = 0
+    for _ in range(num_sections):
+        (length,) = struct.unpack_from("<Q", body, position)
+        position += 8
+        sections.append(body[position : position + length])
+        position += length
+    return sections
+
+
+def encode_counter(counter: Counter) -> bytes:
+    """
+    Encodes a Counter of strings, keeping its key order.
+
+    Args:
+        counter: Counter to encode.
+
+    Returns:
+        The encoded counter.
+    """
+    lengths, joined = encode_strings(list(counter))
+    counts = array_to_bytes(array("Q", counter.values()))
+    return pack_sections([lengths, joined, counts])
+
+
+def decode_counter(data: bytes) -> Counter:
+    """Decodes a Counter encoded with `encode_counter`."""
+    lengths, joined, counts = unpack_sections(data)
+    keys = decode_strings(lengths, joined)
+    return Counter(dict(zip(keys, array_from_bytes("Q", counts))))
@@ -0,0 +1,284 @@
+"""time_index.py
+
+Module for the hourly time index behind time-windowed, timezone-aware Q1.
+
+The file is scanned once into per-hour (UTC), per-user tweet counts, which are
+saved next to the tweet cache keyed by the source fingerprint. Q1 for any
+granularity (hour, day, week), timezone or date range is then derived from the
+index alone, without re-reading the file: each indexed hour is mapped to its
+local bucket and the per-user counts of the hours in a bucket are added up.
+Buckets are made of whole UTC hours, so zones with a fractional offset (e.g.
+UTC+05:30) get buckets starting at the half hour.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from interning import StringInterner
+from ranking import top_items, top_key
+from timestamps import SECONDS_PER_HOUR, parse_tweet_timestamp
+from tweet_cache import CACHE_DIR
+from utils import get_source_fingerprint, iter_tweets
+
+INDEX_VERSION = 1
+GRANULARITIES = ("hour", "day", "week")
+
+# Top-level tweet fields read to build the index.
+TWEET_FIELDS = ("date", "user")
+
+
+def parse_time_bound(value: Optional[str], time_zone: str) -> Optional[datetime]:
+    """
+    Parses a --since/--until bound; dates and naive datetimes are taken in the
+    given timezone.
+
+    Args:
+        value: ISO date or datetime, or None.
+        time_zone: IANA timezone name (e.g. 'America/Santiago').
+
+    Returns:
+        Timezone-aware datetime, or None if no bound was given.
+    """
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=ZoneInfo(time_zone))
+    return moment
+
+
+class HourlyUserIndex:
+    """
+    Tweet counts per UTC hour and user. Usernames are interned once; each hour
+    keeps a sparse {username id: count} map, as most users tweet in few hours.
+    """
+
+    def __init__(self) -> None:
+        self.usernames = StringInterner()
+        self.hour_counts: Dict[int, Dict[int, int]] = {}
+
+    def add(self, hour: int, username: str, count: int = 1) -> None:
+        """
+        Adds tweets of a user in an hour.
+
+        Args:
+            hour: Hours since the epoch (UTC).
+            username: Author of the tweets.
+            count: Number of tweets to add (default is 1).
+        """
+        counts = self.hour_counts.get(hour)
+        if counts is None:
+            counts = self.hour_counts[hour] = {}
+        user_id = self.usernames.intern(username)
+        counts[user_id] = counts.get(user_id, 0) + count
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converts the index to a JSON-serializable dictionary."""
+        return {
+            "version": INDEX_VERSION,
+            "usernames": self.usernames.values,
+            "hours": [
+                [hour, list(counts.items())]
+                for hour, counts in self.hour_counts.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HourlyUserIndex":
+        """Rebuilds an index saved with `to_dict`, keeping its key ordering."""
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version: {data.get('version')}")
+
+        index = cls()
+        for username in data["usernames"]:
+            index.usernames.intern(username)
+        index.hour_counts = {
+            hour: {user_id: count for user_id, count in counts}
+            for hour, counts in data["hours"]
+        }
+        return index
+
+    def bucket_counts(
+        self,
+        time_zone: str = "UTC",
+        granularity: str = "day",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[Any, Dict[int, int]]:
+        """
+        Adds up the per-user counts of the indexed hours into local buckets.
+
+        Args:
+            time_zone: IANA timezone of the buckets (default is 'UTC').
+            granularity: 'hour', 'day' or 'week' (weeks start on Monday).
+            since: Only hours starting at or after this instant.
+            until: Only hours starting before this instant.
+
+        Returns:
+            Dictionary {bucket: {username id: count}}, with buckets in the order
+            they were first seen. Buckets are local datetimes for 'hour' and
+            dates (of the Monday, for 'week') otherwise.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        zone = ZoneInfo(time_zone)
+
+        buckets: Dict[Any, Dict[int, int]] = {}
+        for hour, counts in self.hour_counts.items():
+            start = datetime.fromtimestamp(hour * SECONDS_PER_HOUR, zone)
+            if (since is not None and start < since) or (
+                until is not None and start >= until
+            ):
+                continue
+            if granularity == "hour":
+                bucket = start
+            elif granularity == "day":
+                bucket = start.date()
+            else:
+                bucket = start.date() - timedelta(days=start.weekday())
+
+            bucket_users = buckets.get(bucket)
+            if bucket_users is None:
+                bucket_users = buckets[bucket] = {}
+            for user_id, count in counts.items():
+                bucket_users[user_id] = bucket_users.get(user_id, 0) + count
+        return buckets
+
+    def top_buckets(
+        self,
+        top_n: int,
+        time_zone: str = "UTC",
+        granularity: str = "day",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Tuple[Any, str]]:
+        """
+        Picks the top N buckets by tweet volume and the most active user of each.
+
+        Args:
+            top_n: Number of top buckets to return.
+            time_zone: IANA timezone of the buckets (default is 'UTC').
+            granularity: 'hour', 'day' or 'week'.
+            since: Only tweets at or after this instant.
+            until: Only tweets before this instant.
+
+        Returns:
+            A list of tuples: (bucket, username_with_most_tweets_in_that_bucket).
+        """
+        buckets = self.bucket_counts(time_zone, granularity, since, until)
+        totals = {bucket: sum(counts.values()) for bucket, counts in buckets.items()}
+        return [
+            (
+                bucket,
+                top_key(
+                    (self.usernames[user_id], count)
+                    for user_id, count in buckets[bucket].items()
+                ),
+            )
+            for bucket, _ in top_items(totals.items(), top_n)
+        ]
+
+
+def build_time_index(file_path: str) -> HourlyUserIndex:
+    """
+    Scans a tweets file into an hourly index. Tweets without a valid date or
+    username are ignored.
+
+    Args:
+        file_path: Path to the tweets file (JSON lines format, local or cloud).
+
+    Returns:
+        The hourly index of the file.
+    """
+    index = HourlyUserIndex()
+    for tweet_data in iter_tweets(file_path, TWEET_FIELDS):
+        tweet_date_str = tweet_data.get("date")
+        user_data = tweet_data.get("user")
+        if not tweet_date_str or not user_data:
+            continue
+        username = user_data.get("username")
+        if not username:
+            continue
+        try:
+            _, hour = parse_tweet_timestamp(tweet_date_str)
+        except (ValueError, TypeError):
+            continue
+        index.add(hour, username)
+    return index
+
+
+def get_index_path(file_path: str) -> Path:
+    """
+    Returns the index location for the current version of a source file.
+
+    Args:
+        file_path: Path to the tweets file (GCS URI or local path).
+
+    Returns:
+        Path of the index JSON file (it may not exist yet).
+    """
+    if not file_path.startswith("gs://"):
+        file_path = str(Path(file_path).resolve())
+    fingerprint = get_source_fingerprint(file_path)
+    digest = hashlib.sha256(f"{file_path}|{fingerprint}".encode()).hexdigest()[:16]
+    return CACHE_DIR / f"{Path(file_path).name}.{digest}.hours.json"
+
+
+def load_time_index(file_path: str) -> HourlyUserIndex:
+    """
+    Loads the saved index of the current version of a file, building and saving
+    it first if there is none.
+
+    Args:
+        file_path: Path to the tweets file (GCS URI or local path).
+
+    Returns:
+        The hourly index of the file.
+    """
+    index_path = get_index_path(file_path)
+    if index_path.exists():
+        logging.info("Reading time index: %s", index_path)
+        return HourlyUserIndex.from_dict(json.loads(index_path.read_bytes()))
+
+    index = build_time_index(file_path)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(
+        json.dumps(index.to_dict(), ensure_ascii=False), encoding="utf-8"
+    )
+    tmp_path.replace(index_path)
+    logging.info("Time index written: %s", index_path)
+    return index
+
+
+def q1_indexed(
+    file_path: str,
+    top_n: int = 10,
+    time_zone: str = "UTC",
+    granularity: str = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[Tuple[Any, str]]:
+    """
+    Finds the top N time buckets with the most tweets and, for each bucket, the
+    user with the highest tweet count, from the hourly index of the file.
+
+    Args:
+        file_path: Path to the tweets file (JSON lines format, local or cloud).
+        top_n: Number of top buckets to return (default is 10).
+        time_zone: IANA timezone of the buckets (default is 'UTC').
+        granularity: 'hour', 'day' (default) or 'week'.
+        since: Only tweets at or after this instant.
+        until: Only tweets before this instant.
+
+    Returns:
+        A list of tuples: (bucket, username_with_most_tweets_in_that_bucket).
+    """
+    index = load_time_index(file_path)
+    return index.top_buckets(top_n, time_zone, granularity, since, until)
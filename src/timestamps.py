@@ -0,0 +1,75 @@
+"""timestamps.py
+
+Fast parsing of ISO 8601 tweet timestamps ('2021-02-24T09:23:35+00:00') into
+UTC hours.
+
+Converting every timestamp to an absolute instant with `datetime.fromisoformat`
+plus `timestamp()` costs far more than reading its date. Tweets share a few
+hundred distinct hours, so each distinct hour prefix and offset is parsed once
+and cached; per tweet only the minutes and seconds are validated with a set
+lookup.
+"""
+
+from datetime import date, datetime, timezone
+from typing import Dict, Tuple, Union
+
+SECONDS_PER_HOUR = 3600
+# Bound on cached hour prefixes (suffixes with fractional seconds never repeat).
+HOUR_CACHE_SIZE = 65536
+
+# Valid ':MM:SS' parts of a timestamp.
+MINUTES_SECONDS = frozenset(
+    f":{minute:02d}:{second:02d}" for minute in range(60) for second in range(60)
+)
+
+# 'YYYY-MM-DDTHH' + suffix after the seconds -> parsed hour, or False when the
+# offset is not a whole number of hours (the UTC hour then depends on minutes).
+_hour_cache: Dict[str, Union[Tuple[date, int], bool]] = {}
+
+
+def parse_timestamp(timestamp: str) -> Tuple[date, int]:
+    """
+    Parses an ISO timestamp with `datetime.fromisoformat`. Naive timestamps are
+    taken as UTC.
+
+    Args:
+        timestamp: Timestamp string.
+
+    Returns:
+        Tuple (date as written in the timestamp, hours since the epoch in UTC).
+    """
+    moment = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.date(), int(moment.timestamp() // SECONDS_PER_HOUR)
+
+
+def parse_tweet_timestamp(timestamp: str) -> Tuple[date, int]:
+    """
+    Parses a tweet timestamp, taking a cached fast path for the usual
+    'YYYY-MM-DDTHH:MM:SS<suffix>' shape and falling back to
+    `datetime.fromisoformat` otherwise.
+
+    Args:
+        timestamp: Timestamp string.
+
+    Returns:
+        Tuple (date as written in the timestamp, hours since the epoch in UTC).
+
+    Raises:
+        ValueError, TypeError: If the timestamp is not a valid ISO string.
+    """
+    if timestamp[13:19] not in MINUTES_SECONDS:
+        return parse_timestamp(timestamp)
+
+    key = timestamp[:13] + timestamp[19:]
+    parsed = _hour_cache.get(key)
+    if parsed is None:
+        if len(_hour_cache) >= HOUR_CACHE_SIZE:
+            return parse_timestamp(timestamp)
+        hour_start = parse_timestamp(f"{timestamp[:13]}:00:00{timestamp[19:]}")
+        hour_end = parse_timestamp(f"{timestamp[:13]}:59:59{timestamp[19:]}")
+        parsed = _hour_cache[key] = hour_start if hour_start == hour_end else False
+    if parsed is False:
+        return parse_timestamp(timestamp)
+    return parsed
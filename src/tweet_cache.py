@@ -0,0 +1,175 @@
+"""tweet_cache.py
+
+Module for the columnar cache of the tweet fields used by Q1, Q2 and Q3.
+The fields are extracted once from the JSON lines file into a zstd-compressed
+Parquet file keyed by the source fingerprint (size/mtime or GCS generation), so
+the time-optimized solutions can skip JSON decoding on repeated runs.
+Requires the optional `pyarrow` dependency; without it the cache is disabled.
+pyarrow is imported on first use, so runs that never touch the cache do not pay
+for it.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import METRICS
+from utils import get_local_file_path, get_source_fingerprint, iter_tweets
+
+CACHE_DIR = Path(
+    os.environ.get("TWEETS_CACHE_DIR", Path(tempfile.gettempdir()) / "tweets_cache")
+)
+BATCH_SIZE = 100_000
+
+
+def import_pyarrow() -> Optional[Tuple[Any, Any]]:
+    """
+    Imports the optional pyarrow dependency.
+
+    Returns:
+        Tuple (pyarrow, pyarrow.parquet), or None if pyarrow is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:  # pragma: no cover - optional dependency
+        return None
+    return pa, pq
+
+
+def get_cache_schema(pa: Any) -> Any:
+    """Returns the Arrow schema of the cache file."""
+    return pa.schema(
+        [
+            ("date", pa.string()),
+            ("username", pa.string()),
+            ("content", pa.string()),
+            ("mentions", pa.list_(pa.string())),
+        ]
+    )
+
+
+def get_cache_path(file_path: str) -> Path:
+    """
+    Returns the cache location for the current version of a source file.
+
+    Args:
+        file_path: Path to the tweets file (GCS URI or local path).
+
+    Returns:
+        Path of the Parquet cache file (it may not exist yet).
+    """
+    if not file_path.startswith("gs://"):
+        file_path = str(Path(file_path).resolve())
+    fingerprint = get_source_fingerprint(file_path)
+    digest = hashlib.sha256(f"{file_path}|{fingerprint}".encode()).hexdigest()[:16]
+    return CACHE_DIR / f"{Path(file_path).name}.{digest}.parquet"
+
+
+def extract_tweet_fields(tweet_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Projects a decoded tweet onto the cached columns.
+
+    Args:
+        tweet_data: Decoded tweet record.
+
+    Returns:
+        Dictionary with 'date', 'username', 'content' and 'mentions' (None when
+        missing or of an unexpected type).
+    """
+    tweet_date = tweet_data.get("date")
+    user_data = tweet_data.get("user")
+    username = user_data.get("username") if isinstance(user_data, dict) else None
+    content = tweet_data.get("content")
+    mentioned = tweet_data.get("mentionedUsers")
+    mentions = None
+    if isinstance(mentioned, list):
+        mentions = [
+            user.get("username")
+            for user in mentioned
+            if isinstance(user, dict) and isinstance(user.get("username"), str)
+        ]
+
+    return {
+        "date": tweet_date if isinstance(tweet_date, str) else None,
+        "username": username if isinstance(username, str) else None,
+        "content": content if isinstance(content, str) else None,
+        "mentions": mentions,
+    }
+
+
+def build_tweet_cache(file_path: str) -> Optional[Path]:
+    """
+    Extracts the fields used by Q1-Q3 into the columnar cache, unless a cache for
+    the current version of the file already exists.
+
+    Args:
+        file_path: Path to the tweets file (JSON lines format, local or cloud).
+
+    Returns:
+        Path of the cache file, or None if pyarrow is not installed.
+    """
+    pyarrow_modules = import_pyarrow()
+    if pyarrow_modules is None:
+        logging.warning("pyarrow is not installed; tweet cache disabled.")
+        return None
+    pa, pq = pyarrow_modules
+    cache_schema = get_cache_schema(pa)
+
+    cache_path = get_cache_path(file_path)
+    if cache_path.exists():
+        logging.info("Tweet cache already up to date: %s", cache_path)
+        return cache_path
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    local_path = get_local_file_path(file_path)
+    # Per-process temp file: concurrent builds never write to the same file.
+    tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    fields = ("date", "user", "content", "mentionedUsers")
+    batch: List[Dict[str, Any]] = []
+
+    try:
+        with pq.ParquetWriter(tmp_path, cache_schema, compression="zstd") as writer:
+            for tweet_data in iter_tweets(local_path, fields):
+                batch.append(extract_tweet_fields(tweet_data))
+                if len(batch) >= BATCH_SIZE:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=cache_schema))
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=cache_schema))
+        tmp_path.replace(cache_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    logging.info("Tweet cache written: %s", cache_path)
+    return cache_path
+
+
+def read_tweet_cache(file_path: str, columns: List[str]) -> Optional[Any]:
+    """
+    Loads the requested columns from the cache if it matches the current source.
+
+    Args:
+        file_path: Path to the tweets file (GCS URI or local path).
+        columns: Cached columns to load ('date', 'username', 'content', 'mentions').
+
+    Returns:
+        A pandas DataFrame with the columns, or None if there is no valid cache.
+    """
+    try:
+        cache_path = get_cache_path(file_path)
+    except (OSError, ValueError):
+        return None
+    # Checked before importing pyarrow, so runs without a cache never load it.
+    if not cache_path.exists():
+        return None
+    pyarrow_modules = import_pyarrow()
+    if pyarrow_modules is None:
+        return None
+    _, pq = pyarrow_modules
+
+    logging.info("Reading tweet fields from cache: %s", cache_path)
+    with METRICS.stage("cache_read"):
+        return pq.read_table(cache_path, columns=columns).to_pandas()
@@ -1,18 +1,71 @@
 """utils.py
 
-Module provides configuration retrieval and BigQuery helper functions.
+Module provides configuration retrieval, file access and BigQuery helper functions.
 """
 
+import fnmatch
+import glob
+import hashlib
+import itertools
 import json
 import logging
-from datetime import datetime, date
+import mmap
+import os
+import queue
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
-from zoneinfo import ZoneInfo
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 import tempfile
 
-from google.cloud import bigquery, storage
-from google.api_core.exceptions import NotFound, Forbidden, BadRequest, GoogleAPIError
+from compressed_io import MAGIC_SIZE, detect_compression, iter_compressed_lines
+from metrics import METRICS
+from result_sink import BigQueryResultSink
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:  # pragma: no cover - optional dependency
+    simdjson = None
+
+# JSON backend used by the solvers: "auto", "orjson", "simdjson" or "json".
+JSON_BACKEND = os.environ.get("TWEETS_JSON_BACKEND", "auto")
+
+# Every decoder raises a ValueError subclass for malformed lines
+# (json.JSONDecodeError, orjson.JSONDecodeError, UnicodeDecodeError).
+JSON_DECODE_ERRORS = (ValueError,)
+
+# Size of each ranged GCS read and how many chunks may be buffered ahead of the parser.
+GCS_CHUNK_SIZE = 8 * 1024 * 1024
+GCS_PREFETCH_CHUNKS = 4
+
+# Size of each read of a compressed local file (decompression works per chunk).
+LOCAL_CHUNK_SIZE = 1024 * 1024
+
+# Local cache of downloaded GCS objects, evicted least-recently-used beyond the limit.
+DOWNLOAD_CACHE_DIR = Path(
+    os.environ.get(
+        "TWEETS_DOWNLOAD_CACHE_DIR", Path(tempfile.gettempdir()) / "tweets_downloads"
+    )
+)
+DOWNLOAD_CACHE_MAX_BYTES = int(
+    os.environ.get("TWEETS_DOWNLOAD_CACHE_MAX_BYTES", 1024 * 1024 * 1024)
+)
+# Downloads are written to hidden `.<name>.<pid>.part` files and renamed when done.
+PARTIAL_DOWNLOAD_SUFFIX = ".part"
 
 
 def get_config_value(key: str) -> str:
@@ -34,6 +87,92 @@ def get_config_value(key: str) -> str:
         return ""
 
 
+def get_available_json_backends() -> List[str]:
+    """Lists the JSON backends that can be used in this environment, fastest first.
+
+    Returns:
+        Backend names among "simdjson", "orjson" and "json".
+    """
+    backends = []
+    if simdjson is not None:
+        backends.append("simdjson")
+    if orjson is not None:
+        backends.append("orjson")
+    backends.append("json")
+    return backends
+
+
+def make_json_decoder(
+    fields: Optional[Sequence[str]] = None, backend: Optional[str] = None
+) -> Callable[[Union[str, bytes]], Dict[str, Any]]:
+    """
+    Builds a function that decodes one JSON line into a dictionary.
+
+    With the "simdjson" backend only the requested top-level fields are
+    materialized as Python objects; the other backends decode the whole line and
+    return every field. Lines rejected by "orjson" (e.g. lone surrogates) are
+    retried with the standard library decoder so no valid tweet is lost.
+
+    Args:
+        fields: Top-level keys the caller needs (None for the whole record).
+        backend: "auto", "simdjson", "orjson" or "json" (default: JSON_BACKEND).
+
+    Returns:
+        A decoder accepting str or bytes. It returns a dict containing at least the
+        requested fields and raises a ValueError for malformed lines or lines that
+        are not JSON objects.
+    """
+    backend = backend or JSON_BACKEND
+    if backend == "auto":
+        backend = get_available_json_backends()[0]
+    if backend not in get_available_json_backends():
+        raise ValueError(f"JSON backend not available: {backend}")
+
+    if backend == "simdjson":
+        parser = simdjson.Parser()
+
+        def materialize(value: Any) -> Any:
+            if isinstance(value, simdjson.Object):
+                return value.as_dict()
+            if isinstance(value, simdjson.Array):
+                return value.as_list()
+            return value
+
+        def decode_simdjson(raw_line: Union[str, bytes]) -> Dict[str, Any]:
+            try:
+                document = parser.parse(raw_line)
+            except RuntimeError as e:
+                raise ValueError(str(e)) from e
+            if not isinstance(document, simdjson.Object):
+                raise ValueError("JSON line is not an object")
+            if fields is None:
+                return document.as_dict()
+            return {field: materialize(document.get(field)) for field in fields}
+
+        return decode_simdjson
+
+    if backend == "orjson":
+
+        def decode_orjson(raw_line: Union[str, bytes]) -> Dict[str, Any]:
+            try:
+                record = orjson.loads(raw_line)
+            except orjson.JSONDecodeError:
+                record = json.loads(raw_line)
+            if not isinstance(record, dict):
+                raise ValueError("JSON line is not an object")
+            return record
+
+        return decode_orjson
+
+    def decode_json(raw_line: Union[str, bytes]) -> Dict[str, Any]:
+        record = json.loads(raw_line)
+        if not isinstance(record, dict):
+            raise ValueError("JSON line is not an object")
+        return record
+
+    return decode_json
+
+
 def save_results_to_bq(
     result: List[Tuple[Any, ...]],
     question: str,
@@ -43,87 +182,195 @@ def save_results_to_bq(
 ) -> None:
     """
     Save results to the corresponding BigQuery table, adding 'method' and 'ingested_at'.
+    Writes a single result synchronously; use `result_sink.BigQueryResultSink`
+    to batch and overlap the writes of a whole run.
 
     Args:
         result: List of tuples (output from Q functions)
         question: "q1", "q2", or "q3"
-        method: "time" or "memory"
+        method: "time", "memory" or "fused"
         project_id: GCP project ID
         dataset_id: BigQuery dataset ID
     """
-    table_map = {"q1": "q1_results", "q2": "q2_results", "q3": "q3_results"}
-    table_id = f"{project_id}.{dataset_id}.{table_map[question]}"
-    client = bigquery.Client(project=project_id)
-
-    # Use America/Santiago timezone for ingestion timestamp
-    ingested_at = datetime.now(ZoneInfo("America/Santiago")).isoformat()
-    partition_filter = date.today().isoformat()
-
-    # Prepare rows to insert based on question type
-    rows_to_insert: List[Dict[str, Any]] = []
-    if question == "q1":
-        for row in result:
-            rows_to_insert.append(
-                {
-                    "tweet_date": str(row[0]),
-                    "top_user": row[1],
-                    "method": method,
-                    "ingested_at": ingested_at,
-                }
-            )
-    elif question == "q2":
-        for row in result:
-            rows_to_insert.append(
-                {
-                    "emoji": row[0],
-                    "count": row[1],
-                    "method": method,
-                    "ingested_at": ingested_at,
-                }
+    with BigQueryResultSink(project_id, dataset_id) as sink:
+        sink.add(question, method, result)
+
+
+def get_gcs_blob(file_path: str) -> Any:
+    """
+    Fetches the metadata (size, generation, checksums) of a GCS object.
+
+    Args:
+        file_path: GCS URI ('gs://bucket/path').
+
+    Returns:
+        The storage.Blob, bound to its current generation.
+    """
+    # Imported on first use: google-cloud-storage adds ~0.2 s to startup.
+    from google.cloud import storage
+
+    bucket_name, blob_path = file_path[5:].split("/", 1)
+    client = storage.Client()
+    blob = client.bucket(bucket_name).get_blob(blob_path)
+    if blob is None:
+        raise FileNotFoundError(f"Blob not found: {file_path}")
+    return blob
+
+
+def list_gcs_files(file_path: str) -> List[str]:
+    """
+    Lists the GCS objects matching a prefix ('gs://bucket/dir/') or a glob
+    ('gs://bucket/dir/*.json'; '*' also matches '/').
+
+    Args:
+        file_path: GCS URI ending with '/' or containing glob characters.
+
+    Returns:
+        Sorted GCS URIs of the matching objects (folder placeholders excluded).
+    """
+    from google.cloud import storage
+
+    bucket_name, pattern = file_path[5:].split("/", 1)
+    wildcard = min(
+        (pattern.index(char) for char in "*?[" if char in pattern),
+        default=len(pattern),
+    )
+    client = storage.Client()
+    names = [
+        blob.name
+        for blob in client.list_blobs(bucket_name, prefix=pattern[:wildcard])
+        if not blob.name.endswith("/")
+    ]
+    if wildcard < len(pattern):
+        names = [name for name in names if fnmatch.fnmatchcase(name, pattern)]
+    return [f"gs://{bucket_name}/{name}" for name in sorted(names)]
+
+
+def expand_file_paths(file_paths: Sequence[str]) -> List[str]:
+    """
+    Expands input specifications into the list of files to process. Each one
+    may be a file, a directory (its files, not recursive), a glob, a GCS prefix
+    ending with '/' or a GCS glob; each expands in sorted order.
+
+    Args:
+        file_paths: Input specifications (GCS URIs or local paths).
+
+    Returns:
+        The input files in processing order, without duplicates.
+
+    Raises:
+        FileNotFoundError: If a directory, prefix or glob matches no file.
+    """
+    expanded: List[str] = []
+    for file_path in file_paths:
+        if file_path.startswith("gs://"):
+            if file_path.endswith("/") or glob.has_magic(file_path):
+                matches = list_gcs_files(file_path)
+            else:
+                matches = [file_path]
+        elif Path(file_path).is_dir():
+            matches = sorted(
+                str(path)
+                for path in Path(file_path).iterdir()
+                if path.is_file() and not path.name.startswith(".")
             )
-    elif question == "q3":
-        for row in result:
-            rows_to_insert.append(
-                {
-                    "username": row[0],
-                    "mention_count": row[1],
-                    "method": method,
-                    "ingested_at": ingested_at,
-                }
+        elif glob.has_magic(file_path):
+            matches = sorted(
+                path for path in glob.glob(file_path) if Path(path).is_file()
             )
+        else:
+            matches = [file_path]
+        if not matches:
+            raise FileNotFoundError(f"No input files match: {file_path}")
+        expanded.extend(matches)
+    return list(dict.fromkeys(expanded))
 
-    # Delete only data in today's partition
-    delete_query = f"""
-    DELETE FROM `{table_id}`
-    WHERE DATE(ingested_at) = "{partition_filter}"
-        AND method = "{method}"
-    """  # nosec B608
 
+def get_download_cache_path(file_path: str, blob: Any) -> Path:
+    """
+    Returns the content-addressed location of a GCS object in the download cache.
+    The key uses the object checksum (MD5 or CRC32C) and size when available,
+    falling back to the bucket/object/generation.
+
+    Args:
+        file_path: GCS URI ('gs://bucket/path').
+        blob: Blob metadata returned by `get_gcs_blob`.
+
+    Returns:
+        Path of the cached copy (it may not exist yet).
+    """
+    checksum = blob.md5_hash or blob.crc32c
+    key = f"{checksum}:{blob.size}" if checksum else f"{file_path}#{blob.generation}"
+    digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return DOWNLOAD_CACHE_DIR / f"{digest}-{Path(file_path).name}"
+
+
+def get_cached_download(file_path: str, blob: Any) -> Optional[Path]:
+    """
+    Returns the download cache copy of a GCS object when it is complete (its
+    size matches the object's), marking it as recently used.
+
+    Args:
+        file_path: GCS URI ('gs://bucket/path').
+        blob: Blob metadata returned by `get_gcs_blob`.
+
+    Returns:
+        Path of the cached copy, or None if it is missing or incomplete.
+    """
+    local_path = get_download_cache_path(file_path, blob)
     try:
-        client.query(delete_query).result()
-    except NotFound:
-        logging.warning("Table not found: %s. Will attempt to insert anyway.", table_id)
-    except Forbidden:
-        logging.error("Permission denied when trying to delete from %s", table_id)
-        return
-    except BadRequest as e:
-        logging.error("BadRequest deleting from table: %s | %s", table_id, e)
-        return
-    except GoogleAPIError as e:
-        logging.error("GoogleAPIError during DELETE: %s", e)
-        return
+        if local_path.stat().st_size != blob.size:
+            return None
+        os.utime(local_path)
+    except FileNotFoundError:
+        return None
+    logging.info("Download cache hit: %s -> %s", file_path, local_path)
+    METRICS.add(download_cache_hits=1)
+    return local_path
+
 
-    errors = client.insert_rows_json(table_id, rows_to_insert)
-    if errors:
-        logging.error("Failed to insert into BigQuery: %s", errors)
-    else:
-        logging.info("Results saved to BigQuery table: %s", table_id)
+def get_partial_download_path(local_path: Path) -> Path:
+    """Returns the hidden file a download to `local_path` is written to first."""
+    return local_path.with_name(
+        f".{local_path.name}.{os.getpid()}{PARTIAL_DOWNLOAD_SUFFIX}"
+    )
+
+
+def is_partial_download(path: Path) -> bool:
+    """Whether a download cache file is a download still being written."""
+    return path.name.startswith(".") and path.name.endswith(PARTIAL_DOWNLOAD_SUFFIX)
+
+
+def evict_download_cache(keep: Path) -> None:
+    """
+    Deletes the least recently used files of the download cache until it fits in
+    DOWNLOAD_CACHE_MAX_BYTES. The file in `keep` is never evicted, nor are the
+    `.part` files of downloads still in progress (in this or other processes).
+
+    Args:
+        keep: Cached file that is about to be used.
+    """
+    cached_files = [
+        (stat.st_mtime, stat.st_size, path)
+        for path in DOWNLOAD_CACHE_DIR.iterdir()
+        if path.is_file() and path != keep and not is_partial_download(path)
+        for stat in (path.stat(),)
+    ]
+    total_size = keep.stat().st_size + sum(size for _, size, _ in cached_files)
+    for _, size, path in sorted(cached_files):
+        if total_size <= DOWNLOAD_CACHE_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        total_size -= size
+        logging.info("Download cache evicted: %s", path)
 
 
 def get_local_file_path(file_path: str) -> str:
     """
-    Downloads a file from GCS if `file_path` starts with 'gs://',
-    saves it to a temporary location using pathlib, and returns the local path.
+    Downloads a file from GCS if `file_path` starts with 'gs://' and returns the
+    local path. Downloads go through a content-addressed cache, so repeated calls
+    for the same object version reuse the local copy. Compressed objects are
+    kept compressed; `iter_lines` decompresses them while reading.
 
     Args:
         file_path: Path to the file (GCS URI or local path).
@@ -132,15 +379,386 @@ def get_local_file_path(file_path: str) -> str:
         Path to a local file as string.
     """
     if file_path.startswith("gs://"):
-        bucket_name, blob_path = file_path[5:].split("/", 1)
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(blob_path)
+        blob = get_gcs_blob(file_path)
+        cached_path = get_cached_download(file_path, blob)
+        if cached_path is not None:
+            return str(cached_path)
+
+        local_path = get_download_cache_path(file_path, blob)
+        if local_path.exists():
+            logging.warning("Download cache entry has wrong size: %s", local_path)
+            local_path.unlink(missing_ok=True)
 
-        temp_dir = Path(tempfile.gettempdir())
-        local_path = temp_dir / Path(blob_path).name
-        blob.download_to_filename(str(local_path))
+        logging.info("Download cache miss: %s", file_path)
+        METRICS.add(download_cache_misses=1)
+        DOWNLOAD_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = get_partial_download_path(local_path)
+        try:
+            with METRICS.stage("gcs_download"):
+                # The client validates the MD5/CRC32C checksum of the data.
+                blob.download_to_filename(
+                    str(tmp_path), if_generation_match=blob.generation
+                )
+            if tmp_path.stat().st_size != blob.size:
+                raise IOError(f"Incomplete download of {file_path}")
+            tmp_path.replace(local_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
 
+        evict_download_cache(keep=local_path)
         return str(local_path)
 
     return str(Path(file_path).resolve())
+
+
+def get_source_fingerprint(file_path: str) -> str:
+    """
+    Builds a string that changes whenever the content of the source file changes,
+    without reading the file: the object generation for GCS blobs, or the size and
+    modification time for local files.
+
+    Args:
+        file_path: Path to the file (GCS URI or local path).
+
+    Returns:
+        Fingerprint string for the current version of the file.
+    """
+    if file_path.startswith("gs://"):
+        blob = get_gcs_blob(file_path)
+        return f"gen{blob.generation}-{blob.size}"
+
+    stat = Path(file_path).resolve().stat()
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def iter_gcs_chunks(
+    file_path: str,
+    chunk_size: Optional[int] = None,
+    prefetch: Optional[int] = None,
+    start: int = 0,
+    blob: Any = None,
+) -> Iterator[bytes]:
+    """
+    Streams a GCS blob as consecutive ranged reads. A background thread downloads
+    up to `prefetch` chunks ahead, so network transfer overlaps with processing
+    while memory stays bounded by prefetch * chunk_size. All reads are pinned to
+    the blob generation seen when the stream starts.
+
+    Args:
+        file_path: GCS URI ('gs://bucket/path').
+        chunk_size: Bytes per ranged read (default: GCS_CHUNK_SIZE).
+        prefetch: Maximum number of downloaded chunks waiting to be consumed
+            (default: GCS_PREFETCH_CHUNKS).
+        start: Byte offset where the stream starts (default is 0).
+        blob: Blob metadata returned by `get_gcs_blob` (fetched if omitted).
+
+    Yields:
+        The blob content from `start`, chunk by chunk.
+    """
+    chunk_size = chunk_size or GCS_CHUNK_SIZE
+    prefetch = prefetch or GCS_PREFETCH_CHUNKS
+    blob = blob or get_gcs_blob(file_path)
+
+    chunks: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+    done = object()
+
+    def put(item: Any) -> None:
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def download() -> None:
+        try:
+            for chunk_start in range(start, blob.size, chunk_size):
+                if stop.is_set():
+                    return
+                chunk_end = min(chunk_start + chunk_size, blob.size) - 1
+                put(
+                    blob.download_as_bytes(
+                        start=chunk_start,
+                        end=chunk_end,
+                        if_generation_match=blob.generation,
+                    )
+                )
+            put(done)
+        except Exception as e:  # re-raised in the consumer thread
+            put(e)
+
+    worker = threading.Thread(target=download, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+
+
+def iter_file_chunks(
+    file_path: str, start: int = 0, chunk_size: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Reads a local file chunk by chunk.
+
+    Args:
+        file_path: Path to a local file.
+        start: Byte offset where reading starts (default is 0).
+        chunk_size: Bytes per read (default: LOCAL_CHUNK_SIZE).
+
+    Yields:
+        The file content from `start`, chunk by chunk.
+    """
+    chunk_size = chunk_size or LOCAL_CHUNK_SIZE
+    with open(file_path, "rb") as infile:
+        infile.seek(start)
+        yield from iter(lambda: infile.read(chunk_size), b"")
+
+
+def get_compression(file_path: str) -> Optional[str]:
+    """
+    Detects whether a file is compressed from its magic number.
+
+    Args:
+        file_path: Path to the file (GCS URI or local path).
+
+    Returns:
+        'gzip', 'bz2' or 'zstd', or None for an uncompressed file.
+    """
+    return detect_compression(read_file_head(file_path, MAGIC_SIZE))
+
+
+def iter_lines(
+    file_path: str, start: int = 0, end: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Iterates over the raw lines of a JSON lines file, as bytes that the JSON
+    decoders accept directly (no text decoding). GCS blobs already in the
+    download cache (see `get_local_file_path`) are read from the local copy;
+    others are streamed with ranged reads instead of being downloaded to disk
+    first. Local files are memory-mapped and split with `mmap.readline`,
+    without a read buffer copy.
+    gzip, bzip2 and zstd files are decompressed on the fly (see
+    `compressed_io`).
+
+    Args:
+        file_path: Path to the file (GCS URI or local path).
+        start: Byte offset of the first line to read (default is 0). For
+            compressed files it must be a frame boundary (see
+            `compressed_io.iter_compressed_lines`).
+        end: Byte offset where reading stops (default is the end of the file).
+            Only lines starting before `end` are returned, so consecutive
+            ranges split a file without losing or repeating lines.
+
+    Yields:
+        Each line as bytes, including its trailing newline when present.
+    """
+    range_size = None if end is None else end - start
+    if file_path.startswith("gs://"):
+        blob = get_gcs_blob(file_path)
+        cached_path = get_cached_download(file_path, blob)
+        if cached_path is not None:
+            yield from iter_lines(str(cached_path), start, end)
+            return
+
+        chunks = iter_gcs_chunks(file_path, start=start, blob=blob)
+        if start == 0:
+            # The first chunk tells the compression without an extra request.
+            first_chunk = next(chunks, b"")
+            compression = detect_compression(first_chunk)
+            chunks = itertools.chain([first_chunk], chunks)
+        else:
+            compression = get_compression(file_path)
+        if compression:
+            yield from iter_compressed_lines(
+                chunks, compression, range_size, skip_first=start > 0
+            )
+            return
+
+        position = start
+        pending = b""
+        for chunk in chunks:
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                if end is not None and position >= end:
+                    return
+                position += len(line) + 1
+                yield line + b"\n"
+        if pending and (end is None or position < end):
+            yield pending
+        return
+
+    compression = get_compression(file_path)
+    if compression:
+        yield from iter_compressed_lines(
+            iter_file_chunks(file_path, start),
+            compression,
+            range_size,
+            skip_first=start > 0,
+        )
+        return
+
+    with open(file_path, "rb") as infile:
+        if os.fstat(infile.fileno()).st_size <= start:
+            return
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            mapped.seek(start)
+            if end is None:
+                yield from iter(mapped.readline, b"")
+                return
+            while mapped.tell() < end:
+                line = mapped.readline()
+                if not line:
+                    break
+                yield line
+
+
+def iter_tweets(
+    file_path: str,
+    fields: Optional[Sequence[str]] = None,
+    start: int = 0,
+    line_filter: Optional[Callable[[bytes], bool]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Iterates over the decoded tweets of a JSON lines file, skipping malformed
+    lines. Lines read, malformed lines and lines skipped by the prefilter are
+    added to `METRICS` once the iteration ends, and decoding time too when the
+    instrumentation is enabled.
+
+    Args:
+        file_path: Path to the file (GCS URI or local path).
+        fields: Top-level fields to decode (see `make_json_decoder`).
+        start: Byte offset of the first line to read (default is 0).
+        line_filter: Cheap check on the raw line; lines for which it returns
+            False are skipped without being decoded. It must only reject lines
+            that cannot contribute to the result (false positives are fine).
+
+    Yields:
+        Each decodable tweet record accepted by the prefilter.
+    """
+    decode = METRICS.timed("json_decode", make_json_decoder(fields))
+    lines_read = 0
+    malformed_lines = 0
+    skipped_lines = 0
+    try:
+        for raw_line in iter_lines(file_path, start):
+            lines_read += 1
+            if line_filter is not None and not line_filter(raw_line):
+                skipped_lines += 1
+                continue
+            try:
+                tweet_data = decode(raw_line)
+            except JSON_DECODE_ERRORS:
+                malformed_lines += 1
+                continue
+            yield tweet_data
+    finally:
+        METRICS.count_lines(lines_read, malformed_lines, skipped_lines)
+
+
+def get_file_size(file_path: str) -> int:
+    """
+    Returns the size in bytes of a local file or GCS object.
+
+    Args:
+        file_path: Path to the file (GCS URI or local path).
+
+    Returns:
+        Size of the file in bytes.
+    """
+    if file_path.startswith("gs://"):
+        return get_gcs_blob(file_path).size
+    return Path(file_path).stat().st_size
+
+
+def read_file_head(file_path: str, size: int) -> bytes:
+    """
+    Reads the first bytes of a file.
+
+    Args:
+        file_path: Path to the file (GCS URI or local path).
+        size: Maximum number of bytes to read.
+
+    Returns:
+        Up to `size` bytes from the start of the file.
+    """
+    return read_file_range(file_path, 0, size)
+
+
+def read_file_range(file_path: str, start: int, size: int) -> bytes:
+    """
+    Reads bytes from an offset of a file.
+
+    Args:
+        file_path: Path to the file (GCS URI or local path).
+        start: Byte offset of the first byte to read.
+        size: Maximum number of bytes to read.
+
+    Returns:
+        Up to `size` bytes from `start` (fewer at the end of the file).
+    """
+    if size <= 0:
+        return b""
+    if file_path.startswith("gs://"):
+        blob = get_gcs_blob(file_path)
+        if start >= (blob.size or 0):
+            return b""
+        return blob.download_as_bytes(
+            start=start,
+            end=min(start + size, blob.size) - 1,
+            if_generation_match=blob.generation,
+        )
+
+    with open(file_path, "rb") as infile:
+        infile.seek(start)
+        return infile.read(size)
+
+
+def read_file_bytes(file_path: str) -> bytes:
+    """
+    Reads a whole local file or GCS object.
+
+    Args:
+        file_path: Path to the file (GCS URI or local path).
+
+    Returns:
+        The content of the file.
+    """
+    if file_path.startswith("gs://"):
+        blob = get_gcs_blob(file_path)
+        return blob.download_as_bytes(if_generation_match=blob.generation)
+    return Path(file_path).read_bytes()
+
+
+def write_file_bytes(file_path: str, data: bytes) -> None:
+    """
+    Writes a local file (atomically) or a GCS object.
+
+    Args:
+        file_path: Path to the file (GCS URI or local path).
+        data: Content to write.
+    """
+    if file_path.startswith("gs://"):
+        from google.cloud import storage
+
+        bucket_name, blob_path = file_path[5:].split("/", 1)
+        blob = storage.Client().bucket(bucket_name).blob(blob_path)
+        blob.upload_from_string(data, content_type="application/octet-stream")
+        return
+
+    path = Path(file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
@@ -0,0 +1,124 @@
+from collections import Counter
+
+import pytest
+
+from approx import approx_solve, get_approx_aggregator, q1_approx, q2_approx, q3_approx
+from pipeline import merge_states, scan_lines
+from q1_memory import q1_memory
+from q2_memory import q2_memory
+from q3_memory import q3_memory
+from sketches import SpaceSaving
+from utils import iter_lines
+
+
+@pytest.fixture
+def skewed_tweets_file(tmp_path) -> str:
+    """
+    Creates a fake JSONL tweet file with a few heavy hitters and a long tail.
+    """
+    lines = []
+    for i in range(400):
+        heavy = i % 4 != 0
+        user = ("alice" if i % 8 < 5 else "bob") if heavy else f"tail{i}"
+        emoji = "😊" if heavy else chr(0x1F600 + i % 40)
+        lines.append(
+            '{"date": "2021-02-%02dT10:00:00+00:00", "user": {"username": "%s"}, '
+            '"content": "%s", "mentionedUsers": [{"username": "%s"}]}\n'
+            % (1 + i % 3 if i < 300 else 1, user, emoji, user)
+        )
+    path = tmp_path / "skewed.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path)
+
+
+def test_space_saving_bounds() -> None:
+    """
+    Checks Space-Saving never underestimates, respects its error bound and
+    always tracks items more frequent than N / k.
+    """
+    stream = [i % 3 for i in range(300)] + list(range(100, 400))
+    sketch = SpaceSaving.from_error(0.1)
+    sketch.update(stream)
+    exact = Counter(stream)
+
+    assert len(sketch) == sketch.capacity == 10
+    assert sketch.max_error <= len(stream) / sketch.capacity
+    for key, estimate, error in sketch.top(10):
+        assert exact[key] <= estimate <= exact[key] + error
+    assert {key for key, _ in sketch.most_common(3)} == {0, 1, 2}
+
+
+def test_space_saving_merges_halves() -> None:
+    """
+    Checks merging the sketches of two halves of a stream keeps the guarantees
+    of the whole stream, and gives the single-pass top-k when it fits.
+    """
+    stream = [f"k{i % 3}" for i in range(300)] + [f"t{i}" for i in range(300)]
+    exact = Counter(stream)
+    for capacity in (10, 1000):
+        whole = SpaceSaving(capacity)
+        whole.update(stream)
+        first, second = SpaceSaving(capacity), SpaceSaving(capacity)
+        first.update(stream[::2])
+        second.update(stream[1::2])
+        first.merge(SpaceSaving.from_bytes(second.to_bytes()))
+
+        assert first.total == len(stream)
+        assert len(first) == min(capacity, len(exact))
+        assert first.max_error <= len(stream) / capacity
+        for key, estimate, error in first.top(capacity):
+            assert exact[key] <= estimate <= exact[key] + error
+            assert error <= first.max_error
+        assert first.most_common(3) == whole.most_common(3)
+    assert first.top(len(exact)) == whole.top(len(exact))
+
+    with pytest.raises(ValueError, match="capacities"):
+        SpaceSaving(2).merge(SpaceSaving(3))
+
+
+def test_approx_states_merge_like_a_single_pass(skewed_tweets_file) -> None:
+    """
+    Checks encoded partial states of two halves of the file, merged, give the
+    heavy hitters of one pass for every question.
+    """
+    lines = list(iter_lines(skewed_tweets_file))
+    for question, top_n, epsilon in (("q1", 2, 0.1), ("q2", 1, 0.1), ("q3", 2, 0.05)):
+        aggregators = {question: get_approx_aggregator(question, epsilon)}
+        aggregator = aggregators[question]
+        partials = [
+            aggregator.deserialize(aggregator.serialize(states[question]))
+            for states, _ in (
+                scan_lines(aggregators, lines[:150]),
+                scan_lines(aggregators, lines[150:]),
+            )
+        ]
+        merged = merge_states(aggregator, partials)
+        expected = approx_solve(question, skewed_tweets_file, top_n, epsilon)
+        result = aggregator.select(merged, top_n)
+        # q1 rows are (date, user); q2/q3 counts are estimates, compare keys.
+        if question == "q1":
+            assert result == expected
+        assert [row[0] for row in result] == [row[0] for row in expected]
+
+
+def test_approx_matches_exact_heavy_hitters(skewed_tweets_file) -> None:
+    """
+    Checks the approximate methods find the same heavy hitters as the exact ones.
+    """
+    path = skewed_tweets_file
+    assert q1_approx(path, 2, epsilon=0.1) == q1_memory(path, 2)
+    assert q2_approx(path, 1, epsilon=0.1)[0][0] == q2_memory(path, 1)[0][0]
+    top_mentions = q3_approx(path, 2, epsilon=0.05)
+    assert [u for u, _ in top_mentions] == [u for u, _ in q3_memory(path, 2)]
+    for (_, estimate), (_, exact) in zip(top_mentions, q3_memory(path, 2)):
+        assert exact <= estimate <= exact + 0.05 * 400
+
+
+@pytest.mark.parametrize("epsilon", [0, -0.1, 1])
+def test_approx_rejects_invalid_epsilon(skewed_tweets_file, epsilon) -> None:
+    """
+    Checks an error bound outside (0, 1) is rejected for every question.
+    """
+    for approx in (q1_approx, q2_approx, q3_approx):
+        with pytest.raises(ValueError, match="epsilon"):
+            approx(skewed_tweets_file, 2, epsilon=epsilon)
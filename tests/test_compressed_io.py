@@ -0,0 +1,102 @@
+import bz2
+import gzip
+import struct
+
+import pytest
+
+import compressed_io
+from compressed_io import (
+    ZSTD_MAGIC,
+    build_seek_table,
+    get_zstd_frame_offsets,
+    walk_zstd_frames,
+    write_zstd_frames,
+)
+from q3_memory import q3_memory
+from utils import get_compression, iter_lines
+
+requires_zstd = pytest.mark.skipif(
+    compressed_io.zstd_stdlib is None and compressed_io.zstandard is None,
+    reason="no zstd implementation installed",
+)
+
+LINES = [
+    b'{"mentionedUsers": [{"username": "alice"}]}\n',
+    b'{"mentionedUsers": [{"username": "bob"}, {"username": "alice"}]}\n',
+    b"{broken json\n",
+    b'{"mentionedUsers": null}\n',
+    b'{"mentionedUsers": [{"username": "alice"}]}',
+]
+
+
+def raw_zstd_frame(data: bytes) -> bytes:
+    """Builds a zstd frame storing `data` (up to 255 bytes) in a raw block."""
+    block_header = (len(data) << 3 | 1).to_bytes(3, "little")
+    return ZSTD_MAGIC + bytes([0x20, len(data)]) + block_header + data
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bz2.compress])
+def test_iter_lines_decompresses_concatenated_streams(tmp_path, compress) -> None:
+    """
+    Checks gzip and bzip2 files are detected by content and read across
+    concatenated members/streams, with the same results as the plain file.
+    """
+    data = b"".join(LINES)
+    path = tmp_path / "tweets.data"
+    path.write_bytes(compress(data[:50]) + compress(data[50:]))
+
+    assert get_compression(str(path)) in ("gzip", "bz2")
+    assert list(iter_lines(str(path))) == LINES
+    assert q3_memory(str(path), top_n=2) == [("alice", 3), ("bob", 1)]
+
+    path.write_bytes(compress(data)[:-10])
+    with pytest.raises(EOFError):
+        list(iter_lines(str(path)))
+
+
+def test_zstd_frame_offsets_from_headers_and_seek_table() -> None:
+    """
+    Checks frame offsets are found by walking the headers, skipping skippable
+    frames, and read from the seek table when there is one.
+    """
+    frames = [raw_zstd_frame(b"a" * 10), raw_zstd_frame(b"b" * 200)]
+    skippable = struct.pack("<II", 0x184D2A50, 3) + b"xyz"
+    data = frames[0] + skippable + frames[1]
+    assert walk_zstd_frames(data) == [0, len(frames[0]) + len(skippable)]
+
+    seekable = b"".join(frames) + build_seek_table(
+        [(len(frames[0]), 10), (len(frames[1]), 200)]
+    )
+    assert get_zstd_frame_offsets(seekable) == [0, len(frames[0])]
+
+    with pytest.raises(ValueError):
+        walk_zstd_frames(b"not zstd")
+
+
+@requires_zstd
+def test_iter_lines_splits_zstd_files_on_frame_boundaries(tmp_path) -> None:
+    """
+    Checks ranges of frames return every line exactly once, including lines
+    spanning several frames and frames ending right at a line end.
+    """
+    data = b"".join(LINES)
+    cuts = [0, 20, 30, len(LINES[0]), 100, len(data) - 5, len(data)]
+    frames = [raw_zstd_frame(data[a:b]) for a, b in zip(cuts, cuts[1:])]
+    path = tmp_path / "tweets.json.zst"
+    path.write_bytes(b"".join(frames))
+    offsets = [sum(len(frame) for frame in frames[:i]) for i in range(len(frames))]
+    offsets.append(path.stat().st_size)
+
+    assert get_compression(str(path)) == "zstd"
+    assert list(iter_lines(str(path))) == LINES
+    for split in offsets:
+        head = list(iter_lines(str(path), 0, split))
+        tail = list(iter_lines(str(path), split))
+        assert head + tail == LINES
+
+    written = tmp_path / "written.json.zst"
+    source = tmp_path / "tweets.jsonl"
+    source.write_bytes(data)
+    assert write_zstd_frames(str(source), str(written), frame_size=60) == 2
+    assert len(get_zstd_frame_offsets(written.read_bytes())) == 2
+    assert list(iter_lines(str(written))) == LINES
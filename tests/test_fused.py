@@ -0,0 +1,38 @@
+import pytest
+
+from fused import fused_scan
+from q1_memory import q1_memory
+from q2_memory import q2_memory
+from q3_memory import q3_memory
+
+
+@pytest.fixture
+def fake_full_tweets_file(tmp_path) -> str:
+    """
+    Creates a fake JSONL tweet file with dates, users, emojis and mentions.
+    """
+    lines = [
+        '{"date": "2021-02-01T12:00:00+00:00", "user": {"username": "alice"}, '
+        '"content": "Hi 😊", "mentionedUsers": [{"username": "bob"}]}\n',
+        '{"date": "2021-02-01T15:00:00+00:00", "user": {"username": "alice"}, '
+        '"content": "🐍😊", "mentionedUsers": null}\n',
+        "not json\n",
+        '{"date": "2021-02-02T09:00:00+00:00", "user": {"username": "carol"}, '
+        '"content": "no emoji", "mentionedUsers": [{"username": "bob"}, '
+        '{"username": "alice"}]}\n',
+    ]
+    path = tmp_path / "tweets.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path)
+
+
+def test_fused_scan_matches_memory_solutions(fake_full_tweets_file) -> None:
+    """
+    Checks fused_scan returns exactly what each memory solution returns.
+    """
+    results = fused_scan(fake_full_tweets_file, top_n=2)
+    assert set(results) == {"q1", "q2", "q3"}
+    assert results["q1"] == q1_memory(fake_full_tweets_file, top_n=2)
+    assert results["q2"] == q2_memory(fake_full_tweets_file, top_n=2)
+    assert results["q3"] == q3_memory(fake_full_tweets_file, top_n=2)
+    assert results["q3"][0] == ("bob", 2)
@@ -0,0 +1,137 @@
+import json
+
+import pytest
+from google.api_core.exceptions import PreconditionFailed
+
+from fused import fused_scan
+from incremental import incremental_scan, update_incremental
+
+TWEET_LINES = [
+    '{"date": "2021-02-01T12:00:00+00:00", "user": {"username": "alice"}, '
+    '"content": "Hi 😊", "mentionedUsers": [{"username": "bob"}]}\n',
+    '{"date": "2021-02-01T15:00:00+00:00", "user": {"username": "alice"}, '
+    '"content": "🐍😊", "mentionedUsers": null}\n',
+    "not json\n",
+    '{"date": "2021-02-02T09:00:00+00:00", "user": {"username": "carol"}, '
+    '"content": "no emoji", "mentionedUsers": [{"username": "bob"}, '
+    '{"username": "alice"}]}\n',
+    '{"date": "2021-02-02T10:00:00+00:00", "user": {"username": "carol"}, '
+    '"content": "🐍🐍", "mentionedUsers": [{"username": "alice"}]}\n',
+    '{"date": "2021-02-03T10:00:00+00:00", "user": {"username": "dave"}, '
+    '"content": "🔥", "mentionedUsers": [{"username": "carol"}]}\n',
+]
+
+
+class FakeStateStore:
+    """In-memory GCS objects with generations and generation preconditions."""
+
+    def __init__(self):
+        self.objects = {}
+        self.rejected_uploads = 0
+        self.before_upload = None
+
+    def bucket(self, bucket_name):
+        return self
+
+    def get_blob(self, blob_path):
+        return FakeStateBlob(self, blob_path) if blob_path in self.objects else None
+
+    def blob(self, blob_path):
+        return FakeStateBlob(self, blob_path)
+
+
+class FakeStateBlob:
+    def __init__(self, store, blob_path):
+        self.store = store
+        self.blob_path = blob_path
+        self.generation = store.objects.get(blob_path, (b"", 0))[1]
+
+    def download_as_bytes(self, if_generation_match=None):
+        data, generation = self.store.objects[self.blob_path]
+        assert if_generation_match in (None, generation)
+        return data
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None):
+        if self.store.before_upload is not None:
+            before_upload, self.store.before_upload = self.store.before_upload, None
+            before_upload()
+        generation = self.store.objects.get(self.blob_path, (b"", 0))[1]
+        if if_generation_match is not None and if_generation_match != generation:
+            self.store.rejected_uploads += 1
+            raise PreconditionFailed("generation mismatch")
+        self.store.objects[self.blob_path] = (data, generation + 1)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return tmp_path / "tweets.jsonl", str(tmp_path / "state" / "state.json")
+
+
+def test_incremental_scan_matches_full_recompute_after_appends(paths) -> None:
+    """
+    Checks appended lines (including a partially written one) are merged into
+    the persisted state and give the same results as a full scan.
+    """
+    tweets_path, state_path = paths
+    tweets_path.write_text("".join(TWEET_LINES[:3]), encoding="utf-8")
+    assert incremental_scan([str(tweets_path)], state_path, 3) == fused_scan(
+        str(tweets_path), 3
+    )
+
+    # A line still being written is not consumed until it is complete.
+    with tweets_path.open("a", encoding="utf-8") as tweets_file:
+        tweets_file.write(TWEET_LINES[3] + TWEET_LINES[4][:20])
+    partial_results = incremental_scan([str(tweets_path)], state_path, 3)
+    with open(state_path, encoding="utf-8") as state_file:
+        offset = json.load(state_file)["manifest"][str(tweets_path)]["offset"]
+    assert offset == len("".join(TWEET_LINES[:4]).encode("utf-8"))
+    assert partial_results["q3"] == [("bob", 2), ("alice", 1)]
+
+    with tweets_path.open("a", encoding="utf-8") as tweets_file:
+        tweets_file.write(TWEET_LINES[4][20:] + TWEET_LINES[5])
+    assert incremental_scan([str(tweets_path)], state_path, 3) == fused_scan(
+        str(tweets_path), 3
+    )
+
+
+def test_incremental_scan_rebuilds_rewritten_files(paths) -> None:
+    """
+    Checks a file rewritten in place invalidates the saved state.
+    """
+    tweets_path, state_path = paths
+    tweets_path.write_text("".join(TWEET_LINES), encoding="utf-8")
+    incremental_scan([str(tweets_path)], state_path, 3)
+
+    tweets_path.write_text("".join(TWEET_LINES[3:]), encoding="utf-8")
+    assert incremental_scan([str(tweets_path)], state_path, 3) == fused_scan(
+        str(tweets_path), 3
+    )
+
+
+def test_overlapping_runs_do_not_drop_each_others_gcs_state(paths, monkeypatch):
+    """
+    Checks a run whose GCS state was saved by another run in the meantime is
+    rejected by the generation precondition, then reloads and reapplies its
+    update, so the saved state covers both runs.
+    """
+    tweets_path, _ = paths
+    store = FakeStateStore()
+    monkeypatch.setattr("google.cloud.storage.Client", lambda: store)
+    state_path = "gs://bucket/state/state.json"
+    tweets_path.write_text("".join(TWEET_LINES[:2]), encoding="utf-8")
+    update_incremental([str(tweets_path)], state_path)
+
+    def other_run():
+        with tweets_path.open("a", encoding="utf-8") as tweets_file:
+            tweets_file.write("".join(TWEET_LINES[3:]))
+        update_incremental([str(tweets_path)], state_path)
+
+    with tweets_path.open("a", encoding="utf-8") as tweets_file:
+        tweets_file.write(TWEET_LINES[2])
+    store.before_upload = other_run
+    state = update_incremental([str(tweets_path)], state_path)
+
+    assert store.rejected_uploads == 1
+    saved = json.loads(store.objects["state/state.json"][0])
+    assert saved["manifest"][str(tweets_path)]["offset"] == tweets_path.stat().st_size
+    assert state.results(3) == fused_scan(str(tweets_path), 3)
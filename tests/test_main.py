@@ -0,0 +1,89 @@
+import argparse
+import json
+import sqlite3
+import subprocess  # nosec B404
+import sys
+from pathlib import Path
+
+import pytest
+
+from main import check_args
+
+SRC_DIR = str(Path(__file__).resolve().parent.parent / "src")
+
+
+def test_main_imports_no_heavy_dependencies() -> None:
+    """
+    Checks importing the CLI (e.g. for a 'memory' run on a local file) loads
+    neither pandas, pyarrow nor the GCP clients.
+    """
+    code = (
+        "import json, sys\n"
+        f"sys.path.insert(0, {SRC_DIR!r})\n"
+        "import main, q1_memory, q2_memory, q3_memory\n"
+        "print(json.dumps([m for m in ('pandas', 'pyarrow', 'google.cloud.storage', "
+        "'google.cloud.bigquery') if m in sys.modules]))\n"
+    )
+    output = subprocess.run(  # nosec B603
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    assert json.loads(output) == []
+
+
+def test_several_files_save_the_method_actually_used(tmp_path) -> None:
+    """
+    Checks a 'time' run over several files, solved by the memory aggregators,
+    saves each question's rows once under method 'memory'.
+    """
+    for day in (1, 2):
+        (tmp_path / f"day{day}.json").write_text(
+            '{"date": "2021-02-0%dT10:00:00+00:00", "user": {"username": "ana"}, '
+            '"content": "hi 🙏", "mentionedUsers": [{"username": "bob"}]}\n' % day,
+            encoding="utf-8",
+        )
+    database_path = str(tmp_path / "results.db")
+    subprocess.run(  # nosec B603
+        [
+            sys.executable,
+            str(Path(SRC_DIR) / "main.py"),
+            "--question",
+            "all",
+            "--method",
+            "time",
+            "--files",
+            str(tmp_path / "day*.json"),
+            "--save_sqlite",
+            database_path,
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+    connection = sqlite3.connect(database_path)
+    try:
+        for table in ("q1_results", "q2_results", "q3_results"):
+            methods = connection.execute(
+                f"SELECT DISTINCT method FROM {table}"  # nosec B608
+            ).fetchall()
+            assert methods == [("memory",)]
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize(
+    "option, value", [("workers", 4), ("map_to", "partials"), ("reduce_from", "x")]
+)
+def test_approx_rejects_parallel_engines(option, value) -> None:
+    """
+    Checks 'approx' combined with a parallel or distributed engine is rejected
+    before any input is read.
+    """
+    args = argparse.Namespace(
+        method="approx", workers=None, map_to=None, reduce_from=None
+    )
+    check_args(args)
+    setattr(args, option, value)
+    with pytest.raises(ValueError, match=f"--{option}"):
+        check_args(args)
+    args.method = "memory"
+    check_args(args)
@@ -0,0 +1,130 @@
+import gzip
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import pytest
+
+from fused import fused_scan
+from mapreduce import get_partial_path, plan_tasks, run_map_task, run_reduce
+from q1_memory import DateUserCounter
+from state_codec import decode_counter, encode_counter
+from utils import iter_lines
+
+
+@pytest.fixture
+def fake_files(tmp_path):
+    """
+    Splits fake tweets across three files (the second gzip compressed) and
+    writes their concatenation for comparison.
+    """
+    users = ["alice", "bob", "carol", "dañiel"]
+    emojis = ["😊", "🐍", "🙏"]
+    chunks = []
+    for day in range(1, 4):
+        lines = [
+            '{"date": "2021-02-0%dT10:00:00+00:00", "user": {"username": "%s"}, '
+            '"content": "tweet %s", "mentionedUsers": [{"username": "%s"}]}\n'
+            % (day, users[(day + i) % 4], emojis[i % 3], users[(day * i) % 4])
+            for i in range(15 * day)
+        ]
+        chunks.append("".join(lines).encode() + b"{broken json\n")
+
+    paths = [tmp_path / name for name in ("a.json", "b.json.gz", "c.json")]
+    paths[0].write_bytes(chunks[0])
+    paths[1].write_bytes(gzip.compress(chunks[1]))
+    paths[2].write_bytes(chunks[2])
+    concatenated = tmp_path / "all.json"
+    concatenated.write_bytes(b"".join(chunks))
+    return [str(path) for path in paths], str(concatenated)
+
+
+def test_states_roundtrip_keeping_order() -> None:
+    """
+    Checks encoded Q1 and Q2/Q3 states decode to equal states with the same
+    key order, which ties depend on.
+    """
+    counter = Counter({"zoe": 3, "ana": 3, "ñandú": 1, "😊": 7})
+    decoded = decode_counter(encode_counter(counter))
+    assert decoded == counter
+    assert list(decoded) == list(counter)
+    assert decode_counter(encode_counter(Counter())) == Counter()
+
+    state = DateUserCounter()
+    for day, user in [(2, "bob"), (1, "ana"), (2, "ana"), (2, "bob"), (1, "zoe")]:
+        state.add(date(2021, 2, day), user)
+    decoded_state = DateUserCounter.from_bytes(state.to_bytes())
+    assert decoded_state.top_dates(2) == state.top_dates(2)
+    merged = DateUserCounter()
+    merged.merge(decoded_state)
+    merged.merge(state)
+    assert merged.top_dates(2) == [(date(2021, 2, 2), "bob"), (date(2021, 2, 1), "ana")]
+
+    with pytest.raises(ValueError):
+        decode_counter(b"not a state")
+
+
+@pytest.mark.parametrize("task_count", [1, 2, 4, 9])
+def test_plan_tasks_reads_every_line_once(fake_files, task_count) -> None:
+    """
+    Checks the tasks' work units cover the dataset in order, never splitting
+    the compressed file, for fewer and more tasks than files.
+    """
+    file_paths, concatenated = fake_files
+    tasks = plan_tasks(file_paths, task_count)
+
+    assert len(tasks) == task_count
+    assert all(
+        unit.start == 0
+        for task in tasks
+        for unit in task
+        if unit.file_path.endswith(".gz")
+    )
+    lines = [
+        line
+        for task in tasks
+        for unit in task
+        for line in iter_lines(unit.file_path, unit.start, unit.end)
+    ]
+    assert lines == list(iter_lines(concatenated))
+
+
+def test_map_tasks_and_reduce_match_single_pass(
+    fake_files, tmp_path, monkeypatch
+) -> None:
+    """
+    Checks map tasks run as separate processes, then reduced, give the results
+    of a single pass over the concatenated files, and that the reduce step
+    rejects an incomplete run or a stale partial of an earlier execution.
+    """
+    file_paths, concatenated = fake_files
+    output_prefix = str(tmp_path / "partials")
+    questions = ["q1", "q2", "q3"]
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(run_map_task, questions, file_paths, output_prefix, i, 3)
+            for i in range(3)
+        ]
+        partial_paths = [future.result() for future in futures]
+
+    assert partial_paths == [get_partial_path(output_prefix, i, 3) for i in range(3)]
+    assert run_reduce(output_prefix, 2) == fused_scan(concatenated, 2)
+    assert run_reduce(output_prefix, 3, ["q3"]) == {
+        "q3": fused_scan(concatenated, 3)["q3"]
+    }
+
+    with pytest.raises(ValueError):
+        run_map_task(questions, file_paths, output_prefix, 3, 3)
+
+    # A new execution whose task 1 failed leaves the previous task 1 partial.
+    monkeypatch.setenv("CLOUD_RUN_EXECUTION", "job-execution-2")
+    for task_index in (0, 2):
+        run_map_task(questions, file_paths, output_prefix, task_index, 3)
+    with pytest.raises(ValueError, match="several runs"):
+        run_reduce(output_prefix, 2)
+    run_map_task(questions, file_paths, output_prefix, 1, 3)
+    assert run_reduce(output_prefix, 2) == fused_scan(concatenated, 2)
+
+    (tmp_path / "partials" / "part-00001-of-00003.state").unlink()
+    with pytest.raises(ValueError):
+        run_reduce(output_prefix, 2)
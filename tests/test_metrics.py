@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from fused import fused_scan
+from metrics import METRICS
+from parallel import parallel_solve
+
+
+@pytest.fixture
+def metrics():
+    """
+    Enables the run metrics for one test and clears them afterwards.
+    """
+    METRICS.reset()
+    METRICS.enabled = True
+    yield METRICS
+    METRICS.enabled = False
+    METRICS.reset()
+
+
+@pytest.fixture
+def tweets_with_malformed_lines(tmp_path) -> str:
+    """
+    Creates a fake JSONL tweet file with two malformed lines.
+    """
+    lines = [
+        '{"date": "2021-02-01T12:00:00+00:00", "user": {"username": "alice"}, '
+        '"content": "Hi 😊", "mentionedUsers": [{"username": "bob"}]}\n',
+        "not json\n",
+        '{"date": "2021-02-02T09:00:00+00:00", "user": {"username": "carol"}, '
+        '"content": "no emoji", "mentionedUsers": null}\n',
+        '{"truncated": \n',
+    ]
+    path = tmp_path / "tweets.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path)
+
+
+def test_scans_count_lines_and_malformed_records(
+    metrics, tweets_with_malformed_lines, tmp_path
+) -> None:
+    """
+    Checks serial and parallel scans count lines read, malformed lines and kept
+    records, time JSON decoding, and that the metrics can be written as JSON.
+    """
+    fused_scan(tweets_with_malformed_lines)
+    parallel_solve("q3", tweets_with_malformed_lines, workers=2)
+
+    assert metrics.counters == {
+        "lines_read": 8,
+        "malformed_lines": 4,
+        "records_kept": 4,
+    }
+    assert metrics.stages["json_decode"] > 0
+
+    metrics_path = tmp_path / "metrics.json"
+    metrics.write(str(metrics_path), question="q3")
+    written = json.loads(metrics_path.read_text(encoding="utf-8"))
+    assert written["question"] == "q3"
+    assert written["counters"]["malformed_lines"] == 4
+    assert written["peak_rss_mib"] > 0
+
+
+def test_timed_is_a_no_op_when_disabled() -> None:
+    """
+    Checks per-record timing adds no wrapper unless metrics are enabled.
+    """
+    assert not METRICS.enabled
+    assert METRICS.timed("json_decode", len) is len
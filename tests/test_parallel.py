@@ -0,0 +1,79 @@
+import pytest
+
+import compressed_io
+from compressed_io import write_zstd_frames
+from parallel import parallel_solve, split_file_ranges
+from q1_memory import q1_memory
+from q2_memory import q2_memory
+from q3_memory import q3_memory
+
+
+@pytest.fixture
+def fake_many_tweets_file(tmp_path) -> str:
+    """
+    Creates a fake JSONL tweet file large enough to be split into several ranges.
+    """
+    users = ["alice", "bob", "carol", "dan"]
+    emojis = ["😊", "🐍", "🙏", "🚜"]
+    lines = []
+    for i in range(200):
+        lines.append(
+            '{"date": "2021-02-%02dT10:00:00+00:00", "user": {"username": "%s"}, '
+            '"content": "tweet %s%s", "mentionedUsers": [{"username": "%s"}]}\n'
+            % (
+                1 + i % 5,
+                users[i % 3],
+                emojis[i % 4],
+                emojis[i % 2],
+                users[(i * 7) % 4],
+            )
+        )
+        if i % 50 == 0:
+            lines.append("{broken json\n")
+    path = tmp_path / "many_tweets.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path)
+
+
+def test_split_file_ranges_cover_file_on_line_boundaries(fake_many_tweets_file) -> None:
+    """
+    Checks ranges are contiguous, cover the whole file and start at line starts.
+    """
+    with open(fake_many_tweets_file, "rb") as infile:
+        data = infile.read()
+    ranges = split_file_ranges(fake_many_tweets_file, 4)
+    assert len(ranges) == 4
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[start - 1 : start] == b"\n"
+
+
+def test_parallel_solve_matches_serial(fake_many_tweets_file) -> None:
+    """
+    Checks the parallel results are identical to the memory-optimized ones.
+    """
+    path = fake_many_tweets_file
+    assert parallel_solve("q1", path, 3, workers=3) == q1_memory(path, 3)
+    assert parallel_solve("q2", path, 3, workers=3) == q2_memory(path, 3)
+    assert parallel_solve("q3", path, 3, workers=3) == q3_memory(path, 3)
+
+
+@pytest.mark.skipif(
+    compressed_io.zstd_stdlib is None and compressed_io.zstandard is None,
+    reason="no zstd implementation installed",
+)
+def test_parallel_solve_splits_zstd_frames(fake_many_tweets_file, tmp_path) -> None:
+    """
+    Checks a zstd file with several frames is split on frame boundaries and
+    gives the same results as the uncompressed file.
+    """
+    path = str(tmp_path / "many_tweets.json.zst")
+    write_zstd_frames(fake_many_tweets_file, path, frame_size=2000)
+    ranges = split_file_ranges(path, 3)
+    assert len(ranges) == 3
+
+    plain = fake_many_tweets_file
+    assert parallel_solve("q1", path, 3, workers=3) == q1_memory(plain, 3)
+    assert parallel_solve("q2", path, 3, workers=3) == q2_memory(plain, 3)
+    assert parallel_solve("q3", path, 3, workers=3) == q3_memory(plain, 3)
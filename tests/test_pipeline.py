@@ -0,0 +1,88 @@
+from collections import Counter
+
+import pytest
+
+from parallel import parallel_solve
+from pipeline import (
+    AGGREGATORS,
+    Aggregator,
+    combine_line_filters,
+    get_aggregators,
+    register_aggregator,
+    run_serial,
+)
+from sharded import sharded_solve
+
+
+def count_tweet_authors(tweet_data, author_counter) -> None:
+    """Counts tweets per author (aggregator of the plugin test)."""
+    username = (tweet_data.get("user") or {}).get("username")
+    if username:
+        author_counter[username] += 1
+
+
+@pytest.fixture
+def authors_aggregator():
+    """
+    Registers a custom 'authors' question for one test.
+    """
+    aggregator = register_aggregator(
+        "authors",
+        Aggregator(
+            Counter, count_tweet_authors, Counter.update, Counter.most_common, ("user",)
+        ),
+    )
+    yield aggregator
+    del AGGREGATORS["authors"]
+
+
+@pytest.fixture
+def tweets_file(tmp_path) -> str:
+    """
+    Creates a fake JSONL tweet file with a malformed line.
+    """
+    lines = [
+        '{"date": "2021-02-01T12:00:00+00:00", "user": {"username": "alice"}, '
+        '"content": "Hi 😊", "mentionedUsers": [{"username": "bob"}]}\n',
+        '{"date": "2021-02-01T15:00:00+00:00", "user": {"username": "bob"}, '
+        '"content": "plain", "mentionedUsers": null}\n',
+        "not json\n",
+        '{"date": "2021-02-02T09:00:00+00:00", "user": {"username": "bob"}, '
+        '"content": "🐍", "mentionedUsers": []}\n',
+    ]
+    path = tmp_path / "tweets.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path)
+
+
+def test_registered_aggregator_runs_on_every_engine(
+    authors_aggregator, tweets_file
+) -> None:
+    """
+    Checks a registered question runs serially, fused with the built-in ones,
+    on byte ranges and on shards, with the same result.
+    """
+    expected = [("bob", 2), ("alice", 1)]
+    fused = run_serial(get_aggregators(["authors", "q3"]), tweets_file, 5)
+
+    assert fused == {"authors": expected, "q3": [("bob", 1)]}
+    assert parallel_solve("authors", tweets_file, 5, workers=1) == expected
+    assert sharded_solve(["authors"], [tweets_file, tweets_file], 1, 1) == {
+        "authors": [("bob", 4)]
+    }
+    with pytest.raises(ValueError):
+        get_aggregators(["q9"])
+
+
+def test_line_filters_keep_lines_any_aggregator_may_use(tweets_file) -> None:
+    """
+    Checks the combined prefilter keeps the lines of every aggregator and that
+    a single aggregator without prefilter disables it.
+    """
+    aggregators = get_aggregators(["q2", "q3"])
+    line_filter = combine_line_filters(aggregators)
+    with open(tweets_file, "rb") as infile:
+        kept = [line_filter(line) for line in infile]
+
+    assert kept == [True, False, False, True]
+    assert combine_line_filters(get_aggregators(["q1", "q3"])) is None
@@ -1,7 +1,7 @@
 from datetime import date
 import pytest
 
-from q1_memory import q1_memory
+from q1_memory import DateUserCounter, q1_memory
 from q1_time import q1_time
 
 
@@ -46,3 +46,63 @@ def test_q1_time_output(fake_tweets_file) -> None:
     assert len(res) == 2
     assert all(isinstance(d, date) and isinstance(u, str) for d, u in res)
     assert res[0][1] == "alice"
+
+
+def test_q1_time_matches_q1_memory(tmp_path) -> None:
+    """
+    Checks the vectorized q1_time agrees with q1_memory, skipping invalid dates
+    and records without a username.
+    """
+    lines = []
+    for day in range(1, 8):
+        for i in range(day * 3):
+            user = f"user{day}" if i % 3 else f"other{i}"
+            lines.append(
+                '{"date": "2021-02-%02dT%02d:00:00+00:00", "user": {"username": "%s"}}\n'
+                % (day, i % 24, user)
+            )
+    lines += [
+        '{"date": "not a date", "user": {"username": "ghost"}}\n',
+        '{"date": "2021-02-01T10:00:00+00:00", "user": {}}\n',
+        '{"date": "2021-02-01T10:00:00+00:00"}\n',
+    ]
+    path = tmp_path / "tweets.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+
+    res = q1_time(str(path), top_n=4)
+    assert res == q1_memory(str(path), top_n=4)
+    assert res[0] == (date(2021, 2, 7), "user7")
+
+
+def test_date_user_counter_merge_matches_single_pass() -> None:
+    """
+    Checks merging partial DateUserCounters equals counting everything at once.
+    """
+    tweets = [
+        (date(2021, 2, 1), "alice"),
+        (date(2021, 2, 2), "bob"),
+        (date(2021, 2, 1), "bob"),
+        (date(2021, 2, 2), "bob"),
+        (date(2021, 2, 1), "alice"),
+        (date(2021, 2, 3), "carol"),
+    ]
+    single = DateUserCounter()
+    for tweet_date, username in tweets:
+        single.add(tweet_date, username)
+
+    merged = DateUserCounter()
+    for part in (tweets[:2], tweets[2:]):
+        partial = DateUserCounter()
+        for tweet_date, username in part:
+            partial.add(tweet_date, username)
+        merged.merge(partial)
+
+    assert merged.date_totals == single.date_totals
+    # Each date only stores the users active on it.
+    assert merged.user_counts[date(2021, 2, 3)] == {merged.usernames.ids["carol"]: 1}
+    assert merged.top_dates(3) == single.top_dates(3)
+    assert single.top_dates(2) == [
+        (date(2021, 2, 1), "alice"),
+        (date(2021, 2, 2), "bob"),
+    ]
+    assert len(single.usernames) == 3
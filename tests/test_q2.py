@@ -1,6 +1,8 @@
 import pytest
 
+from emojis import extract_emojis, may_contain_emojis
 from q2_memory import q2_memory
+import q2_time as q2_time_module
 from q2_time import q2_time
 
 
@@ -55,3 +57,59 @@ def test_q2_time_output(fake_emojis_file) -> None:
         if "😊" in emoji and count >= 4:
             found = True
     assert found, "Expected to find '😊' at least 4 times in the result"
+
+
+def test_extract_emojis_keeps_sequences_whole() -> None:
+    """
+    Checks skin tones, ZWJ sequences, flags and keycaps count as one emoji and
+    non-emoji scripts are ignored.
+    """
+    text = "Hola 👋🏽 familia 👨‍👩‍👧 🇮🇳🇦🇷 ☀️ 1️⃣ 中文 हिंदी plain"
+    assert extract_emojis(text) == [
+        "👋🏽",
+        "👨‍👩‍👧",
+        "🇮🇳",
+        "🇦🇷",
+        "☀️",
+        "1️⃣",
+    ]
+    assert extract_emojis("no emojis here") == []
+    assert extract_emojis("ਕਿਸਾਨ ਮਜ਼ਦੂਰ") == []
+
+
+def test_q2_time_batches_match_q2_memory(tmp_path, monkeypatch) -> None:
+    """
+    Checks the batched q2_time counts the same emoji sequences as q2_memory,
+    including batch boundaries, keycaps, flags and ZWJ sequences.
+    """
+    monkeypatch.setattr(q2_time_module, "CONTENT_BATCH_SIZE", 2)
+    lines = [
+        '{"content": "Vamos 🇦🇷🇦🇷 1️⃣ 👨‍🌾"}\n',
+        '{"content": "ਕਿਸਾਨ 🙏🏽🙏"}\n',
+        "not json\n",
+        '{"content": "plain ascii"}\n',
+        '{"content": "👨‍🌾 #⃣ ❤️❤️ 中文"}\n',
+    ]
+    path = tmp_path / "emojis.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+
+    assert dict(q2_time(str(path), top_n=20)) == dict(q2_memory(str(path), top_n=20))
+    assert dict(q2_time(str(path), top_n=20)) == {
+        "🇦🇷": 2,
+        "1️⃣": 1,
+        "👨‍🌾": 2,
+        "🙏🏽": 1,
+        "🙏": 1,
+        "#⃣": 1,
+        "❤️": 2,
+    }
+
+
+def test_may_contain_emojis_only_rejects_ascii_lines() -> None:
+    """
+    Checks the Q2 prefilter keeps raw and escaped non-ASCII content and only
+    rejects plain ASCII lines.
+    """
+    assert may_contain_emojis('{"content": "Hi 😊"}'.encode())
+    assert may_contain_emojis(b'{"content": "Hi \\ud83d\\ude0a"}')
+    assert not may_contain_emojis(b'{"content": "plain text"}')
@@ -1,6 +1,7 @@
 import pytest
 
-from q3_memory import q3_memory
+from metrics import METRICS
+from q3_memory import may_have_mentions, q3_memory
 from q3_time import q3_time
 
 
@@ -48,3 +49,34 @@ def test_q3_time_output(fake_mentions_file) -> None:
     assert "alice" in result_dict
     assert result_dict["alice"] == 3
     assert any(u in result_dict for u in ("bob", "carol"))
+
+
+def test_q3_prefilter_skips_lines_without_mentions(tmp_path) -> None:
+    """
+    Checks lines without a mention list are skipped before decoding, while
+    spacing variants and nested matches are still decoded and counted right.
+    """
+    lines = [
+        '{"content": "no mentions", "mentionedUsers": null}\n',
+        '{"content": "no field"}\n',
+        '{"mentionedUsers" :\n',
+        '{"mentionedUsers" : [ {"username": "alice"} ]}\n',
+        '{"mentionedUsers": null, "quotedTweet": {"mentionedUsers": '
+        '[{"username": "bob"}]}}\n',
+    ]
+    assert [may_have_mentions(line.encode()) for line in lines] == [
+        False,
+        False,
+        False,
+        True,
+        True,
+    ]
+
+    path = tmp_path / "mentions.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+    METRICS.reset()
+    assert q3_memory(str(path)) == [("alice", 1)]
+    assert q3_time(str(path)) == [("alice", 1)]
+    assert METRICS.counters["skipped_lines"] == 6
+    assert METRICS.counters["records_kept"] == 4
+    METRICS.reset()
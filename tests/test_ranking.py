@@ -0,0 +1,49 @@
+from datetime import date
+
+from q1_memory import q1_memory
+from q1_time import q1_time
+from q2_memory import q2_memory
+from q2_time import q2_time
+from q3_memory import q3_memory
+from q3_time import q3_time
+from ranking import top_counts, top_items, top_key
+
+
+def test_top_items_breaks_ties_by_key() -> None:
+    """
+    Checks items are ranked by count and then key, whatever their input order.
+    """
+    counts = {"zoe": 2, "bob": 5, "ana": 2, "eve": 1, "dan": 5}
+    assert top_counts(counts, 3) == [("bob", 5), ("dan", 5), ("ana", 2)]
+    assert top_items(reversed(list(counts.items())), 10) == top_counts(counts, 10)
+    assert top_counts(counts, 0) == []
+    assert top_key([("d", 1), ("c", 3), ("b", 0), ("a", 3)]) == "a"
+
+
+def test_time_and_memory_solvers_agree_on_ties(tmp_path) -> None:
+    """
+    Checks the pandas and streaming solvers return the same order when dates,
+    users, emojis and mentions tie, regardless of first-seen order.
+    """
+    tweets = [
+        ("2021-02-03", "zoe", "🙏", "zoe"),
+        ("2021-02-03", "ana", "😊", "ana"),
+        ("2021-02-01", "zoe", "🙏", "zoe"),
+        ("2021-02-01", "ana", "😊", "ana"),
+        ("2021-02-02", "bob", "🐍", "bob"),
+    ]
+    path = tmp_path / "ties.jsonl"
+    path.write_text(
+        "".join(
+            '{"date": "%sT10:00:00+00:00", "user": {"username": "%s"}, '
+            '"content": "%s", "mentionedUsers": [{"username": "%s"}]}\n' % tweet
+            for tweet in tweets
+        ),
+        encoding="utf-8",
+    )
+    file_path = str(path)
+
+    expected_q1 = [(date(2021, 2, 1), "ana"), (date(2021, 2, 3), "ana")]
+    assert q1_memory(file_path, 2) == q1_time(file_path, 2) == expected_q1
+    assert q2_memory(file_path, 2) == q2_time(file_path, 2) == [("😊", 2), ("🙏", 2)]
+    assert q3_memory(file_path, 2) == q3_time(file_path, 2) == [("ana", 2), ("zoe", 2)]
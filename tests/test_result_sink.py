@@ -0,0 +1,187 @@
+import logging
+import sqlite3
+import time
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+from google.api_core.exceptions import (
+    BadRequest,
+    Forbidden,
+    InternalServerError,
+    NotFound,
+)
+
+from result_sink import INGESTION_TIMEZONE, BigQueryResultSink, SQLiteResultSink
+
+
+class FakeBigQueryClient:
+    """Records the queries of a BigQuery sink, optionally failing the first ones."""
+
+    def __init__(self, failures=()):
+        self.queries = []
+        self.failures = list(failures)
+
+    def query(self, script, job_config):
+        self.queries.append((script, job_config))
+        failure = self.failures.pop(0) if self.failures else None
+
+        def result():
+            if failure is not None:
+                raise failure
+
+        return SimpleNamespace(result=result)
+
+
+def get_parameters(job_config) -> dict:
+    """Returns the query parameters of a job by name."""
+    return {parameter.name: parameter for parameter in job_config.query_parameters}
+
+
+def read_rows(database_path: str, table: str) -> list:
+    """
+    Returns the rows of a result table ordered by method and count.
+    """
+    connection = sqlite3.connect(database_path)
+    try:
+        return connection.execute(
+            f"SELECT * FROM {table} ORDER BY method, 2 DESC"  # nosec B608
+        ).fetchall()
+    finally:
+        connection.close()
+
+
+def test_sink_writes_every_method_and_replaces_todays_rows(tmp_path) -> None:
+    """
+    Checks results of several methods land in their table in one write, with
+    method and ingestion date, and that a rerun replaces only the rows of the
+    methods it computed.
+    """
+    database_path = str(tmp_path / "results.db")
+
+    with SQLiteResultSink(database_path) as sink:
+        sink.add("q1", "time", [(date(2021, 2, 12), "alice")])
+        sink.add("q1", "memory", [(date(2021, 2, 12), "alice")])
+        sink.add("q2", "time", [("🙏", 5), ("🔥", 2)])
+        sink.flush("q1")
+
+    q1_rows = read_rows(database_path, "q1_results")
+    assert [row[:3] for row in q1_rows] == [
+        ("2021-02-12", "alice", "memory"),
+        ("2021-02-12", "alice", "time"),
+    ]
+    today = datetime.now(INGESTION_TIMEZONE).date().isoformat()
+    assert all(row[3].startswith(today) for row in q1_rows)
+    assert [row[:3] for row in read_rows(database_path, "q2_results")] == [
+        ("🙏", 5, "time"),
+        ("🔥", 2, "time"),
+    ]
+
+    with SQLiteResultSink(database_path) as sink:
+        sink.add("q2", "time", [("🚜", 7)])
+
+    assert [row[:3] for row in read_rows(database_path, "q2_results")] == [
+        ("🚜", 7, "time")
+    ]
+    assert len(read_rows(database_path, "q1_results")) == 2
+
+
+def test_bigquery_sink_builds_one_transaction_per_table() -> None:
+    """
+    Checks each table gets one script deleting today's rows of its methods and
+    inserting the new rows, passed as date, method and ARRAY<STRUCT> parameters.
+    """
+    sink = BigQueryResultSink("project", "dataset")
+    sink._client = FakeBigQueryClient()
+    with sink:
+        sink.add("q1", "time", [(date(2021, 2, 12), "alice")])
+        sink.add("q1", "memory", [(date(2021, 2, 12), "bob")])
+        sink.add("q3", "time", [("carol", 4)])
+
+    scripts = {
+        script.split("DELETE FROM `")[1].split("`")[0]: (script, job_config)
+        for script, job_config in sink._client.queries
+    }
+    assert sorted(scripts) == [
+        "project.dataset.q1_results",
+        "project.dataset.q3_results",
+    ]
+
+    script, job_config = scripts["project.dataset.q1_results"]
+    # Today's rows are an explicit ingested_at range, which prunes partitions.
+    assert (
+        'WHERE ingested_at >= TIMESTAMP(@partition_date, "America/Santiago") '
+        "AND ingested_at < TIMESTAMP( "
+        'DATE_ADD(@partition_date, INTERVAL 1 DAY), "America/Santiago" ) '
+        "AND method IN UNNEST(@methods);"
+    ) in " ".join(script.split())
+    assert "DATE(ingested_at" not in script
+    assert "INSERT INTO `project.dataset.q1_results` (tweet_date, top_user, " in script
+    parameters = get_parameters(job_config)
+    assert parameters["partition_date"].value == datetime.now(INGESTION_TIMEZONE).date()
+    assert parameters["methods"].values == ["time", "memory"]
+    rows = [row.struct_values for row in parameters["rows"].values]
+    assert [(row["tweet_date"], row["top_user"], row["method"]) for row in rows] == [
+        (date(2021, 2, 12), "alice", "time"),
+        (date(2021, 2, 12), "bob", "memory"),
+    ]
+    assert parameters["rows"].values[0].struct_types["tweet_date"] == "DATE"
+
+    script, job_config = scripts["project.dataset.q3_results"]
+    rows = [row.struct_values for row in get_parameters(job_config)["rows"].values]
+    assert [(row["username"], row["mention_count"]) for row in rows] == [("carol", 4)]
+
+
+def test_bigquery_sink_creates_one_client(monkeypatch) -> None:
+    """
+    Checks concurrent table writes share the single client created on first use.
+    """
+    created = []
+
+    def make_client(project):
+        time.sleep(0.05)  # widen the window for racing writers
+        created.append(FakeBigQueryClient())
+        return created[-1]
+
+    monkeypatch.setattr("google.cloud.bigquery.Client", make_client)
+    with BigQueryResultSink("project", "dataset") as sink:
+        for question in ("q1", "q2", "q3"):
+            sink.add(question, "time", [])
+
+    assert len(created) == 1
+    assert len(created[0].queries) == 3
+
+
+@pytest.mark.parametrize(
+    "error, message",
+    [
+        (NotFound("no table"), "Table not found"),
+        (Forbidden("denied"), "Permission denied"),
+        (BadRequest("no partition filter"), "BadRequest writing to table"),
+        (InternalServerError("boom"), "GoogleAPIError writing to"),
+    ],
+)
+def test_bigquery_sink_logs_failed_writes(error, message, caplog) -> None:
+    """
+    Checks a failed script is logged by its cause, not retried against the same
+    table, and not reported as saved.
+    """
+    sink = BigQueryResultSink("project", "dataset")
+    sink._client = FakeBigQueryClient([error])
+    with caplog.at_level(logging.INFO), sink:
+        sink.add("q2", "memory", [("🙏", 5)])
+
+    assert len(sink._client.queries) == 1
+    assert [record.levelname for record in caplog.records] == ["ERROR"]
+    assert message in caplog.text
+    assert "project.dataset.q2_results" in caplog.text
+
+
+def test_sqlite_sink_logs_failed_writes(tmp_path, caplog) -> None:
+    """
+    Checks a database that cannot be opened is logged, not raised.
+    """
+    with SQLiteResultSink(str(tmp_path / "missing" / "results.db")) as sink:
+        sink.add("q3", "time", [("carol", 4)])
+
+    assert "Failed to save q3_results" in caplog.text
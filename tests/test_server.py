@@ -0,0 +1,88 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from fused import fused_scan
+from server import QueryService, create_server
+
+
+@pytest.fixture
+def served_tweets(tmp_path):
+    """
+    Creates a fake JSONL tweet file and serves it on a free local port.
+    """
+    lines = [
+        '{"date": "2021-02-12T10:00:00+00:00", "user": {"username": "alice"}, '
+        '"content": "Hi 😊😊", "mentionedUsers": [{"username": "bob"}]}\n',
+        '{"date": "2021-02-12T11:00:00+00:00", "user": {"username": "alice"}, '
+        '"content": "🔥", "mentionedUsers": null}\n',
+        '{"date": "2021-02-13T09:00:00+00:00", "user": {"username": "carol"}, '
+        '"content": "🔥🔥🔥", "mentionedUsers": [{"username": "dan"}, '
+        '{"username": "dan"}]}\n',
+    ]
+    path = tmp_path / "tweets.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+
+    service = QueryService(str(path), reload_interval=3600)
+    server = create_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield service, f"http://127.0.0.1:{server.server_address[1]}", path
+    server.shutdown()
+    server.server_close()
+
+
+def get_json(url: str):
+    """
+    Fetches a URL and decodes its JSON body.
+    """
+    with urllib.request.urlopen(url) as response:  # nosec B310
+        return json.loads(response.read())
+
+
+def test_server_answers_queries_from_memory(served_tweets) -> None:
+    """
+    Checks unfiltered answers match a full scan, and that top_n, date windows
+    and bad requests are handled.
+    """
+    service, base_url, path = served_tweets
+    expected = fused_scan(str(path), top_n=10)
+
+    assert get_json(f"{base_url}/q1")["result"] == [
+        [tweet_date.isoformat(), user] for tweet_date, user in expected["q1"]
+    ]
+    assert get_json(f"{base_url}/q2")["result"] == [list(x) for x in expected["q2"]]
+    assert get_json(f"{base_url}/q3?top_n=1")["result"] == [["dan", 2]]
+    assert get_json(f"{base_url}/q2?since=2021-02-12&until=2021-02-13")["result"] == [
+        ["😊", 2],
+        ["🔥", 1],
+    ]
+    assert get_json(f"{base_url}/health")["status"] == "ok"
+
+    for bad_top_n in ("many", "-1"):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            get_json(f"{base_url}/q2?top_n={bad_top_n}")
+        assert error.value.code == 400
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get_json(f"{base_url}/q4")
+    assert error.value.code == 404
+
+
+def test_server_reloads_when_source_changes(served_tweets) -> None:
+    """
+    Checks the aggregates are rebuilt only after the source file changes.
+    """
+    service, base_url, path = served_tweets
+    assert not service.reload_if_changed()
+
+    with path.open("a", encoding="utf-8") as outfile:
+        outfile.write(
+            '{"date": "2021-02-14T09:00:00+00:00", "user": {"username": "erin"}, '
+            '"content": "🙏🙏🙏🙏", "mentionedUsers": null}\n'
+        )
+    assert service.reload_if_changed()
+    assert get_json(f"{base_url}/q2?top_n=1")["result"] == [["🔥", 4]]
+    assert get_json(f"{base_url}/q2?top_n=1&since=2021-02-14")["result"] == [["🙏", 4]]
@@ -0,0 +1,102 @@
+import gzip
+from types import SimpleNamespace
+
+import pytest
+
+from q1_memory import q1_memory
+from q2_memory import q2_memory
+from q3_memory import q3_memory
+from sharded import sharded_solve
+from utils import expand_file_paths
+
+
+@pytest.fixture
+def fake_shards(tmp_path):
+    """
+    Splits fake tweets across three daily shard files (one gzip compressed) and
+    writes their concatenation for comparison.
+    """
+    users = ["alice", "bob", "carol"]
+    emojis = ["😊", "🐍", "🙏"]
+    shards = []
+    for day in range(1, 4):
+        lines = [
+            '{"date": "2021-02-0%dT10:00:00+00:00", "user": {"username": "%s"}, '
+            '"content": "tweet %s", "mentionedUsers": [{"username": "%s"}]}\n'
+            % (day, users[(day + i) % 3], emojis[i % 3], users[(day * i) % 3])
+            for i in range(10 * day)
+        ]
+        shards.append("".join(lines).encode() + b"{broken json\n")
+
+    shard_dir = tmp_path / "shards"
+    shard_dir.mkdir()
+    (shard_dir / "day1.json").write_bytes(shards[0])
+    (shard_dir / "day2.json.gz").write_bytes(gzip.compress(shards[1]))
+    (shard_dir / "day3.json").write_bytes(shards[2])
+    (shard_dir / ".hidden").write_bytes(b"not a shard\n")
+    concatenated = tmp_path / "all.json"
+    concatenated.write_bytes(b"".join(shards))
+    return shard_dir, str(concatenated)
+
+
+def test_expand_file_paths_lists_directories_and_globs(fake_shards) -> None:
+    """
+    Checks directories and globs expand to sorted files without duplicates and
+    that a spec matching nothing is an error.
+    """
+    shard_dir, concatenated = fake_shards
+    files = [str(shard_dir / name) for name in ("day1.json", "day2.json.gz")]
+    files.append(str(shard_dir / "day3.json"))
+
+    assert expand_file_paths([str(shard_dir)]) == files
+    assert expand_file_paths([f"{shard_dir}/day[13].json", str(shard_dir)]) == [
+        files[0],
+        files[2],
+        files[1],
+    ]
+    assert expand_file_paths([concatenated]) == [concatenated]
+    with pytest.raises(FileNotFoundError):
+        expand_file_paths([f"{shard_dir}/*.csv"])
+
+
+def test_expand_file_paths_lists_gcs_prefixes_and_globs(monkeypatch) -> None:
+    """
+    Checks GCS prefixes and globs are listed and filtered by object name.
+    """
+    names = ["tweets/2021-02-02.json", "tweets/", "tweets/2021-02-01.json", "x.json"]
+
+    class FakeStorageClient:
+        def list_blobs(self, bucket_name, prefix=""):
+            assert bucket_name == "bucket"
+            return [SimpleNamespace(name=n) for n in names if n.startswith(prefix)]
+
+    monkeypatch.setattr("google.cloud.storage.Client", FakeStorageClient)
+    expected = [
+        "gs://bucket/tweets/2021-02-01.json",
+        "gs://bucket/tweets/2021-02-02.json",
+    ]
+
+    assert expand_file_paths(["gs://bucket/tweets/"]) == expected
+    assert expand_file_paths(["gs://bucket/tweets/*.json"]) == expected
+    assert expand_file_paths(["gs://bucket/*-01.json"]) == expected[:1]
+    assert expand_file_paths(["gs://bucket/x.json"]) == ["gs://bucket/x.json"]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_sharded_solve_matches_concatenated_file(fake_shards, workers) -> None:
+    """
+    Checks merging the shards gives the memory-optimized results of the
+    concatenated file, in a single process and with a process pool.
+    """
+    shard_dir, concatenated = fake_shards
+    results = sharded_solve(
+        ["q1", "q2", "q3"], expand_file_paths([str(shard_dir)]), 2, workers
+    )
+
+    assert results == {
+        "q1": q1_memory(concatenated, 2),
+        "q2": q2_memory(concatenated, 2),
+        "q3": q3_memory(concatenated, 2),
+    }
+    with pytest.raises(ValueError):
+        sharded_solve(["q4"], [concatenated])
@@ -0,0 +1,83 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+import time_index
+from q1_memory import q1_memory
+from time_index import parse_time_bound, q1_indexed
+from timestamps import parse_tweet_timestamp
+
+
+@pytest.fixture
+def indexed_tweets_file(tmp_path, monkeypatch) -> str:
+    """
+    Creates a fake JSONL tweet file and points the time index to a temporary
+    directory.
+    """
+    monkeypatch.setattr(time_index, "CACHE_DIR", tmp_path / "cache")
+    lines = [
+        '{"date": "2021-02-12T01:10:00+00:00", "user": {"username": "alice"}}\n',
+        '{"date": "2021-02-12T02:20:00+00:00", "user": {"username": "alice"}}\n',
+        '{"date": "2021-02-12T15:00:00+00:00", "user": {"username": "bob"}}\n',
+        '{"date": "2021-02-13T09:00:00+00:00", "user": {"username": "carol"}}\n',
+        '{"date": "2021-02-13T10:00:00+00:00", "user": {"username": "carol"}}\n',
+        '{"date": "2021-02-13T10:30:00+00:00", "user": {"username": "dan"}}\n',
+        '{"date": "2021-02-13T11:00:00+00:00", "user": {"username": "dan"}}\n',
+        '{"date": "not a date", "user": {"username": "erin"}}\n',
+    ]
+    path = tmp_path / "tweets.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path)
+
+
+def test_parse_tweet_timestamp_fast_path_matches_fromisoformat() -> None:
+    """
+    Checks cached and fallback parsing return the written date and UTC hour.
+    """
+    for timestamp in (
+        "2021-02-24T23:23:35-03:00",
+        "2021-02-24T09:23:35Z",
+        "2021-02-24T09:43:35.5+05:30",
+        "2021-02-24T09:23:35",
+    ):
+        moment = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        assert parse_tweet_timestamp(timestamp) == (
+            moment.date(),
+            int(moment.timestamp() // 3600),
+        )
+
+    with pytest.raises(ValueError):
+        parse_tweet_timestamp("2021-02-24T09:73:35+00:00")
+
+
+def test_q1_indexed_any_granularity_timezone_and_window(
+    indexed_tweets_file, monkeypatch
+) -> None:
+    """
+    Checks the index answers UTC days like q1_memory, and local days, hours and
+    time windows without rescanning the file.
+    """
+    assert q1_indexed(indexed_tweets_file) == q1_memory(indexed_tweets_file)
+    assert q1_indexed(indexed_tweets_file, granularity="week") == [
+        (date(2021, 2, 8), "alice")
+    ]
+
+    # Rebuilding is not needed: the saved index alone answers the rest.
+    monkeypatch.setattr(time_index, "build_time_index", None)
+    # 01:10 and 02:20 UTC fall on Feb 11 in Santiago (UTC-3).
+    assert q1_indexed(indexed_tweets_file, time_zone="America/Santiago") == [
+        (date(2021, 2, 13), "carol"),
+        (date(2021, 2, 11), "alice"),
+        (date(2021, 2, 12), "bob"),
+    ]
+    assert q1_indexed(indexed_tweets_file, top_n=1, granularity="hour") == [
+        (datetime(2021, 2, 13, 10, tzinfo=timezone.utc), "carol")
+    ]
+    since = parse_time_bound("2021-02-12T02:00", "UTC")
+    until = parse_time_bound("2021-02-13T10:00", "UTC")
+    assert q1_indexed(indexed_tweets_file, since=since, until=until) == [
+        (date(2021, 2, 12), "alice"),
+        (date(2021, 2, 13), "carol"),
+    ]
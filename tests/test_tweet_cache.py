@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+import tweet_cache
+from q1_time import q1_time
+from q2_time import q2_time
+from q3_time import q3_time
+from tweet_cache import build_tweet_cache, read_tweet_cache
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def cached_tweets_file(tmp_path, monkeypatch) -> str:
+    """
+    Creates a fake JSONL tweet file and points the cache to a temporary folder.
+    """
+    monkeypatch.setattr(tweet_cache, "CACHE_DIR", tmp_path / "cache")
+    lines = [
+        '{"date": "2021-02-01T12:00:00+00:00", "user": {"username": "alice"}, '
+        '"content": "Hi 😊😊", "mentionedUsers": [{"username": "bob"}]}\n',
+        '{"date": "2021-02-01T15:00:00+00:00", "user": {"username": "alice"}, '
+        '"content": "🐍😊", "mentionedUsers": null}\n',
+        "not json\n",
+        '{"date": "2021-02-02T09:00:00+00:00", "user": {"username": "carol"}, '
+        '"content": "", "mentionedUsers": [{"username": "bob"}, '
+        '{"username": "alice"}]}\n',
+    ]
+    path = tmp_path / "tweets.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+    return str(path)
+
+
+def test_time_solutions_match_with_cache(cached_tweets_file) -> None:
+    """
+    Checks the time solutions return the same results reading from the cache.
+    """
+    path = cached_tweets_file
+    expected = (q1_time(path, 2), q2_time(path, 2), q3_time(path, 2))
+    assert read_tweet_cache(path, ["date"]) is None
+
+    cache_path = build_tweet_cache(path)
+    assert cache_path is not None and cache_path.exists()
+    assert list(cache_path.parent.iterdir()) == [cache_path]
+    assert read_tweet_cache(path, ["date"]) is not None
+    assert (q1_time(path, 2), q2_time(path, 2), q3_time(path, 2)) == expected
+
+
+def test_cache_is_invalidated_when_source_changes(cached_tweets_file) -> None:
+    """
+    Checks a cache built for an older version of the file is ignored.
+    """
+    build_tweet_cache(cached_tweets_file)
+    with open(cached_tweets_file, "a", encoding="utf-8") as outfile:
+        outfile.write('{"content": "😊"}\n')
+    os.utime(cached_tweets_file, ns=(0, 0))
+    assert read_tweet_cache(cached_tweets_file, ["content"]) is None
+
+
+def test_cache_build_writes_a_per_process_temp_file(
+    cached_tweets_file, monkeypatch
+) -> None:
+    """
+    Checks the cache is written to a temp file of this process, which a failed
+    build removes without leaving a cache behind.
+    """
+    temp_paths = []
+
+    def failing_tweets(local_path, fields):
+        temp_paths.extend(tweet_cache.CACHE_DIR.iterdir())
+        raise OSError("read failed")
+        yield
+
+    monkeypatch.setattr(tweet_cache, "iter_tweets", failing_tweets)
+    with pytest.raises(OSError):
+        build_tweet_cache(cached_tweets_file)
+    assert [path.name.endswith(f".{os.getpid()}.tmp") for path in temp_paths] == [True]
+    assert list(tweet_cache.CACHE_DIR.iterdir()) == []
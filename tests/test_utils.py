@@ -1,4 +1,16 @@
-from utils import get_config_value
+import os
+
+import pytest
+
+from q3_memory import q3_memory
+from utils import (
+    JSON_DECODE_ERRORS,
+    get_available_json_backends,
+    get_config_value,
+    get_local_file_path,
+    iter_lines,
+    make_json_decoder,
+)
 
 
 def test_get_config_value_returns_str(monkeypatch) -> None:
@@ -21,3 +33,173 @@ def test_get_config_value_returns_str(monkeypatch) -> None:
     value = get_config_value("BUCKET")
     assert isinstance(value, str)
     assert value == "test-bucket"
+
+
+@pytest.mark.parametrize("backend", get_available_json_backends())
+def test_make_json_decoder_backends(backend) -> None:
+    """
+    Checks every available JSON backend decodes the requested fields identically
+    and rejects malformed lines and non-object values with a ValueError.
+    """
+    line = (
+        '{"date": "2021-02-01T12:00:00+00:00", "user": {"username": "alice"}, '
+        '"content": "Hi 😊", "mentionedUsers": [{"username": "bob"}]}\n'
+    )
+    decode = make_json_decoder(("user", "mentionedUsers", "missing"), backend)
+    for raw_line in (line, line.encode("utf-8")):
+        record = decode(raw_line)
+        assert record["user"] == {"username": "alice"}
+        assert record["mentionedUsers"] == [{"username": "bob"}]
+        assert record.get("missing") is None
+
+    assert make_json_decoder(backend=backend)(line)["content"] == "Hi 😊"
+    for bad_line in ("{broken json\n", "[1, 2]\n", b"\xff\xfe\n"):
+        with pytest.raises(JSON_DECODE_ERRORS):
+            decode(bad_line)
+
+
+class FakeBlob:
+    """Minimal stand-in for a GCS blob supporting ranged reads."""
+
+    def __init__(self, data: bytes, md5_hash: str = "bWQ1") -> None:
+        self.data = data
+        self.size = len(data)
+        self.generation = 7
+        self.md5_hash = md5_hash
+        self.crc32c = None
+        self.ranges = []
+        self.downloads = 0
+
+    def download_as_bytes(self, start, end, if_generation_match=None) -> bytes:
+        assert if_generation_match == self.generation
+        self.ranges.append((start, end))
+        return self.data[start : end + 1]
+
+    def download_to_filename(self, filename, if_generation_match=None) -> None:
+        assert if_generation_match == self.generation
+        self.downloads += 1
+        with open(filename, "wb") as outfile:
+            outfile.write(self.data)
+
+
+class FakeStorageClient:
+    """Minimal stand-in for storage.Client serving a single blob."""
+
+    served_blob = None
+
+    def bucket(self, bucket_name):
+        return self
+
+    def get_blob(self, blob_path):
+        return self.served_blob
+
+    def blob(self, blob_path):
+        return self.served_blob
+
+
+def test_iter_lines_streams_gcs_blob_in_ranges(tmp_path, monkeypatch) -> None:
+    """
+    Checks GCS lines are rebuilt correctly across chunk boundaries and the
+    memory solutions stream the blob instead of downloading it.
+    """
+    lines = [
+        b'{"mentionedUsers": [{"username": "alice"}]}\n',
+        b'{"mentionedUsers": [{"username": "bob"}, {"username": "alice"}]}\n',
+        b'{"mentionedUsers": null}\n',
+        b'{"mentionedUsers": [{"username": "alice"}]}',
+    ]
+    blob = FakeBlob(b"".join(lines))
+    monkeypatch.setattr(FakeStorageClient, "served_blob", blob)
+    monkeypatch.setattr("google.cloud.storage.Client", FakeStorageClient)
+    monkeypatch.setattr("utils.GCS_CHUNK_SIZE", 10)
+    monkeypatch.setattr("utils.DOWNLOAD_CACHE_DIR", tmp_path / "downloads")
+
+    assert list(iter_lines("gs://bucket/tweets.json")) == lines
+    assert len(blob.ranges) == -(-blob.size // 10)
+    first_end = len(lines[0]) + 5
+    assert list(iter_lines("gs://bucket/tweets.json", 0, first_end)) == lines[:2]
+    assert q3_memory("gs://bucket/tweets.json", top_n=1) == [("alice", 3)]
+    assert blob.downloads == 0
+
+
+def test_iter_lines_reads_cached_gcs_downloads(tmp_path, monkeypatch) -> None:
+    """
+    Checks that once a blob is in the download cache, every solver (streaming
+    or not) and every later call reads the local copy: one download, no
+    ranged reads.
+    """
+    lines = [
+        b'{"mentionedUsers": [{"username": "alice"}]}\n',
+        b'{"mentionedUsers": [{"username": "bob"}, {"username": "alice"}]}\n',
+        b'{"mentionedUsers": [{"username": "bob"}]}',
+    ]
+    blob = FakeBlob(b"".join(lines))
+    monkeypatch.setattr(FakeStorageClient, "served_blob", blob)
+    monkeypatch.setattr("google.cloud.storage.Client", FakeStorageClient)
+    monkeypatch.setattr("utils.DOWNLOAD_CACHE_DIR", tmp_path / "downloads")
+
+    local_path = get_local_file_path("gs://bucket/tweets.json")
+    for _ in range(2):
+        assert list(iter_lines("gs://bucket/tweets.json")) == lines
+        assert list(iter_lines("gs://bucket/tweets.json", len(lines[0]))) == lines[1:]
+        assert q3_memory("gs://bucket/tweets.json", top_n=1) == [("alice", 2)]
+    assert get_local_file_path("gs://bucket/tweets.json") == local_path
+    assert blob.downloads == 1
+    assert blob.ranges == []
+
+
+def test_iter_lines_splits_local_files_into_byte_ranges(tmp_path) -> None:
+    """
+    Checks memory-mapped ranges return every line exactly once whatever the
+    split points, including a last line without newline and empty files.
+    """
+    lines = [b'{"a": 1}\n', b"\n", b'{"b": "\xc3\xb1"}\n', b'{"c": 3}']
+    path = tmp_path / "tweets.jsonl"
+    path.write_bytes(b"".join(lines))
+
+    assert list(iter_lines(str(path))) == lines
+    offsets = [sum(len(line) for line in lines[:i]) for i in range(len(lines) + 1)]
+    for index, split in enumerate(offsets):
+        assert list(iter_lines(str(path), 0, split)) == lines[:index]
+        assert list(iter_lines(str(path), split)) == lines[index:]
+    # Lines starting inside the range are returned whole.
+    assert list(iter_lines(str(path), 10, 11)) == [lines[2]]
+
+    empty = tmp_path / "empty.jsonl"
+    empty.write_bytes(b"")
+    assert list(iter_lines(str(empty))) == []
+
+
+def test_get_local_file_path_reuses_download_cache(tmp_path, monkeypatch) -> None:
+    """
+    Checks GCS downloads are cached by content, re-downloaded when corrupted and
+    evicted least-recently-used when the cache exceeds its size limit, leaving
+    other processes' downloads in progress alone.
+    """
+    monkeypatch.setattr("google.cloud.storage.Client", FakeStorageClient)
+    monkeypatch.setattr("utils.DOWNLOAD_CACHE_DIR", tmp_path / "downloads")
+    monkeypatch.setattr("utils.DOWNLOAD_CACHE_MAX_BYTES", 15)
+    first_blob = FakeBlob(b"0123456789", md5_hash="Zmlyc3Q=")
+    monkeypatch.setattr(FakeStorageClient, "served_blob", first_blob)
+
+    first_path = get_local_file_path("gs://bucket/a.json")
+    assert get_local_file_path("gs://bucket/a.json") == first_path
+    assert first_blob.downloads == 1
+    assert first_path.endswith("-a.json")
+
+    with open(first_path, "ab") as outfile:
+        outfile.write(b"corrupted")
+    assert get_local_file_path("gs://bucket/a.json") == first_path
+    assert first_blob.downloads == 2
+
+    in_progress = tmp_path / "downloads" / ".c.json.999.part"
+    in_progress.write_bytes(b"x" * 20)
+    os.utime(in_progress, (0, 0))
+
+    second_blob = FakeBlob(b"abcdefghij", md5_hash="c2Vjb25k")
+    monkeypatch.setattr(FakeStorageClient, "served_blob", second_blob)
+    second_path = get_local_file_path("gs://bucket/b.json")
+    assert second_path != first_path
+    assert os.path.exists(second_path)
+    assert not os.path.exists(first_path)
+    assert in_progress.exists()